@@ -0,0 +1,189 @@
+import concurrent.futures
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from busca_apartamentos import configuracao
+from busca_apartamentos.armazenamento import BucketMedido, abre_bucket
+from busca_apartamentos.arquivo_html import NOME_BLOB_ARQUIVO, baixa_do_bucket, reprocessa
+from busca_apartamentos.cache_http import CacheHTTP
+from busca_apartamentos.checkpoint import CheckpointColeta, coleta_em_lotes
+from busca_apartamentos.catalogo import prefixo_particao
+from busca_apartamentos.escrita import salva_partes_no_bucket
+from busca_apartamentos.indice import IndiceAnuncios, coleta_incremental
+from busca_apartamentos.metricas import para_prometheus
+from busca_apartamentos.sites import SITES
+from busca_apartamentos.sites.base import ContextoColeta
+
+
+def executa_site(site, bucket, bucket_indice=None, idade_maxima_dias=7, pasta_checkpoint='/tmp/checkpoints', tamanho_lote=200):
+    """
+    Executa a coleta completa de um site: listagem, páginas de anúncio (em lotes, com checkpoint) e
+    gravação das partes no bucket. Um site que já tem o manifesto do dia no bucket não é coletado de novo.
+
+    Parâmetros:
+        site (Site): adaptador do site.
+        bucket: bucket dos dados brutos.
+        bucket_indice (opcional): bucket do índice de anúncios; se informado, a coleta é incremental.
+        idade_maxima_dias (int): idade máxima de um registro no modo incremental.
+        pasta_checkpoint (str): pasta dos checkpoints.
+        tamanho_lote (int): anúncios coletados entre dois checkpoints.
+
+    Retorna:
+        (pd.DataFrame, dict): anúncios coletados e resumo da execução do site.
+    """
+
+    inicio = time.perf_counter()
+    data = site.contexto.data
+    prefixo = prefixo_particao(site.nome, data)
+
+    blob_manifesto = bucket.blob(f'{prefixo}/manifesto.json')
+    if blob_manifesto.exists():
+        print(f'[{site.nome}] coleta de {data} já concluída, nada a fazer')
+        manifesto = json.loads(blob_manifesto.download_as_bytes())
+        return pd.DataFrame(), {'site': site.nome, 'dominio': site.dominio, 'anuncios': manifesto['registros'],
+                                'partes': [parte['nome'] for parte in manifesto['partes']], 'segundos': 0.0, 'erro': None}
+
+    checkpoint = CheckpointColeta(site.nome, data, pasta_checkpoint)
+
+    print(f'[{site.nome}] Coletando links dos anúncios')
+    with site.metricas.etapa('listagem'):
+        links = checkpoint.etapa('links', site.descobre_links)
+    print(f'[{site.nome}] {len(links)} links coletados')
+
+    # os anúncios são gravados no checkpoint a cada lote; uma nova execução no mesmo dia continua do último lote
+    def coleta(links):
+        with site.metricas.etapa('detalhes'):
+            return coleta_em_lotes(checkpoint, links, site.busca_detalhes, tamanho_lote)
+    if bucket_indice is not None:
+        nome_indice = f'{site.nome}.sqlite'
+        indice = IndiceAnuncios.do_bucket(bucket_indice, nome_indice, caminho=f'/tmp/indice_{site.nome}.sqlite')
+        anuncios = coleta_incremental(indice, site.nome, links, coleta, idade_maxima_dias, data)
+        indice.salva_no_bucket(bucket_indice, nome_indice)
+    else:
+        anuncios = coleta(links)
+
+    with site.metricas.etapa('upload'):
+        # o arquivo de páginas sobe antes das partes: o manifesto marca o dia como concluído
+        if site.arquivo is not None:
+            site.arquivo.salva_no_bucket(bucket, f'{prefixo}/{NOME_BLOB_ARQUIVO}')
+        manifesto = salva_partes_no_bucket(bucket, site.nome, anuncios, data)
+    checkpoint.limpa()
+    if site.arquivo is not None:
+        site.arquivo.limpa()
+
+    print(f'[{site.nome}] Tempo de espera x sleeps fixos antigos (s):')
+    print(site.relatorio_esperas.resumo())
+    print(f'[{site.nome}] Limites do domínio: {site.limites.relatorio()}')
+
+    site.metricas.adiciona_tempo('esperas', sum(registro['segundos'] for registro in site.relatorio_esperas.registros))
+    relatorio = site.metricas.relatorio()
+    bucket.blob(f'{prefixo}/metricas.json').upload_from_string(json.dumps(relatorio, indent=2), content_type='application/json')
+    print(f'[{site.nome}] Métricas: {relatorio}')
+
+    return anuncios, {'site': site.nome, 'dominio': site.dominio, 'anuncios': manifesto['registros'],
+                      'partes': [parte['nome'] for parte in manifesto['partes']],
+                      'segundos': round(time.perf_counter() - inicio, 1), 'erro': None}
+
+def executa_sites(sites, bucket, **kwargs_site):
+    """
+    Executa os sites ao mesmo tempo, um por thread, de forma que o tempo total é o do site mais lento.
+    A falha de um site não interrompe os outros.
+
+    Com mais de um site, grava no bucket o manifesto da execução ('<data> - apartamentos - execucao.json')
+    com o resumo, as partes e as métricas de cada site.
+
+    Retorna:
+        (pd.DataFrame, dict): anúncios de todos os sites e manifesto da execução.
+    """
+
+    inicio = time.perf_counter()
+    resultados = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(sites)) as executor:
+        futuros = {executor.submit(executa_site, site, bucket, **kwargs_site): site for site in sites}
+        for futuro in concurrent.futures.as_completed(futuros):
+            site = futuros[futuro]
+            try:
+                resultados[site.nome] = futuro.result()
+            except Exception as e:
+                print(f'[{site.nome}] coleta falhou: {e!r}')
+                resultados[site.nome] = (pd.DataFrame(), {'site': site.nome, 'dominio': site.dominio, 'anuncios': 0,
+                                                          'partes': [], 'segundos': None, 'erro': repr(e)})
+
+    data = sites[0].contexto.data
+    manifesto = {
+        'data': data,
+        'segundos': round(time.perf_counter() - inicio, 1),
+        'anuncios': sum(resultados[site.nome][1]['anuncios'] for site in sites),
+        'sites': [resultados[site.nome][1] for site in sites],
+        'metricas': [site.metricas.relatorio() for site in sites],
+    }
+    if len(sites) > 1:
+        bucket.blob(f'{data} - apartamentos - execucao.json').upload_from_string(json.dumps(manifesto, indent=2), content_type='application/json')
+
+    anuncios = pd.concat([resultados[site.nome][0] for site in sites], axis=0).reset_index(drop=True)
+
+    return anuncios, manifesto
+
+def executa(nomes_sites, data=None):
+    """
+    Monta os sites a partir da configuração (variáveis de ambiente) e executa a coleta do dia.
+
+    Todos os sites compartilham o cache HTTP e as vagas de navegador: no máximo `N_NAVEGADORES`
+    navegadores ficam abertos ao mesmo tempo no processo, somando todos os sites.
+    """
+    bucket = abre_bucket(configuracao.BUCKET_DADOS)
+    bucket_indice = abre_bucket(configuracao.BUCKET_INDICE) if configuracao.MODO_INCREMENTAL else None
+
+    cache = CacheHTTP(configuracao.PASTA_CACHE_HTTP, configuracao.TAMANHO_CACHE_MB) if configuracao.PASTA_CACHE_HTTP else None
+    contexto = ContextoColeta(data, cache, threading.BoundedSemaphore(configuracao.N_NAVEGADORES),
+                              configuracao.N_NAVEGADORES, configuracao.PAGINAS_POR_NAVEGADOR, configuracao.PASTA_ARQUIVO)
+
+    sites = [SITES[nome](contexto) for nome in nomes_sites]
+
+    anuncios, manifesto = executa_sites(sites, bucket, bucket_indice=bucket_indice,
+                                        idade_maxima_dias=configuracao.IDADE_MAXIMA_DIAS,
+                                        pasta_checkpoint=configuracao.PASTA_CHECKPOINT,
+                                        tamanho_lote=configuracao.TAMANHO_LOTE)
+
+    print(pd.DataFrame(manifesto['sites'])[['site', 'anuncios', 'segundos', 'erro']])
+    print(f"Tempo total: {manifesto['segundos']}s")
+    if cache is not None:
+        print(f'Cache HTTP: {cache.relatorio()}')
+    if isinstance(bucket, BucketMedido):
+        print(f'Armazenamento ({configuracao.ARMAZENAMENTO}): {bucket.relatorio()}')
+    if configuracao.ARQUIVO_METRICAS:
+        with open(configuracao.ARQUIVO_METRICAS, 'w') as arquivo:
+            arquivo.write(para_prometheus([site.metricas for site in sites]))
+
+    falhas = [resumo['site'] for resumo in manifesto['sites'] if resumo['erro']]
+    if falhas:
+        raise RuntimeError(f'Coleta falhou para: {", ".join(falhas)}')
+
+    return anuncios
+
+def reprocessa_site(nome_site, caminhos=None, arquivo_saida=None):
+    """
+    Reprocessa as páginas arquivadas de um site com o parse atual, sem navegador nem rede.
+
+    Parâmetros:
+        nome_site (str): nome do site.
+        caminhos (list, opcional): arquivos .warc.gz locais; por padrão, todos os arquivos do site no bucket.
+        arquivo_saida (str, opcional): csv com os anúncios reprocessados. Padrão: 'reprocessado - <site>.csv'.
+    """
+
+    if not caminhos:
+        bucket = abre_bucket(configuracao.BUCKET_DADOS)
+        caminhos = baixa_do_bucket(bucket, nome_site, os.path.join(configuracao.PASTA_ARQUIVO, 'reprocessamento'))
+    print(f'[{nome_site}] Reprocessando {len(caminhos)} arquivos')
+
+    anuncios, stats = reprocessa(nome_site, caminhos)
+    print(f'[{nome_site}] Reprocessamento: {stats}')
+
+    anuncios.to_csv(arquivo_saida or f'reprocessado - {nome_site}.csv', index=False)
+
+    return anuncios
@@ -0,0 +1,299 @@
+import collections
+import fcntl
+import itertools
+import os
+import shutil
+import threading
+import time
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from busca_apartamentos import configuracao
+
+# arquivo de trava do `BucketLocal` para gravações condicionais; não aparece na listagem
+SUFIXO_TRAVA = '.trava'
+
+# buckets em memória do processo, por nome: abrir o mesmo nome duas vezes devolve o mesmo bucket
+_BUCKETS_MEMORIA = {}
+_TRAVA_BUCKETS_MEMORIA = threading.Lock()
+
+
+def abre_bucket(nome, armazenamento=None):
+    """
+    Abre um bucket no armazenamento escolhido pela configuração, de forma que a coleta, o tratamento e a
+    leitura do histórico rodem iguais no GCS, numa pasta local ou em memória (ex.: para medir a execução
+    numa máquina sem credenciais do GCS).
+
+    Parâmetros:
+        nome (str): nome do bucket.
+        armazenamento (str, opcional): 'gcs', 'local' (pasta `PASTA_ARMAZENAMENTO/<nome>`) ou 'memoria'.
+            Por padrão, a variável `ARMAZENAMENTO`.
+
+    Retorna:
+        bucket do GCS, `BucketLocal` ou `BucketMemoria`; com `MEDE_ARMAZENAMENTO`, dentro de um `BucketMedido`.
+    """
+
+    armazenamento = armazenamento or configuracao.ARMAZENAMENTO
+    if armazenamento == 'gcs':
+        from google.cloud import storage
+
+        bucket = storage.Client().get_bucket(nome)
+    elif armazenamento == 'local':
+        bucket = BucketLocal(os.path.join(configuracao.PASTA_ARMAZENAMENTO, nome))
+    elif armazenamento == 'memoria':
+        with _TRAVA_BUCKETS_MEMORIA:
+            bucket = _BUCKETS_MEMORIA.setdefault(nome, BucketMemoria())
+    else:
+        raise ValueError(f"Armazenamento desconhecido: {armazenamento!r} (use 'gcs', 'local' ou 'memoria')")
+
+    return BucketMedido(bucket) if configuracao.MEDE_ARMAZENAMENTO else bucket
+
+
+class BucketLocal:
+    """
+    Bucket numa pasta local, com a parte da API do GCS usada pelos buscadores (`blob`, `get_blob`,
+    `list_blobs` e, nos blobs, upload, download, `exists`, `delete` e as condições `if_generation_match`).
+    """
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        os.makedirs(pasta, exist_ok=True)
+
+    def blob(self, nome):
+        return BlobLocal(self, nome)
+
+    def get_blob(self, nome):
+        blob = BlobLocal(self, nome)
+        return blob if blob.exists() else None
+
+    def list_blobs(self, prefix=''):
+        nomes = []
+        for raiz, _, arquivos in os.walk(self.pasta):
+            for arquivo in arquivos:
+                nome = os.path.relpath(os.path.join(raiz, arquivo), self.pasta).replace(os.sep, '/')
+                if nome.startswith(prefix) and not nome.endswith(SUFIXO_TRAVA):
+                    nomes.append(nome)
+
+        return [BlobLocal(self, nome) for nome in sorted(nomes)]
+
+
+class BlobLocal:
+
+    def __init__(self, bucket, nome):
+        self.bucket = bucket
+        self.name = nome
+        self.chunk_size = None
+        self.caminho = os.path.join(bucket.pasta, nome)
+
+    def exists(self):
+        return os.path.exists(self.caminho)
+
+    @property
+    def generation(self):
+        # como no GCS, muda a cada gravação do arquivo
+        return os.stat(self.caminho).st_mtime_ns if self.exists() else None
+
+    @property
+    def size(self):
+        return os.path.getsize(self.caminho) if self.exists() else None
+
+    def upload_from_filename(self, caminho):
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        shutil.copyfile(caminho, self.caminho + '.tmp')
+        os.replace(self.caminho + '.tmp', self.caminho)
+
+    def _confere_geracao(self, if_generation_match):
+        # como no GCS: 0 exige que o arquivo não exista
+        if if_generation_match is not None and (self.generation or 0) != if_generation_match:
+            raise PreconditionFailed(f'{self.name}: geração diferente de {if_generation_match}')
+
+    def upload_from_string(self, conteudo, content_type=None, if_generation_match=None):
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        temporario = f'{self.caminho}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporario, 'wb') as f:
+            f.write(conteudo.encode() if isinstance(conteudo, str) else conteudo)
+
+        # a conferência da geração e a troca do arquivo são atômicas entre processos, como no GCS
+        with open(self.caminho + SUFIXO_TRAVA, 'a') as trava:
+            fcntl.flock(trava, fcntl.LOCK_EX)
+            try:
+                self._confere_geracao(if_generation_match)
+            except PreconditionFailed:
+                os.remove(temporario)
+                raise
+            os.replace(temporario, self.caminho)
+
+    def download_to_filename(self, caminho):
+        shutil.copyfile(self.caminho, caminho)
+
+    def delete(self):
+        os.remove(self.caminho)
+
+    def download_as_bytes(self, if_generation_match=None):
+        if not self.exists():
+            raise NotFound(self.name)
+        self._confere_geracao(if_generation_match)
+        with open(self.caminho, 'rb') as f:
+            return f.read()
+
+
+class BucketMemoria:
+    """
+    Bucket em memória, com a mesma API do `BucketLocal`. Sem custo de disco nem de rede: mede só o
+    processamento da execução.
+    """
+
+    def __init__(self):
+        self.objetos = {}
+        self.geracoes = itertools.count(1)
+        self.trava = threading.Lock()
+
+    def blob(self, nome):
+        return BlobMemoria(self, nome)
+
+    def get_blob(self, nome):
+        blob = BlobMemoria(self, nome)
+        return blob if blob.exists() else None
+
+    def list_blobs(self, prefix=''):
+        with self.trava:
+            nomes = sorted(nome for nome in self.objetos if nome.startswith(prefix))
+
+        return [BlobMemoria(self, nome) for nome in nomes]
+
+
+class BlobMemoria:
+
+    def __init__(self, bucket, nome):
+        self.bucket = bucket
+        self.name = nome
+        self.chunk_size = None
+
+    def _objeto(self):
+        # (conteúdo, geração) ou None
+        return self.bucket.objetos.get(self.name)
+
+    def exists(self):
+        return self._objeto() is not None
+
+    @property
+    def generation(self):
+        objeto = self._objeto()
+        return objeto[1] if objeto else None
+
+    @property
+    def size(self):
+        objeto = self._objeto()
+        return len(objeto[0]) if objeto else None
+
+    def _confere_geracao(self, if_generation_match):
+        if if_generation_match is not None and (self.generation or 0) != if_generation_match:
+            raise PreconditionFailed(f'{self.name}: geração diferente de {if_generation_match}')
+
+    def upload_from_string(self, conteudo, content_type=None, if_generation_match=None):
+        conteudo = conteudo.encode() if isinstance(conteudo, str) else bytes(conteudo)
+        with self.bucket.trava:
+            self._confere_geracao(if_generation_match)
+            self.bucket.objetos[self.name] = (conteudo, next(self.bucket.geracoes))
+
+    def upload_from_filename(self, caminho):
+        with open(caminho, 'rb') as f:
+            self.upload_from_string(f.read())
+
+    def download_as_bytes(self, if_generation_match=None):
+        with self.bucket.trava:
+            if not self.exists():
+                raise NotFound(self.name)
+            self._confere_geracao(if_generation_match)
+            return self._objeto()[0]
+
+    def download_to_filename(self, caminho):
+        with open(caminho, 'wb') as f:
+            f.write(self.download_as_bytes())
+
+    def delete(self):
+        with self.bucket.trava:
+            if self.bucket.objetos.pop(self.name, None) is None:
+                raise NotFound(self.name)
+
+
+class BucketMedido:
+    """
+    Envolve um bucket e mede o custo de E/S, separado do processamento: requisições, bytes e segundos
+    por operação (listagem, download, upload, exclusão).
+
+    Parâmetros:
+        bucket: bucket do GCS, `BucketLocal` ou `BucketMemoria`.
+    """
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.stats = collections.defaultdict(lambda: {'requisicoes': 0, 'bytes': 0, 'segundos': 0.0})
+        self.trava = threading.Lock()
+
+    def registra(self, operacao, inicio, n_bytes=0):
+        with self.trava:
+            stats = self.stats[operacao]
+            stats['requisicoes'] += 1
+            stats['bytes'] += n_bytes
+            stats['segundos'] += time.perf_counter() - inicio
+
+    def blob(self, nome):
+        return BlobMedido(self, self.bucket.blob(nome))
+
+    def get_blob(self, nome):
+        inicio = time.perf_counter()
+        blob = self.bucket.get_blob(nome)
+        self.registra('metadados', inicio)
+        return BlobMedido(self, blob) if blob is not None else None
+
+    def list_blobs(self, prefix=''):
+        inicio = time.perf_counter()
+        blobs = list(self.bucket.list_blobs(prefix=prefix))
+        self.registra('listagem', inicio)
+        return [BlobMedido(self, blob) for blob in blobs]
+
+    def relatorio(self):
+        with self.trava:
+            return {operacao: dict(stats, segundos=round(stats['segundos'], 3))
+                    for operacao, stats in sorted(self.stats.items())}
+
+
+class BlobMedido:
+
+    def __init__(self, medidor, blob):
+        # atributos gravados direto no objeto: os demais (ex.: chunk_size) vão para o blob envolvido
+        object.__setattr__(self, '_medidor', medidor)
+        object.__setattr__(self, '_blob', blob)
+
+    def __getattr__(self, nome):
+        return getattr(self._blob, nome)
+
+    def __setattr__(self, nome, valor):
+        setattr(self._blob, nome, valor)
+
+    def download_as_bytes(self, **kwargs):
+        inicio = time.perf_counter()
+        conteudo = self._blob.download_as_bytes(**kwargs)
+        self._medidor.registra('download', inicio, len(conteudo))
+        return conteudo
+
+    def download_to_filename(self, caminho, **kwargs):
+        inicio = time.perf_counter()
+        self._blob.download_to_filename(caminho, **kwargs)
+        self._medidor.registra('download', inicio, os.path.getsize(caminho))
+
+    def upload_from_string(self, conteudo, **kwargs):
+        inicio = time.perf_counter()
+        self._blob.upload_from_string(conteudo, **kwargs)
+        self._medidor.registra('upload', inicio, len(conteudo.encode() if isinstance(conteudo, str) else conteudo))
+
+    def upload_from_filename(self, caminho, **kwargs):
+        inicio = time.perf_counter()
+        self._blob.upload_from_filename(caminho, **kwargs)
+        self._medidor.registra('upload', inicio, os.path.getsize(caminho))
+
+    def delete(self, **kwargs):
+        inicio = time.perf_counter()
+        self._blob.delete(**kwargs)
+        self._medidor.registra('exclusao', inicio)
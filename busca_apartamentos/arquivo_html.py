@@ -0,0 +1,209 @@
+import concurrent.futures
+import datetime
+import gzip
+import os
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from busca_apartamentos.catalogo import PREFIXO_HISTORICO
+from busca_apartamentos.escrita import TAMANHO_CHUNK_UPLOAD
+
+NOME_BLOB_ARQUIVO = 'paginas.warc.gz'
+
+
+class ArquivoHTML:
+    """
+    Arquivo das páginas coletadas por um site num dia, no formato WARC (registros 'resource' com o HTML
+    de cada anúncio, identificados pelo link e pela data da coleta), para reprocessar o histórico sem
+    coletar de novo.
+
+    Cada registro é gravado como um membro gzip independente ao final do arquivo: o arquivo só cresce,
+    continua legível por qualquer leitor de WARC/gzip e, se a execução cair no meio de uma gravação, só o
+    último registro é perdido. Pode ser usado por várias threads ao mesmo tempo.
+
+    Parâmetros:
+        caminho (str): arquivo .warc.gz local.
+        data (str): data da coleta (YYYY-MM-DD), gravada em cada registro.
+    """
+
+    def __init__(self, caminho, data):
+        self.caminho = caminho
+        self.data = data
+        self.registros = 0
+        self.trava = threading.Lock()
+
+    def grava(self, link, conteudo):
+
+        if isinstance(conteudo, str):
+            conteudo = conteudo.encode()
+
+        cabecalho = (
+            'WARC/1.0\r\n'
+            'WARC-Type: resource\r\n'
+            f'WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n'
+            f'WARC-Target-URI: {link}\r\n'
+            f'WARC-Date: {datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}\r\n'
+            f'Busca-Data-Coleta: {self.data}\r\n'
+            'Content-Type: text/html\r\n'
+            f'Content-Length: {len(conteudo)}\r\n'
+            '\r\n'
+        ).encode()
+        membro = gzip.compress(cabecalho + conteudo + b'\r\n\r\n')
+
+        with self.trava:
+            os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+            with open(self.caminho, 'ab') as f:
+                f.write(membro)
+            self.registros += 1
+
+    def salva_no_bucket(self, bucket, nome_blob):
+
+        if not os.path.exists(self.caminho):
+            return
+        blob = bucket.blob(nome_blob)
+        blob.chunk_size = TAMANHO_CHUNK_UPLOAD
+        blob.upload_from_filename(self.caminho)
+
+    def limpa(self):
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
+
+
+def le_arquivo(caminho):
+    """
+    Lê os registros de um arquivo .warc.gz, em ordem.
+
+    Um registro incompleto no final (execução interrompida durante a gravação) é ignorado.
+
+    Retorna:
+        gerador de (link, data, conteudo): data da coleta (YYYY-MM-DD) e conteúdo (bytes) de cada página.
+    """
+
+    with gzip.open(caminho, 'rb') as f:
+        while True:
+            try:
+                linha = f.readline()
+                if not linha:
+                    return
+                if not linha.startswith(b'WARC/'):
+                    continue
+
+                cabecalhos = {}
+                while True:
+                    linha = f.readline().rstrip(b'\r\n')
+                    if not linha:
+                        break
+                    nome, _, valor = linha.decode().partition(':')
+                    cabecalhos[nome.strip()] = valor.strip()
+
+                conteudo = f.read(int(cabecalhos['Content-Length']))
+            except (EOFError, gzip.BadGzipFile, KeyError, ValueError):
+                print(f'{caminho}: registro incompleto no final do arquivo ignorado')
+                return
+
+            data = cabecalhos.get('Busca-Data-Coleta') or cabecalhos.get('WARC-Date', '')[:10]
+            yield cabecalhos['WARC-Target-URI'], data, conteudo
+
+def baixa_do_bucket(bucket, site, pasta='/tmp/arquivo_html/reprocessamento'):
+    """
+    Baixa os arquivos de páginas de um site gravados no bucket ('apartamentos/imobiliaria=<site>/data=<data>/paginas.warc.gz').
+
+    Retorna:
+        list: caminhos locais dos arquivos, em ordem de data.
+    """
+
+    os.makedirs(pasta, exist_ok=True)
+
+    caminhos = []
+    for blob in bucket.list_blobs(prefix=f'{PREFIXO_HISTORICO}/imobiliaria={site}/'):
+        if blob.name.endswith(f'/{NOME_BLOB_ARQUIVO}'):
+            caminho = os.path.join(pasta, blob.name.replace('/', '_'))
+            blob.download_to_filename(caminho)
+            caminhos.append(caminho)
+
+    return sorted(caminhos)
+
+def _parse_lote(nome_site, data, paginas):
+
+    # importado aqui: os sites importam este módulo
+    from busca_apartamentos.sites import SITES
+    from busca_apartamentos.sites.base import ContextoColeta
+
+    site = SITES[nome_site](ContextoColeta(data))
+    registros = []
+    erros = []
+    for link, conteudo in paginas:
+        try:
+            registros.append(site.parse_anuncio(link, conteudo))
+        except Exception as e:
+            erros.append((link, repr(e)))
+
+    return registros, erros
+
+def _lotes(caminhos, tamanho_lote):
+
+    lote = []
+    data_lote = None
+    for caminho in caminhos:
+        for link, data, conteudo in le_arquivo(caminho):
+            if lote and (data != data_lote or len(lote) >= tamanho_lote):
+                yield data_lote, lote
+                lote = []
+            data_lote = data
+            lote.append((link, conteudo))
+    if lote:
+        yield data_lote, lote
+
+def reprocessa(nome_site, caminhos, processos=None, tamanho_lote=200):
+    """
+    Roda o `parse_anuncio` atual do site sobre páginas arquivadas, em paralelo entre os núcleos, sem
+    navegador nem rede. Útil para recuperar campos históricos depois de corrigir um parse e para medir
+    o desempenho do parse em páginas reais.
+
+    Os arquivos são lidos em sequência e as páginas são enviadas em lotes para os processos; no máximo
+    2 lotes por processo ficam em memória ao mesmo tempo. Uma página repetida (o mesmo link na mesma
+    data) fica só com o último registro.
+
+    Parâmetros:
+        nome_site (str): nome do site (chave de `SITES`).
+        caminhos (list): arquivos .warc.gz.
+        processos (int, opcional): processos em paralelo; por padrão, o número de núcleos.
+        tamanho_lote (int): páginas por lote enviado a um processo.
+
+    Retorna:
+        (pd.DataFrame, dict): anúncios extraídos e estatísticas (páginas, erros, segundos, páginas por segundo).
+    """
+
+    processos = processos or os.cpu_count() or 1
+    inicio = time.perf_counter()
+    registros = []
+    erros = []
+
+    def coleta_resultado(futuro):
+        registros_lote, erros_lote = futuro.result()
+        registros.extend(registros_lote)
+        erros.extend(erros_lote)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processos) as executor:
+        pendentes = []
+        for data, lote in _lotes(caminhos, tamanho_lote):
+            if len(pendentes) >= 2 * processos:
+                coleta_resultado(pendentes.pop(0))
+            pendentes.append(executor.submit(_parse_lote, nome_site, data, lote))
+        for futuro in pendentes:
+            coleta_resultado(futuro)
+
+    df = pd.DataFrame(registros)
+    paginas = len(df) + len(erros)
+    if not df.empty:
+        df = df.drop_duplicates(subset=['link', 'data_coleta'], keep='last').reset_index(drop=True)
+
+    segundos = round(time.perf_counter() - inicio, 3)
+    for link, erro in erros[:10]:
+        print(f'Erro ao processar {link}: {erro}')
+
+    return df, {'paginas': paginas, 'anuncios': len(df), 'erros': len(erros), 'segundos': segundos,
+                'paginas_por_segundo': round(paginas / segundos, 3) if segundos else 0.0}
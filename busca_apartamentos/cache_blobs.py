@@ -0,0 +1,195 @@
+import concurrent.futures
+import datetime
+import hashlib
+import os
+import sqlite3
+import threading
+
+
+def versao_blob(blob):
+    """
+    Identifica a versão de um blob: a geração do GCS (muda a cada gravação) ou, sem ela, o MD5 e o tamanho.
+    """
+
+    geracao = getattr(blob, 'generation', None)
+    if geracao:
+        return str(geracao)
+
+    return f'{getattr(blob, "md5_hash", None)}-{getattr(blob, "size", None)}'
+
+
+class CacheBlobs:
+    """
+    Cache local dos arquivos do bucket, para leituras repetidas do histórico (ex.: `get_data` nos notebooks).
+
+    Os arquivos diários não mudam depois de gravados: cada blob é guardado em disco identificado pelo nome
+    e pela versão (geração do GCS ou MD5) vista na última listagem, e só é baixado de novo se a versão mudar.
+    Com o cache aquecido, ler todo o histórico custa só a listagem do bucket (ou a leitura do catálogo do
+    histórico, que traz as versões das partes). O tamanho em disco é limitado
+    e os blobs acessados há mais tempo são removidos primeiro (LRU).
+
+    Tem a mesma interface do bucket usada pelos leitores (`list_blobs` e `blob(nome).download_as_bytes()`),
+    então pode ser passado no lugar dele.
+
+    Parâmetros:
+        bucket: bucket aberto com `abre_bucket`.
+        pasta (str): pasta do cache.
+        tamanho_maximo_mb (float): tamanho máximo dos arquivos em disco.
+    """
+
+    def __init__(self, bucket, pasta=os.path.expanduser('~/.cache/busca-apartamentos'), tamanho_maximo_mb=4096):
+        self.bucket = bucket
+        self.pasta = pasta
+        self.tamanho_maximo = tamanho_maximo_mb * 1024 ** 2
+        os.makedirs(os.path.join(pasta, 'blobs'), exist_ok=True)
+
+        self.trava = threading.Lock()
+        self.conexao = sqlite3.connect(os.path.join(pasta, 'cache.sqlite'), check_same_thread=False)
+        self.conexao.execute('''
+            CREATE TABLE IF NOT EXISTS blobs (
+                nome TEXT PRIMARY KEY,
+                versao TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                ultimo_acesso TEXT NOT NULL
+            )''')
+        self.conexao.commit()
+        linha = self.conexao.execute('SELECT SUM(tamanho) FROM blobs').fetchone()
+        self.tamanho_total = linha[0] or 0
+
+        # versão de cada blob na última listagem
+        self.versoes = {}
+        self.stats = {'hits': 0, 'misses': 0, 'bytes_lidos_do_cache': 0, 'bytes_baixados': 0}
+
+    def _caminho(self, nome):
+        return os.path.join(self.pasta, 'blobs', hashlib.sha256(nome.encode()).hexdigest())
+
+    def _agora(self):
+        return datetime.datetime.now().isoformat()
+
+    def list_blobs(self, prefix=''):
+
+        blobs = list(self.bucket.list_blobs(prefix=prefix))
+        for blob in blobs:
+            self.versoes[blob.name] = versao_blob(blob)
+
+        return blobs
+
+    def blob(self, nome):
+        return BlobEmCache(self, nome)
+
+    def registra_versoes(self, versoes):
+        """
+        Versões dos blobs obtidas sem listar o bucket (ex.: do catálogo do histórico).
+        """
+        self.versoes.update(versoes)
+
+    def obtem(self, nome):
+        """
+        Conteúdo do blob em cache, se a versão guardada é a da última listagem; senão, None.
+        """
+
+        versao = self.versoes.get(nome)
+        if versao is None:
+            return None
+
+        with self.trava:
+            linha = self.conexao.execute('SELECT versao FROM blobs WHERE nome = ?', (nome,)).fetchone()
+            if linha is None or linha[0] != versao or not os.path.exists(self._caminho(nome)):
+                return None
+            self.conexao.execute('UPDATE blobs SET ultimo_acesso = ? WHERE nome = ?', (self._agora(), nome))
+            self.conexao.commit()
+
+        with open(self._caminho(nome), 'rb') as f:
+            conteudo = f.read()
+        self.stats['hits'] += 1
+        self.stats['bytes_lidos_do_cache'] += len(conteudo)
+
+        return conteudo
+
+    def salva(self, nome, conteudo):
+
+        versao = self.versoes.get(nome)
+        if versao is None:
+            # sem versão conhecida não há como saber depois se o blob mudou: não guarda
+            return
+
+        caminho = self._caminho(nome)
+        with self.trava:
+            linha = self.conexao.execute('SELECT tamanho FROM blobs WHERE nome = ?', (nome,)).fetchone()
+            if linha is not None:
+                self.tamanho_total -= linha[0]
+            with open(caminho + '.tmp', 'wb') as f:
+                f.write(conteudo)
+            os.replace(caminho + '.tmp', caminho)
+            self.conexao.execute('INSERT OR REPLACE INTO blobs (nome, versao, tamanho, ultimo_acesso) VALUES (?, ?, ?, ?)',
+                                 (nome, versao, len(conteudo), self._agora()))
+            self.conexao.commit()
+            self.tamanho_total += len(conteudo)
+
+        if self.tamanho_total > self.tamanho_maximo:
+            self._remove_excedente()
+
+    def baixa(self, nome):
+
+        conteudo = self.obtem(nome)
+        if conteudo is not None:
+            return conteudo
+
+        conteudo = self.bucket.blob(nome).download_as_bytes()
+        self.stats['misses'] += 1
+        self.stats['bytes_baixados'] += len(conteudo)
+        self.salva(nome, conteudo)
+
+        return conteudo
+
+    def _remove_excedente(self):
+
+        # remove os blobs acessados há mais tempo até o cache voltar a 90% do tamanho máximo
+        with self.trava:
+            linhas = self.conexao.execute('SELECT nome, tamanho FROM blobs ORDER BY ultimo_acesso').fetchall()
+            for nome, tamanho in linhas:
+                if self.tamanho_total <= 0.9 * self.tamanho_maximo:
+                    break
+                self.conexao.execute('DELETE FROM blobs WHERE nome = ?', (nome,))
+                if os.path.exists(self._caminho(nome)):
+                    os.remove(self._caminho(nome))
+                self.tamanho_total -= tamanho
+
+            self.conexao.commit()
+
+    def atualiza(self, prefix='', max_workers=16):
+        """
+        Lista o bucket e baixa, em paralelo, só os blobs novos ou que mudaram desde a última cópia local.
+
+        Retorna:
+            dict: blobs listados, baixados e já em cache.
+        """
+
+        nomes = [blob.name for blob in self.list_blobs(prefix=prefix)]
+        with self.trava:
+            guardados = dict(self.conexao.execute('SELECT nome, versao FROM blobs').fetchall())
+        pendentes = [nome for nome in nomes if guardados.get(nome) != self.versoes[nome]]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(self.baixa, pendentes))
+
+        return {'listados': len(nomes), 'baixados': len(pendentes), 'em_cache': len(nomes) - len(pendentes)}
+
+    def relatorio(self):
+
+        consultas = self.stats['hits'] + self.stats['misses']
+        relatorio = dict(self.stats)
+        relatorio['taxa_de_hit'] = round(self.stats['hits'] / consultas, 3) if consultas else 0.0
+        relatorio['mb_em_disco'] = round(self.tamanho_total / 1024 ** 2, 1)
+
+        return relatorio
+
+
+class BlobEmCache:
+
+    def __init__(self, cache, nome):
+        self.cache = cache
+        self.name = nome
+
+    def download_as_bytes(self):
+        return self.cache.baixa(self.name)
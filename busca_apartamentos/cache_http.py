@@ -0,0 +1,162 @@
+import datetime
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+
+from busca_apartamentos.http_async import busca_paginas
+
+
+class CacheHTTP:
+    """
+    Cache em disco das páginas baixadas, endereçado pelo conteúdo e limitado por tamanho (LRU).
+
+    Os corpos são gravados comprimidos em `pasta/corpos/<sha256>.gz`, de forma que páginas idênticas
+    ocupam espaço uma única vez. Um SQLite guarda, para cada url, o hash do corpo, os validadores
+    (ETag e Last-Modified) usados nas requisições condicionais e o último acesso, usado na remoção LRU.
+
+    Parâmetros:
+        pasta (str): pasta do cache.
+        tamanho_maximo_mb (float): tamanho máximo dos corpos comprimidos em disco.
+    """
+
+    def __init__(self, pasta='/tmp/cache_http', tamanho_maximo_mb=1024):
+        self.pasta = pasta
+        self.tamanho_maximo = tamanho_maximo_mb * 1024 ** 2
+        os.makedirs(os.path.join(pasta, 'corpos'), exist_ok=True)
+
+        self.trava = threading.Lock()
+        self.conexao = sqlite3.connect(os.path.join(pasta, 'cache.sqlite'), check_same_thread=False)
+        self.conexao.execute('''
+            CREATE TABLE IF NOT EXISTS paginas (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                ultimo_acesso TEXT NOT NULL
+            )''')
+        self.conexao.commit()
+        self.tamanho_total = self._tamanho_em_disco()
+
+        # validadores recebidos numa revalidação cujo corpo será salvo depois (ex.: HTML renderizado pelo navegador)
+        self.pendentes = {}
+        self.confirmados = set()
+        self.stats = {'hits': 0, 'misses': 0, 'bytes_economizados': 0, 'bytes_baixados': 0}
+
+    def _caminho(self, hash_corpo):
+        return os.path.join(self.pasta, 'corpos', f'{hash_corpo}.gz')
+
+    def _agora(self):
+        return datetime.datetime.now().isoformat()
+
+    def _tamanho_em_disco(self):
+        linha = self.conexao.execute('SELECT SUM(tamanho) FROM (SELECT MAX(tamanho) AS tamanho FROM paginas GROUP BY hash)').fetchone()
+        return linha[0] or 0
+
+    def validadores(self, url):
+        """
+        Cabeçalhos da requisição condicional para a url, ou {} se ela não está no cache.
+        """
+
+        with self.trava:
+            linha = self.conexao.execute('SELECT etag, last_modified FROM paginas WHERE url = ?', (url,)).fetchone()
+
+        if linha is None:
+            return {}
+
+        headers = {}
+        if linha[0]:
+            headers['If-None-Match'] = linha[0]
+        if linha[1]:
+            headers['If-Modified-Since'] = linha[1]
+
+        return headers
+
+    def obtem(self, url):
+
+        with self.trava:
+            linha = self.conexao.execute('SELECT hash FROM paginas WHERE url = ?', (url,)).fetchone()
+            if linha is None or not os.path.exists(self._caminho(linha[0])):
+                return None
+            self.conexao.execute('UPDATE paginas SET ultimo_acesso = ? WHERE url = ?', (self._agora(), url))
+            self.conexao.commit()
+
+        with gzip.open(self._caminho(linha[0]), 'rb') as f:
+            return f.read()
+
+    def registra_hit(self, url, conteudo):
+        self.stats['hits'] += 1
+        self.stats['bytes_economizados'] += len(conteudo)
+        self.confirmados.add(url)
+
+    def registra_miss(self, conteudo):
+        self.stats['misses'] += 1
+        self.stats['bytes_baixados'] += len(conteudo)
+
+    def salva(self, url, conteudo, etag=None, last_modified=None):
+
+        if etag is None and last_modified is None:
+            etag, last_modified = self.pendentes.pop(url, (None, None))
+
+        hash_corpo = hashlib.sha256(conteudo).hexdigest()
+        caminho = self._caminho(hash_corpo)
+        with self.trava:
+            if not os.path.exists(caminho):
+                with gzip.open(caminho + '.tmp', 'wb') as f:
+                    f.write(conteudo)
+                os.replace(caminho + '.tmp', caminho)
+                self.tamanho_total += os.path.getsize(caminho)
+
+            self.conexao.execute('''
+                INSERT OR REPLACE INTO paginas (url, hash, tamanho, etag, last_modified, ultimo_acesso)
+                VALUES (?, ?, ?, ?, ?, ?)''',
+                (url, hash_corpo, os.path.getsize(caminho), etag, last_modified, self._agora()))
+            self.conexao.commit()
+
+        if self.tamanho_total > self.tamanho_maximo:
+            self._remove_excedente()
+
+    def _remove_excedente(self):
+
+        # remove os corpos acessados há mais tempo até o cache voltar a 90% do tamanho máximo
+        with self.trava:
+            corpos = self.conexao.execute('''
+                SELECT hash, MAX(tamanho), MAX(ultimo_acesso) AS acesso FROM paginas GROUP BY hash ORDER BY acesso''').fetchall()
+
+            for hash_corpo, tamanho, _ in corpos:
+                if self.tamanho_total <= 0.9 * self.tamanho_maximo:
+                    break
+                self.conexao.execute('DELETE FROM paginas WHERE hash = ?', (hash_corpo,))
+                if os.path.exists(self._caminho(hash_corpo)):
+                    os.remove(self._caminho(hash_corpo))
+                self.tamanho_total -= tamanho
+
+            self.conexao.commit()
+
+    def relatorio(self):
+
+        consultas = self.stats['hits'] + self.stats['misses']
+        relatorio = dict(self.stats)
+        relatorio['taxa_de_hit'] = round(self.stats['hits'] / consultas, 3) if consultas else 0.0
+
+        return relatorio
+
+
+def revalida(cache, links, concorrencia=16, **kwargs_busca):
+    """
+    Faz requisições condicionais para os links e retorna {link: corpo em cache} dos que não mudaram.
+
+    Usado pelos buscadores com navegador: o corpo do cache é o HTML renderizado, então uma resposta
+    200 não é salva; os validadores dela ficam pendentes até o navegador salvar a página renderizada.
+    Só os links com ETag ou Last-Modified no cache são revalidados: para os demais, a requisição seria
+    um GET completo, descartado em seguida, e a página seria baixada de novo pelo navegador.
+    """
+
+    condicionais = [link for link in links if cache.validadores(link)]
+
+    # `confirmados` não é zerado aqui: o mesmo cache pode estar sendo revalidado por outro site ao mesmo tempo
+    conteudos, _ = busca_paginas(condicionais, concorrencia=concorrencia, cache=cache, salva_no_cache=False, **kwargs_busca)
+
+    return {link: conteudos[link] for link in condicionais if link in cache.confirmados}
@@ -0,0 +1,127 @@
+import json
+import random
+import re
+import threading
+import time
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from busca_apartamentos.cache_blobs import versao_blob
+
+# histórico particionado no estilo Hive: apartamentos/imobiliaria=<site>/data=<YYYY-MM-DD>/parte-<execução>-00001.parquet
+PREFIXO_HISTORICO = 'apartamentos'
+NOME_CATALOGO = f'{PREFIXO_HISTORICO}/_catalogo.json'
+VERSAO_ESQUEMA = 1
+
+PADRAO_PARTICAO = re.compile(rf'^{PREFIXO_HISTORICO}/imobiliaria=([^/]+)/data=(\d{{4}}-\d{{2}}-\d{{2}})(?:/(.+))?$')
+
+# sites gravando ao mesmo tempo no mesmo processo atualizam o catálogo um de cada vez
+_TRAVA_CATALOGO = threading.Lock()
+
+
+def prefixo_particao(site, data):
+    return f'{PREFIXO_HISTORICO}/imobiliaria={site}/data={data}'
+
+def le_catalogo(bucket):
+    """
+    Lê o catálogo do histórico com uma única requisição.
+
+    Retorna:
+        dict: {'versao_esquema', 'atualizado_em', 'particoes': [...]}, ou None se o bucket ainda não tem catálogo.
+    """
+
+    try:
+        return json.loads(bucket.blob(NOME_CATALOGO).download_as_bytes())
+    except NotFound:
+        return None
+
+def registra_particoes(bucket, entradas, tentativas=10):
+    """
+    Inclui (ou substitui) partições no catálogo do histórico.
+
+    O catálogo é atualizado por leitura e gravação condicionadas à geração lida (`if_generation_match`):
+    se outro processo gravou o catálogo no meio tempo, a atualização é refeita sobre a versão nova.
+
+    Parâmetros:
+        entradas (list): partições, cada uma com imobiliaria, data, registros, bytes, versao_esquema,
+            checksum, colunas e partes (nome, registros, bytes, versao e md5 de cada parte) e, nos dados
+            derivados de outra partição (ex.: tratados), a origem.
+    """
+
+    with _TRAVA_CATALOGO:
+        for tentativa in range(1, tentativas + 1):
+            blob = bucket.get_blob(NOME_CATALOGO)
+            if blob is None:
+                geracao = 0
+                particoes = {}
+            else:
+                geracao = blob.generation
+                try:
+                    catalogo = json.loads(blob.download_as_bytes(if_generation_match=geracao))
+                except PreconditionFailed:
+                    continue
+                particoes = {(p['imobiliaria'], p['data']): p for p in catalogo['particoes']}
+
+            for entrada in entradas:
+                particoes[(entrada['imobiliaria'], entrada['data'])] = entrada
+
+            catalogo = {
+                'versao_esquema': VERSAO_ESQUEMA,
+                'atualizado_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'particoes': [particoes[chave] for chave in sorted(particoes)],
+            }
+            try:
+                bucket.blob(NOME_CATALOGO).upload_from_string(json.dumps(catalogo, separators=(',', ':')),
+                                                              content_type='application/json', if_generation_match=geracao)
+                return catalogo
+            except PreconditionFailed:
+                # outro processo atualizou o catálogo: tenta de novo sobre a versão nova
+                time.sleep(random.uniform(0, 0.5 * tentativa))
+
+        raise RuntimeError(f'Não foi possível atualizar {NOME_CATALOGO} após {tentativas} tentativas')
+
+def entrada_do_manifesto(manifesto):
+    """
+    Entrada do catálogo a partir do manifesto de uma partição; None se o prefixo não é uma partição do histórico.
+    """
+
+    encontrado = PADRAO_PARTICAO.match(manifesto['prefixo'])
+    if not encontrado:
+        return None
+    site, data, _ = encontrado.groups()
+
+    entrada = {
+        'imobiliaria': site,
+        'data': data,
+        'registros': manifesto['registros'],
+        'bytes': sum(parte['bytes'] for parte in manifesto['partes']),
+        'versao_esquema': manifesto.get('versao_esquema', VERSAO_ESQUEMA),
+        'checksum': manifesto.get('checksum'),
+        'colunas': manifesto['colunas'],
+        'partes': manifesto['partes'],
+    }
+    if manifesto.get('origem') is not None:
+        entrada['origem'] = manifesto['origem']
+
+    return entrada
+
+def reconstroi_catalogo(bucket):
+    """
+    Monta o catálogo a partir dos manifestos das partições já gravadas (uma listagem do histórico e uma
+    leitura por manifesto). Usado uma única vez, para buckets com partições gravadas antes do catálogo.
+    """
+
+    blobs = list(bucket.list_blobs(prefix=f'{PREFIXO_HISTORICO}/'))
+    versoes = {blob.name: versao_blob(blob) for blob in blobs}
+
+    entradas = []
+    for blob in blobs:
+        if blob.name.endswith('/manifesto.json') and PADRAO_PARTICAO.match(blob.name):
+            entrada = entrada_do_manifesto(json.loads(blob.download_as_bytes()))
+            if entrada is not None:
+                # manifestos gravados antes do catálogo não têm a versão das partes
+                for parte in entrada['partes']:
+                    parte.setdefault('versao', versoes.get(parte['nome']))
+                entradas.append(entrada)
+
+    return registra_particoes(bucket, entradas)
@@ -0,0 +1,130 @@
+import datetime
+import glob
+import json
+import os
+import shutil
+
+import pandas as pd
+
+
+class CheckpointColeta:
+    """
+    Checkpoint local de uma execução de coleta, para que uma nova execução no mesmo dia continue
+    de onde a anterior parou.
+
+    Os registros coletados são gravados em segmentos JSONL (`segmento-00001.jsonl`, ...) que nunca são
+    reescritos, e o arquivo `progresso.json` guarda o cursor da execução: o resultado das etapas já
+    concluídas (ex.: a lista de links da listagem) e quantos segmentos e links já foram gravados.
+
+    Parâmetros:
+        site (str): nome do site.
+        data (str, opcional): data da coleta (YYYY-MM-DD); por padrão, hoje.
+        pasta (str): pasta raiz dos checkpoints.
+    """
+
+    def __init__(self, site, data=None, pasta='/tmp/checkpoints'):
+        self.site = site
+        self.data = data or datetime.datetime.today().strftime('%Y-%m-%d')
+        self.pasta = os.path.join(pasta, site, self.data)
+        os.makedirs(self.pasta, exist_ok=True)
+
+        self.caminho_progresso = os.path.join(self.pasta, 'progresso.json')
+        if os.path.exists(self.caminho_progresso):
+            with open(self.caminho_progresso) as f:
+                self.progresso = json.load(f)
+        else:
+            self.progresso = {'etapas': {}, 'segmentos': 0, 'links_concluidos': 0}
+
+    def _grava_atomico(self, caminho, texto):
+
+        # escreve num arquivo temporário e renomeia, para que uma queda no meio nunca deixe um arquivo pela metade
+        with open(caminho + '.tmp', 'w') as f:
+            f.write(texto)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(caminho + '.tmp', caminho)
+
+    def _salva_progresso(self):
+        self._grava_atomico(self.caminho_progresso, json.dumps(self.progresso, default=str))
+
+    def etapa(self, nome, funcao):
+        """
+        Retorna o resultado salvo da etapa `nome` ou executa `funcao()` e salva o resultado (serializável em JSON).
+        """
+
+        if nome in self.progresso['etapas']:
+            print(f'Etapa "{nome}" retomada do checkpoint')
+            return self.progresso['etapas'][nome]
+
+        resultado = funcao()
+        self.progresso['etapas'][nome] = resultado
+        self._salva_progresso()
+
+        return resultado
+
+    def _ultimo_segmento(self):
+
+        numeros = [int(os.path.basename(caminho)[len('segmento-'):-len('.jsonl')])
+                   for caminho in glob.glob(os.path.join(self.pasta, 'segmento-*.jsonl'))]
+        return max(numeros, default=0)
+
+    def salva_segmento(self, registros):
+
+        if not registros:
+            return
+
+        # o número do segmento vem dos arquivos na pasta: uma queda entre gravar o segmento e salvar o
+        # progresso deixa um segmento que o progresso não conta, e ele não pode ser sobrescrito
+        self.progresso['segmentos'] = max(self.progresso['segmentos'], self._ultimo_segmento()) + 1
+        caminho = os.path.join(self.pasta, f"segmento-{self.progresso['segmentos']:05d}.jsonl")
+        self._grava_atomico(caminho, ''.join(json.dumps(registro, default=str) + '\n' for registro in registros))
+
+        self.progresso['links_concluidos'] += len(registros)
+        self._salva_progresso()
+
+    def registros(self):
+
+        registros = []
+        for caminho in sorted(glob.glob(os.path.join(self.pasta, 'segmento-*.jsonl'))):
+            with open(caminho) as f:
+                registros += [json.loads(linha) for linha in f if linha.strip()]
+
+        return registros
+
+    def links_concluidos(self):
+        return {registro['link'] for registro in self.registros()}
+
+    def limpa(self):
+        """
+        Remove o checkpoint do dia; chamado depois que o arquivo final foi salvo no bucket.
+        """
+        shutil.rmtree(self.pasta, ignore_errors=True)
+
+
+def coleta_em_lotes(checkpoint, links, coleta, tamanho_lote=200):
+    """
+    Coleta os links em lotes, gravando um segmento no checkpoint ao fim de cada lote. Os links que já
+    estão no checkpoint não são coletados de novo.
+
+    Parâmetros:
+        checkpoint (CheckpointColeta): checkpoint da execução.
+        links (list): links a coletar.
+        coleta (callable): recebe uma lista de links e retorna um DataFrame com os registros coletados.
+        tamanho_lote (int): número de links coletados entre dois segmentos.
+
+    Retorna:
+        pd.DataFrame: registros de todos os links, os retomados do checkpoint e os coletados agora.
+    """
+
+    concluidos = checkpoint.links_concluidos()
+    pendentes = [link for link in links if link not in concluidos]
+    if concluidos:
+        print(f'{len(links) - len(pendentes)} de {len(links)} anúncios retomados do checkpoint')
+
+    for inicio in range(0, len(pendentes), tamanho_lote):
+        lote = pendentes[inicio:inicio + tamanho_lote]
+        print(f'Lote {inicio // tamanho_lote + 1}: {len(lote)} anúncios ({inicio + len(lote)} de {len(pendentes)})')
+        checkpoint.salva_segmento(coleta(lote).to_dict('records'))
+
+    links = set(links)
+    return pd.DataFrame([registro for registro in checkpoint.registros() if registro['link'] in links])
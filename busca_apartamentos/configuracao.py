@@ -0,0 +1,31 @@
+import os
+
+# configuração comum a todos os buscadores, lida das variáveis de ambiente do container
+
+N_NAVEGADORES = int(os.environ.get('N_NAVEGADORES', 4))
+PAGINAS_POR_NAVEGADOR = int(os.environ.get('PAGINAS_POR_NAVEGADOR', 100))
+CONCORRENCIA = int(os.environ.get('CONCORRENCIA', 16))
+REQUISICOES_POR_SEGUNDO = float(os.environ.get('REQUISICOES_POR_SEGUNDO', 0))
+TIMEOUT_PAGINA = float(os.environ.get('TIMEOUT_PAGINA', 60))
+BLOQUEIA_RECURSOS = os.environ.get('BLOQUEIA_RECURSOS', '1') == '1'
+
+MODO_INCREMENTAL = os.environ.get('MODO_INCREMENTAL', '0') == '1'
+IDADE_MAXIMA_DIAS = int(os.environ.get('IDADE_MAXIMA_DIAS', 7))
+BUCKET_INDICE = os.environ.get('BUCKET_INDICE', 'busca-apartamentos-indice')
+PASTA_CACHE_HTTP = os.environ.get('PASTA_CACHE_HTTP', '')
+TAMANHO_CACHE_MB = float(os.environ.get('TAMANHO_CACHE_MB', 1024))
+PASTA_CHECKPOINT = os.environ.get('PASTA_CHECKPOINT', '/tmp/checkpoints')
+TAMANHO_LOTE = int(os.environ.get('TAMANHO_LOTE', 200))
+PASTA_ARQUIVO = os.environ.get('PASTA_ARQUIVO', '/tmp/arquivo_html')
+AMOSTRA_COBERTURA = int(os.environ.get('AMOSTRA_COBERTURA', 20))
+ARQUIVO_METRICAS = os.environ.get('ARQUIVO_METRICAS', '')
+ARMAZENAMENTO = os.environ.get('ARMAZENAMENTO', 'gcs')
+PASTA_ARMAZENAMENTO = os.environ.get('PASTA_ARMAZENAMENTO', '/tmp/buckets')
+MEDE_ARMAZENAMENTO = os.environ.get('MEDE_ARMAZENAMENTO', '0') == '1'
+# processos do tratamento em paralelo (0: um por núcleo)
+PROCESSOS_TRATAMENTO = int(os.environ.get('PROCESSOS_TRATAMENTO', 0))
+
+BUCKET_DADOS = 'busca-apartamentos-bucket'
+# dados brutos tratados por partição (site e data), com as regras de `busca_apartamentos/tratamento.py`
+BUCKET_TRATADOS = os.environ.get('BUCKET_TRATADOS', 'busca-apartamentos-tratados')
+SITES = os.environ.get('SITES', 'apolar,cilar,razao')
@@ -0,0 +1,51 @@
+from busca_apartamentos.http_async import busca_paginas
+from busca_apartamentos.parsing import cria_soup
+
+
+def soup_da_pagina(conteudo, strainer=None):
+    return cria_soup(conteudo, strainer)
+
+def descobre_links(urls_paginas, extrai_links, fallback_selenium=None, concorrencia=8, **kwargs_busca):
+    """
+    Coleta os links dos anúncios buscando as páginas de listagem diretamente via HTTP, em paralelo.
+
+    Uma página é considerada renderizada no cliente quando a busca falha, quando não tem nenhum
+    anúncio no HTML ou quando repete exatamente os anúncios de outra página (o site ignorou o
+    parâmetro de paginação). Só essas páginas são enviadas para o `fallback_selenium`.
+
+    Parâmetros:
+        urls_paginas (list): urls das páginas de listagem.
+        extrai_links (callable): recebe o conteúdo (bytes) de uma página e retorna a lista de links.
+        fallback_selenium (callable, opcional): recebe as urls que precisam de navegador e retorna a lista de links.
+        concorrencia (int): número máximo de requisições simultâneas.
+
+    Retorna:
+        list: links únicos, na ordem das páginas.
+    """
+
+    conteudos, stats = busca_paginas(urls_paginas, concorrencia=concorrencia, **kwargs_busca)
+    print(f'Páginas de listagem buscadas via HTTP: {stats}')
+
+    links = []
+    paginas_vistas = set()
+    renderizadas_no_cliente = []
+
+    for url in urls_paginas:
+        conteudo = conteudos.get(url)
+        links_pagina = extrai_links(conteudo) if conteudo else []
+        assinatura = frozenset(links_pagina)
+
+        if not links_pagina or assinatura in paginas_vistas:
+            renderizadas_no_cliente.append(url)
+            continue
+
+        paginas_vistas.add(assinatura)
+        links.extend(links_pagina)
+
+    if renderizadas_no_cliente:
+        print(f'{len(renderizadas_no_cliente)} de {len(urls_paginas)} páginas sem anúncios no HTML')
+        if fallback_selenium is not None:
+            print('Usando o navegador para essas páginas')
+            links.extend(fallback_selenium(renderizadas_no_cliente))
+
+    return list(dict.fromkeys(links))
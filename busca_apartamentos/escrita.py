@@ -0,0 +1,183 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from busca_apartamentos.cache_blobs import versao_blob
+from busca_apartamentos.catalogo import VERSAO_ESQUEMA, entrada_do_manifesto, prefixo_particao, registra_particoes
+
+# uploads com chunk_size definido usam o upload resumível do GCS (múltiplo de 256 KB)
+TAMANHO_CHUNK_UPLOAD = 8 * 1024 * 1024
+
+
+def _como_texto(valor):
+    return None if not isinstance(valor, (list, dict)) and pd.isna(valor) else str(valor)
+
+
+class EscritorPartes:
+    """
+    Grava registros no bucket em partes Parquet comprimidas, à medida que são recebidos.
+
+    Cada parte é escrita num diretório temporário exclusivo da execução (execuções simultâneas nunca
+    compartilham arquivos), enviada com upload resumível e apagada do disco. As partes têm nomes
+    exclusivos da execução (`parte-<execução>-00001.parquet`), então regravar um prefixo nunca sobrescreve
+    as partes que o manifesto e o catálogo em uso apontam. Ao fechar, um `manifesto.json` com as partes,
+    o número de registros e as colunas é gravado no mesmo prefixo; a presença do manifesto indica que a
+    execução terminou. Se o prefixo é uma partição do histórico, a partição é incluída também no catálogo
+    do bucket (`busca_apartamentos/catalogo.py`). Só depois disso as partes de gravações anteriores do
+    prefixo são apagadas (`apaga_partes_substituidas`).
+
+    Nos dados brutos, todas as colunas são gravadas como texto, com listas no mesmo formato do CSV antigo
+    (`str(lista)`), de forma que o tratamento dos dados lê as partes exatamente como lia o CSV. Com
+    `tipado`, as colunas numéricas, booleanas e de data mantêm o tipo e só as demais viram texto.
+
+    Parâmetros:
+        bucket: bucket aberto com `abre_bucket` (GCS, pasta local ou memória).
+        prefixo (str): prefixo das partes, ex.: prefixo_particao('razao', '2024-01-31').
+        registros_por_parte (int): registros acumulados antes de gravar uma parte.
+        compressao (str): codec do Parquet.
+        tipado (bool): mantém os tipos das colunas (dados tratados) em vez de gravar tudo como texto.
+        origem (dict, opcional): de onde vieram os dados (ex.: checksum da partição bruta e versão do
+            tratamento), gravado no manifesto e no catálogo.
+        registra_no_catalogo (bool): inclui a partição no catálogo ao fechar; sem isso, quem grava várias
+            partições (ex.: em processos separados) pode registrá-las de uma vez com `registra_particoes`
+            e, depois de registrá-las, apagar as partes antigas com `apaga_partes_substituidas`.
+
+    Uso:
+        with EscritorPartes(bucket, prefixo) as escritor:
+            escritor.adiciona(registros)
+    """
+
+    def __init__(self, bucket, prefixo, registros_por_parte=5000, compressao='zstd', tipado=False, origem=None,
+                 registra_no_catalogo=True):
+        self.bucket = bucket
+        self.prefixo = prefixo
+        self.registros_por_parte = registros_por_parte
+        self.compressao = compressao
+        self.tipado = tipado
+        self.origem = origem
+        self.registra_no_catalogo = registra_no_catalogo
+
+        self.pasta_temporaria = tempfile.mkdtemp(prefix='escritor-partes-')
+        self.execucao = f"{datetime.datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.buffer = []
+        self.partes = []
+        self.colunas = []
+
+    def adiciona(self, registros):
+
+        self.buffer += list(registros)
+        while len(self.buffer) >= self.registros_por_parte:
+            self._grava_parte(self.buffer[:self.registros_por_parte])
+            self.buffer = self.buffer[self.registros_por_parte:]
+
+    def _grava_parte(self, registros):
+
+        df = pd.DataFrame(registros)
+        for coluna in df.columns:
+            if not self.tipado or df[coluna].dtype == object:
+                df[coluna] = df[coluna].apply(_como_texto)
+            if coluna not in self.colunas:
+                self.colunas.append(coluna)
+
+        nome = f'{self.prefixo}/parte-{self.execucao}-{len(self.partes) + 1:05d}.parquet'
+        caminho = os.path.join(self.pasta_temporaria, os.path.basename(nome))
+        if self.tipado:
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+        else:
+            tabela = pa.Table.from_pandas(df, schema=pa.schema([(coluna, pa.string()) for coluna in df.columns]), preserve_index=False)
+        pq.write_table(tabela, caminho, compression=self.compressao)
+
+        with open(caminho, 'rb') as f:
+            md5 = hashlib.md5(f.read()).hexdigest()
+
+        blob = self.bucket.blob(nome)
+        blob.chunk_size = TAMANHO_CHUNK_UPLOAD
+        blob.upload_from_filename(caminho)
+
+        self.partes.append({'nome': nome, 'registros': len(df), 'bytes': os.path.getsize(caminho),
+                            'versao': versao_blob(blob), 'md5': md5})
+        os.remove(caminho)
+
+    def fecha(self):
+        """
+        Grava os registros restantes e o manifesto. Retorna o manifesto.
+        """
+
+        if self.buffer:
+            self._grava_parte(self.buffer)
+            self.buffer = []
+
+        manifesto = {
+            'prefixo': self.prefixo,
+            'partes': self.partes,
+            'registros': sum(parte['registros'] for parte in self.partes),
+            'colunas': self.colunas,
+            'versao_esquema': VERSAO_ESQUEMA,
+            'tipado': self.tipado,
+            'checksum': hashlib.sha256(''.join(parte['md5'] for parte in self.partes).encode()).hexdigest(),
+            'criado_em': datetime.datetime.now().isoformat(),
+        }
+        if self.origem is not None:
+            manifesto['origem'] = self.origem
+        self.bucket.blob(f'{self.prefixo}/manifesto.json').upload_from_string(json.dumps(manifesto, indent=2), content_type='application/json')
+        shutil.rmtree(self.pasta_temporaria, ignore_errors=True)
+
+        entrada = entrada_do_manifesto(manifesto)
+        if self.registra_no_catalogo:
+            if entrada is not None:
+                registra_particoes(self.bucket, [entrada])
+            # quem lê pelo manifesto ou pelo catálogo já vê as partes novas: as antigas podem ser apagadas
+            apaga_partes_substituidas(self.bucket, manifesto)
+
+        return manifesto
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_erro, *args):
+
+        # numa falha, o manifesto não é gravado e a execução fica marcada como incompleta
+        if tipo_erro is None:
+            self.fecha()
+        else:
+            shutil.rmtree(self.pasta_temporaria, ignore_errors=True)
+
+
+def apaga_partes_substituidas(bucket, manifesto):
+    """
+    Apaga as partes do prefixo do manifesto que não estão nele: as de gravações anteriores do mesmo
+    prefixo e as de execuções que caíram antes do manifesto. Chamada só depois que o manifesto e a
+    entrada do catálogo foram gravados, para que quem leu o catálogo anterior ainda encontre as partes.
+    """
+
+    nomes_partes = {parte['nome'] for parte in manifesto['partes']}
+    for blob in bucket.list_blobs(prefix=f"{manifesto['prefixo']}/"):
+        if blob.name.endswith('.parquet') and blob.name not in nomes_partes:
+            blob.delete()
+
+def salva_partes_no_bucket(bucket, site, dados, data=None, registros_por_parte=5000, tipado=False, origem=None,
+                           registra_no_catalogo=True):
+    """
+    Grava o DataFrame do dia em partes Parquet na partição do site e da data
+    ('apartamentos/imobiliaria=<site>/data=<data>/').
+
+    Retorna:
+        dict: o manifesto da execução.
+    """
+
+    data = data or datetime.datetime.today().strftime('%Y-%m-%d')
+    escritor = EscritorPartes(bucket, prefixo_particao(site, data), registros_por_parte, tipado=tipado, origem=origem,
+                              registra_no_catalogo=registra_no_catalogo)
+    for inicio in range(0, len(dados), registros_por_parte):
+        escritor.adiciona(dados.iloc[inicio:inicio + registros_por_parte].to_dict('records'))
+
+    return escritor.fecha()
+
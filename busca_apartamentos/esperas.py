@@ -0,0 +1,80 @@
+import time
+
+import pandas as pd
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.wait import WebDriverWait
+
+
+class RelatorioEsperas:
+    """
+    Acumula o tempo gasto em cada espera da execução e o compara com o `time.sleep` fixo que ela substituiu.
+    """
+
+    def __init__(self):
+        self.registros = []
+
+    def registra(self, nome, segundos, orcamento_antigo, atendida):
+        self.registros.append({'espera': nome, 'segundos': segundos, 'orcamento_antigo': orcamento_antigo, 'atendida': atendida})
+
+    def resumo(self):
+
+        df = pd.DataFrame(self.registros, columns=['espera', 'segundos', 'orcamento_antigo', 'atendida'])
+        resumo = df.groupby('espera').agg(esperas=('segundos', 'size'),
+                                          timeouts=('atendida', lambda x: int((~x.astype(bool)).sum())),
+                                          segundos=('segundos', 'sum'),
+                                          orcamento_antigo=('orcamento_antigo', 'sum'))
+        resumo.loc['total'] = resumo.sum()
+        resumo[['esperas', 'timeouts']] = resumo[['esperas', 'timeouts']].astype(int)
+        resumo['economia'] = resumo['orcamento_antigo'] - resumo['segundos']
+
+        return resumo.round(2)
+
+
+def espera(driver, condicao, timeout=30, nome='espera', orcamento_antigo=0.0, relatorio=None, intervalo=0.2):
+    """
+    Bloqueia até `condicao(driver)` ser verdadeira ou até `timeout` segundos.
+
+    Parâmetros:
+        condicao (callable): recebe o driver e retorna um valor verdadeiro quando a página estiver pronta.
+        timeout (float): tempo máximo de espera, em segundos.
+        nome (str): nome da espera no relatório.
+        orcamento_antigo (float): segundos do `time.sleep` fixo que esta espera substitui.
+        relatorio (RelatorioEsperas, opcional): relatório onde a espera é registrada.
+
+    Retorna:
+        O valor retornado pela condição, ou False se o tempo máximo foi atingido.
+    """
+
+    inicio = time.perf_counter()
+    try:
+        resultado = WebDriverWait(driver, timeout, poll_frequency=intervalo,
+                                  ignored_exceptions=(NoSuchElementException, StaleElementReferenceException)).until(condicao)
+    except TimeoutException:
+        resultado = False
+
+    if relatorio is not None:
+        relatorio.registra(nome, time.perf_counter() - inicio, orcamento_antigo, bool(resultado))
+
+    return resultado
+
+
+## Condições
+
+def elemento_presente(localizador):
+    return EC.presence_of_element_located(localizador)
+
+def elemento_clicavel(localizador):
+    return EC.element_to_be_clickable(localizador)
+
+def quantidade_aumentou(localizador, quantidade_anterior):
+    return lambda driver: len(driver.find_elements(*localizador)) > quantidade_anterior
+
+def altura_aumentou(altura_anterior):
+    return lambda driver: driver.execute_script("return document.body.scrollHeight") > altura_anterior
+
+def texto_diferente(localizador, texto):
+    return lambda driver: driver.find_element(*localizador).text.strip() != str(texto)
+
+def qualquer(*condicoes):
+    return EC.any_of(*condicoes)
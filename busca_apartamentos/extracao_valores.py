@@ -0,0 +1,222 @@
+import ast
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+
+# 'Condomínio R$ 1.100,00' -> ('Condomínio', '1.100,00')
+PADRAO_VALOR_ROTULADO = re.compile(r'(\w+)\sR\$\s(\d{1,3}(?:\.\d{3})*(?:,\d{2})?)')
+# primeiro número precedido de espaço num item (' 3 vagas' -> '3')
+PADRAO_NUMERO_ITEM = re.compile(r'\s(\d{1,3}(?:[.,]\d{3})*(?:[.,]\d{2})?)')
+# separador de milhar: ponto seguido de três dígitos e de vírgula ou do fim ('1.200,50', '1.200')
+PADRAO_MILHAR = re.compile(r'\.(?=\d{3}(?:,|$))')
+
+# listas de textos gravadas como texto ("['Quartos', '2']"), sem escapes
+_ITEM_LISTA = r"'[^'\\]*'|\"[^\"\\]*\""
+PADRAO_LISTA = re.compile(rf'\[(?:(?:{_ITEM_LISTA})(?:, (?:{_ITEM_LISTA}))*)?\]')
+PADRAO_ITEM_LISTA = re.compile(r"'([^'\\]*)'|\"([^\"\\]*)\"")
+
+
+def por_valor_unico(serie, funcao, colunas, nulo):
+    """
+    Aplica `funcao` uma única vez por valor distinto da série e repete o resultado nas linhas: no
+    histórico, o mesmo anúncio aparece com o mesmo texto em várias datas.
+
+    Parâmetros:
+        serie (pd.Series): coluna de texto.
+        funcao (callable): recebe um valor não nulo e devolve um item por coluna.
+        colunas (list): nomes das colunas devolvidas.
+        nulo (tuple): resultado das linhas nulas.
+
+    Retorna:
+        pd.DataFrame: uma linha por linha da série, com o mesmo índice.
+    """
+
+    try:
+        codigos, unicos = pd.factorize(serie)
+    except TypeError:
+        # listas (ex.: detalhes vindos direto do buscador, antes de gravados como texto) são agrupadas como tuplas
+        codigos, unicos = pd.factorize(serie.map(lambda valor: tuple(valor) if isinstance(valor, list) else valor))
+    resultados = [funcao(valor) for valor in unicos] + [nulo]
+    linhas = np.where(codigos == -1, len(unicos), codigos)
+
+    # cada coluna é montada a partir dos valores distintos e depois repetida nas linhas
+    return pd.DataFrame({coluna: pd.Series(valores).to_numpy()[linhas]
+                         for coluna, valores in zip(colunas, zip(*resultados))}, index=serie.index)
+
+def lista_de_texto(texto):
+    """
+    Lê uma lista de textos gravada como texto ("['Quartos', '2']"), com o mesmo resultado de `ast.literal_eval`.
+    As listas sem escapes (quase todas) são lidas com um padrão compilado, sem compilar o texto como Python.
+    """
+
+    if PADRAO_LISTA.fullmatch(texto):
+        return [simples + duplas for simples, duplas in PADRAO_ITEM_LISTA.findall(texto)]
+
+    return ast.literal_eval(texto)
+
+# as regras de um site leem o mesmo texto uma depois da outra: a última lista e os últimos valores rotulados
+# ficam guardados, e o texto é lido uma vez só por todas as regras da mesma coluna
+@functools.lru_cache(maxsize=1)
+def _tupla_de_texto(texto):
+    return tuple(lista_de_texto(texto))
+
+@functools.lru_cache(maxsize=1)
+def _valores_rotulados(texto):
+    return tuple(PADRAO_VALOR_ROTULADO.findall(texto))
+
+
+# Extratores: cada um recebe o texto (não nulo) de uma coluna e devolve o trecho extraído, ou None se o texto
+# não tem o que se procura. As regras de tratamento dos sites (`busca_apartamentos/tratamento.py`) usam estes.
+
+def primeiro_grupo(expressao):
+    """
+    Primeiro grupo da primeira ocorrência da expressão regular (o trecho inteiro, se ela não tem grupos).
+    """
+
+    padrao = re.compile(expressao)
+    grupo = 1 if padrao.groups else 0
+
+    def extrai(texto):
+        encontrado = padrao.search(texto)
+        return encontrado.group(grupo) if encontrado else None
+
+    return extrai
+
+def parte(separador, posicao):
+    """
+    Parte na `posicao` do texto separado por `separador` (posições negativas contam do fim).
+    """
+
+    def extrai(texto):
+        partes = texto.split(separador)
+        return partes[posicao] if -len(partes) <= posicao < len(partes) else None
+
+    return extrai
+
+def substitui(*trocas):
+    """
+    Troca cada (trecho, novo) no texto, na ordem, e tira os espaços das pontas.
+    """
+
+    def extrai(texto):
+        for trecho, novo in trocas:
+            texto = texto.replace(trecho, novo)
+        return texto.strip()
+
+    return extrai
+
+def limpa(*trechos):
+    """
+    Remove os trechos do texto, na ordem, e tira os espaços das pontas (sem trechos, só tira os espaços).
+    """
+
+    return substitui(*((trecho, '') for trecho in trechos))
+
+def se_contem(trecho):
+    """
+    O texto inteiro, só se contém `trecho`.
+    """
+
+    return lambda texto: texto if trecho in texto else None
+
+def se_nao_contem(trecho):
+    """
+    O texto inteiro, só se não contém `trecho`.
+    """
+
+    return lambda texto: None if trecho in texto else texto
+
+def exceto(*valores):
+    """
+    O texto inteiro, só se não é um dos `valores` ('(--)' -> None).
+    """
+
+    return lambda texto: None if texto in valores else texto
+
+def item_com(chave, separador=', '):
+    """
+    Do primeiro item (separado por `separador`) que contém a chave ('241m² privativa, , 1 quarto, ...'), o
+    número precedido de espaço, se houver, ou o item inteiro, sem a chave ('1 quarto' -> '1').
+    """
+
+    def extrai(texto):
+        # o primeiro item que contém a chave é o que contém a primeira ocorrência dela
+        posicao = texto.find(chave)
+        if posicao == -1:
+            return None
+        inicio = texto.rfind(separador, 0, posicao)
+        inicio = 0 if inicio == -1 else inicio + len(separador)
+        fim = texto.find(separador, posicao)
+        fim = len(texto) if fim == -1 else fim
+        encontrado = PADRAO_NUMERO_ITEM.search(texto, inicio, fim)
+        return (encontrado.group(1) if encontrado else texto[inicio:fim]).replace(chave, '')
+
+    return extrai
+
+def rotulado(rotulo):
+    """
+    Valor do primeiro rótulo que contém `rotulo` entre os valores rotulados do texto
+    ('R$ 4.200,00, ,Condomínio R$ 1.100,00 IPTU R$ 230,00' -> rotulado('IPTU') -> '230,00').
+    """
+
+    def extrai(texto):
+        return next((valor for nome, valor in _valores_rotulados(texto) if rotulo in nome), None)
+
+    return extrai
+
+def na_lista(posicao):
+    """
+    Item na `posicao` da lista gravada como texto ("['2', '1', '2', '1', '68 m²']").
+    """
+
+    def extrai(texto):
+        lista = _tupla_de_texto(texto)
+        return lista[posicao] if -len(lista) <= posicao < len(lista) else None
+
+    return extrai
+
+def lista_unida(remove=''):
+    """
+    Itens da lista (gravada como texto ou vinda direto do buscador) unidos por espaços, sem o trecho `remove`
+    ("['Características', 'do', 'imóvel', 'Área', 'Total', '85', ...]" -> 'Área Total 85 ...').
+    """
+
+    def extrai(texto):
+        lista = texto if isinstance(texto, (list, tuple)) else lista_de_texto(texto)
+        return ' '.join(lista).replace(remove, '').strip() if isinstance(lista, (list, tuple)) else lista
+
+    return extrai
+
+def encadeia(*etapas):
+    """
+    Extrator que aplica as etapas em sequência e para no primeiro None. Cada etapa é um extrator, uma
+    expressão regular (ver `primeiro_grupo`) ou None (o texto como está).
+    """
+
+    extratores = [primeiro_grupo(etapa) if isinstance(etapa, str) else etapa for etapa in etapas if etapa is not None]
+
+    def extrai(texto):
+        for extrator in extratores:
+            texto = extrator(texto)
+            if texto is None:
+                return None
+        return texto
+
+    return extrai
+
+
+def reais(texto):
+    """
+    '1.100,00' -> 1100.0 (os centavos são descartados, como no tratamento antigo).
+    """
+
+    return float(texto.strip().replace('.', '').split(',')[0])
+
+def decimal(texto):
+    """
+    Número no formato brasileiro, com as casas decimais ('1.200,50' -> 1200.5, '98' -> 98.0).
+    """
+
+    return float(PADRAO_MILHAR.sub('', texto.strip()).replace(',', '.'))
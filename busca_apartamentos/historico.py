@@ -0,0 +1,226 @@
+import concurrent.futures
+import io
+import json
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from busca_apartamentos.catalogo import PADRAO_PARTICAO, PREFIXO_HISTORICO, le_catalogo, prefixo_particao
+from busca_apartamentos.escrita import EscritorPartes
+
+
+# arquivos antigos: '<data> - apartamentos - <site>.csv' e '<data> - apartamentos - <site>/parte-00001.parquet'
+PADRAO_LEGADO = re.compile(r'^(\d{4}-\d{2}-\d{2}) - apartamentos - ([^/.]+)(?:\.csv|/(.+))$')
+
+
+def particoes(bucket):
+    """
+    Partições completas do histórico, lidas do catálogo com uma única requisição. Num bucket sem
+    catálogo, usa uma listagem do prefixo do histórico e os manifestos das partições (só as partições
+    com manifesto, e nelas só as partes do manifesto).
+
+    Com um `CacheBlobs`, as versões das partes registradas no catálogo são passadas ao cache, de forma
+    que as partes já em disco não são baixadas de novo mesmo sem listar o bucket.
+
+    Retorna:
+        pd.DataFrame: uma linha por partição, com imobiliaria, data (datetime), registros e a lista de partes.
+    """
+
+    catalogo = le_catalogo(bucket)
+    if catalogo is not None:
+        linhas = [{'imobiliaria': p['imobiliaria'], 'data': p['data'], 'registros': p['registros'],
+                   'partes': [parte['nome'] for parte in p['partes']]} for p in catalogo['particoes']]
+        if hasattr(bucket, 'registra_versoes'):
+            bucket.registra_versoes({parte['nome']: parte['versao'] for p in catalogo['particoes']
+                                     for parte in p['partes'] if parte.get('versao')})
+    else:
+        linhas = _particoes_da_listagem(bucket)
+
+    df = pd.DataFrame(linhas, columns=['imobiliaria', 'data', 'registros', 'partes'])
+    df['data'] = pd.to_datetime(df['data'])
+
+    return df
+
+def _particoes_da_listagem(bucket):
+
+    completas = set()
+    for blob in bucket.list_blobs(prefix=f'{PREFIXO_HISTORICO}/'):
+        encontrado = PADRAO_PARTICAO.match(blob.name)
+        if encontrado and encontrado.group(3) == 'manifesto.json':
+            completas.add(encontrado.group(1, 2))
+
+    linhas = []
+    for site, data in sorted(completas):
+        # a pasta da partição pode ter partes de uma gravação que não terminou: valem as do manifesto
+        manifesto = json.loads(bucket.blob(f'{prefixo_particao(site, data)}/manifesto.json').download_as_bytes())
+        linhas.append({'imobiliaria': site, 'data': data, 'registros': manifesto['registros'],
+                       'partes': [parte['nome'] for parte in manifesto['partes']]})
+
+    return linhas
+
+def seleciona_particoes(tabela_particoes, imobiliarias=None, datas=None, ultimas_datas=None):
+    """
+    Filtra as partições por site e data, sem ler nenhum arquivo de dados.
+
+    Parâmetros:
+        imobiliarias (list, opcional): sites; por padrão, todos.
+        datas (list, opcional): datas (str ou datetime).
+        ultimas_datas (int, opcional): só as `ultimas_datas` datas mais recentes do histórico (de todos os sites).
+    """
+
+    selecionadas = tabela_particoes
+    if ultimas_datas is not None:
+        recentes = selecionadas['data'].drop_duplicates().sort_values(ascending=False)[:ultimas_datas]
+        selecionadas = selecionadas.loc[selecionadas['data'].isin(recentes)]
+    if datas is not None:
+        selecionadas = selecionadas.loc[selecionadas['data'].isin(pd.to_datetime(pd.Series(list(datas))))]
+    if imobiliarias is not None:
+        selecionadas = selecionadas.loc[selecionadas['imobiliaria'].isin(imobiliarias)]
+
+    return selecionadas
+
+def le_parte(bucket, nome, colunas=None):
+    """
+    Lê uma parte Parquet do bucket, só com as `colunas` pedidas. Nulos voltam como NaN, como na leitura do CSV.
+    """
+
+    tabela = pq.read_table(io.BytesIO(bucket.blob(nome).download_as_bytes()), columns=colunas)
+    df = tabela.to_pandas()
+
+    return df.where(df.notna(), np.nan)
+
+def le_historico(bucket, imobiliarias=None, datas=None, ultimas_datas=None, colunas=None, max_workers=16):
+    """
+    Lê o histórico particionado, baixando apenas as partes das partições selecionadas (filtro por site e
+    data aplicado aos nomes dos arquivos) e decodificando apenas as `colunas` pedidas. As partes são lidas
+    em paralelo e concatenadas uma única vez, em ordem de site e data.
+
+    Parâmetros:
+        bucket: bucket do histórico (dados brutos ou tratados).
+        imobiliarias (list, opcional): sites; por padrão, todos.
+        datas (list, opcional): datas.
+        ultimas_datas (int, opcional): só as datas mais recentes.
+        colunas (list, opcional): colunas lidas; por padrão, todas.
+        max_workers (int): partes baixadas ao mesmo tempo.
+
+    Retorna:
+        (pd.DataFrame, dict): registros das partições selecionadas e {parte: erro} das que falharam.
+    """
+
+    selecionadas = seleciona_particoes(particoes(bucket), imobiliarias, datas, ultimas_datas)
+    nomes = [nome for partes in selecionadas['partes'] for nome in partes]
+
+    dfs = {}
+    falhas = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {executor.submit(le_parte, bucket, nome, colunas): nome for nome in nomes}
+        for futuro in concurrent.futures.as_completed(futuros):
+            nome = futuros[futuro]
+            try:
+                dfs[nome] = futuro.result()
+            except Exception as e:
+                falhas[nome] = repr(e)
+
+    lidos = [dfs[nome] for nome in nomes if nome in dfs]
+    df = pd.concat(lidos, axis=0, ignore_index=True) if lidos else pd.DataFrame(columns=colunas)
+
+    return df, falhas
+
+def _arquivos_legado(bucket, prefixo=''):
+
+    # {(site, data): arquivos antigos}; as partes Parquet sem manifesto são de execuções que não terminaram
+    legado = {}
+    completas_legado = set()
+    for blob in bucket.list_blobs(prefix=prefixo):
+        encontrado = PADRAO_LEGADO.match(blob.name)
+        if not encontrado:
+            continue
+        data, site, arquivo = encontrado.groups()
+        if arquivo == 'manifesto.json':
+            completas_legado.add((site, data))
+        elif arquivo is None or arquivo.endswith('.parquet'):
+            legado.setdefault((site, data), []).append(blob.name)
+
+    return {chave: nomes for chave, nomes in legado.items()
+            if chave in completas_legado or not any(nome.endswith('.parquet') for nome in nomes)}
+
+def legado_nao_migrado(bucket, imobiliarias=None, datas=None, ultimas_datas=None):
+    """
+    Arquivos antigos ('<data> - apartamentos - <site>.csv' e partes em '<data> - apartamentos - <site>/')
+    de partições que ainda não foram copiadas para o histórico particionado (ver `migra_legado`) e que
+    estariam na seleção de `le_historico` se tivessem sido. Com `datas`, lista só os arquivos dessas datas;
+    senão, lista o bucket inteiro.
+
+    Parâmetros:
+        imobiliarias, datas, ultimas_datas: seleção, como em `le_historico`; com `ultimas_datas`, as datas
+            mais recentes entre as do histórico e as dos arquivos antigos.
+
+    Retorna:
+        dict: {(site, data): arquivos antigos}.
+    """
+
+    if datas is None:
+        legado = _arquivos_legado(bucket)
+    else:
+        legado = {}
+        for data in pd.to_datetime(pd.Series(list(datas))).dt.strftime('%Y-%m-%d').unique():
+            legado.update(_arquivos_legado(bucket, f'{data} - apartamentos - '))
+
+    tabela_particoes = particoes(bucket)
+    migradas = set(zip(tabela_particoes['imobiliaria'], tabela_particoes['data'].dt.strftime('%Y-%m-%d')))
+    legado = {chave: nomes for chave, nomes in legado.items() if chave not in migradas}
+
+    # as mesmas regras de seleção das partições, sobre o histórico mais os arquivos antigos
+    tabela = pd.concat([tabela_particoes[['imobiliaria', 'data']],
+                        pd.DataFrame({'imobiliaria': [site for site, _ in legado],
+                                      'data': pd.to_datetime(pd.Series([data for _, data in legado], dtype=object))})],
+                       ignore_index=True)
+    selecionadas = seleciona_particoes(tabela, imobiliarias, datas, ultimas_datas)
+    selecionadas = set(zip(selecionadas['imobiliaria'], selecionadas['data'].dt.strftime('%Y-%m-%d')))
+
+    return {chave: nomes for chave, nomes in sorted(legado.items()) if chave in selecionadas}
+
+def migra_legado(bucket, tipado=False, registros_por_parte=5000):
+    """
+    Copia os arquivos antigos do bucket ('<data> - apartamentos - <site>.csv' e as partes em
+    '<data> - apartamentos - <site>/') para o histórico particionado. Partições que já têm manifesto
+    não são regravadas, então a migração pode ser repetida. Os arquivos antigos são mantidos.
+
+    Parâmetros:
+        bucket: bucket com os arquivos antigos (o histórico é gravado no mesmo bucket).
+        tipado (bool): grava com os tipos inferidos do CSV (dados tratados) em vez de tudo como texto (dados brutos).
+        registros_por_parte (int): registros por parte Parquet.
+
+    Retorna:
+        pd.DataFrame: partições migradas, com o número de registros.
+    """
+
+    tabela_particoes = particoes(bucket)
+    ja_migradas = set(zip(tabela_particoes['imobiliaria'], tabela_particoes['data'].dt.strftime('%Y-%m-%d')))
+
+    migradas = []
+    for (site, data), nomes in sorted(_arquivos_legado(bucket).items()):
+        if (site, data) in ja_migradas:
+            continue
+
+        dfs = []
+        for nome in sorted(nomes):
+            conteudo = io.BytesIO(bucket.blob(nome).download_as_bytes())
+            if nome.endswith('.parquet'):
+                dfs.append(pd.read_parquet(conteudo))
+            else:
+                # dados brutos são lidos como texto, para gravar exatamente os valores do CSV
+                dfs.append(pd.read_csv(conteudo) if tipado else pd.read_csv(conteudo, dtype=str))
+        dados = pd.concat(dfs, axis=0, ignore_index=True)
+
+        escritor = EscritorPartes(bucket, prefixo_particao(site, data), registros_por_parte, tipado=tipado)
+        for inicio in range(0, len(dados), registros_por_parte):
+            escritor.adiciona(dados.iloc[inicio:inicio + registros_por_parte].to_dict('records'))
+        manifesto = escritor.fecha()
+
+        print(f'{site} {data}: {manifesto["registros"]} registros migrados')
+        migradas.append({'imobiliaria': site, 'data': data, 'registros': manifesto['registros']})
+
+    return pd.DataFrame(migradas, columns=['imobiliaria', 'data', 'registros'])
@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import aiohttp
+
+from busca_apartamentos.limites import LimitesDominio
+
+HEADERS_PADRAO = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'}
+STATUS_RETENTATIVA = {429, 500, 502, 503, 504}
+
+
+def _retry_after(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+
+async def _busca_pagina(sessao, semaforo, limites, link, tentativas, stats, cache, salva_no_cache):
+
+    condicional = cache is not None
+
+    for tentativa in range(1, tentativas + 1):
+        espera_minima = 0.0
+        async with semaforo:
+            espera = limites.espera_antes()
+            if espera:
+                await asyncio.sleep(espera)
+            try:
+                while True:
+                    headers = cache.validadores(link) if condicional else {}
+                    async with sessao.get(link, headers=headers) as res:
+                        conteudo = await res.read()
+
+                        if res.status == 304:
+                            conteudo = cache.obtem(link)
+                            if conteudo is not None:
+                                limites.registra(True)
+                                cache.registra_hit(link, conteudo)
+                                return conteudo
+                            # corpo removido do cache: o servidor respondeu bem, então a requisição é repetida
+                            # na hora, sem validadores, sem contar como falha do domínio nem gastar uma tentativa
+                            limites.registra(True)
+                            condicional = False
+                            espera = limites.espera_antes()
+                            if espera:
+                                await asyncio.sleep(espera)
+                            continue
+
+                        if res.status in STATUS_RETENTATIVA:
+                            espera_minima = _retry_after(res.headers.get('Retry-After'))
+                            raise aiohttp.ClientResponseError(res.request_info, res.history, status=res.status)
+
+                        if res.status >= 400:
+                            # 404, 410...: o anúncio não existe mais, repetir não adianta
+                            limites.registra(True)
+                            print(f'Falha ao buscar {link}: status {res.status}')
+                            stats['falhas'] += 1
+                            return None
+
+                        limites.registra(True)
+                        stats['bytes'] += len(conteudo)
+
+                        if cache is not None:
+                            cache.registra_miss(conteudo)
+                            validadores = (res.headers.get('ETag'), res.headers.get('Last-Modified'))
+                            if salva_no_cache:
+                                cache.salva(link, conteudo, *validadores)
+                            else:
+                                cache.pendentes[link] = validadores
+                        return conteudo
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                erro = e
+                limites.registra(False)
+
+        if tentativa < tentativas:
+            stats['retentativas'] += 1
+            await asyncio.sleep(limites.backoff(tentativa, espera_minima))
+
+    print(f'Falha ao buscar {link}: {erro!r}')
+    stats['falhas'] += 1
+    return None
+
+async def _busca_paginas(links, concorrencia, timeout, tentativas, limites, headers, stats, cache, salva_no_cache):
+
+    conector = aiohttp.TCPConnector(limit=concorrencia, limit_per_host=concorrencia)
+    tempo_limite = aiohttp.ClientTimeout(total=timeout)
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async with aiohttp.ClientSession(connector=conector, timeout=tempo_limite, headers=headers) as sessao:
+        conteudos = await asyncio.gather(*[_busca_pagina(sessao, semaforo, limites, link, tentativas, stats, cache, salva_no_cache) for link in links])
+
+    return dict(zip(links, conteudos))
+
+def busca_paginas(links, concorrencia=16, timeout=30, tentativas=3, espera_base=1.0, headers=HEADERS_PADRAO, cache=None, salva_no_cache=True, limites=None,
+                  metricas=None):
+    """
+    Busca todas as páginas de forma assíncrona, reaproveitando um único pool de conexões.
+
+    Parâmetros:
+        links (list): urls a serem buscadas.
+        concorrencia (int): número máximo de requisições simultâneas.
+        timeout (float): tempo máximo, em segundos, de cada requisição.
+        tentativas (int): tentativas por página em caso de timeout, erro de conexão ou status 429/5xx.
+        espera_base (float): espera inicial, em segundos, do backoff exponencial entre tentativas (sem `limites`).
+        cache (CacheHTTP, opcional): cache usado nas requisições condicionais (ETag/Last-Modified).
+        salva_no_cache (bool): salva no cache os corpos baixados com status 200.
+        limites (LimitesDominio, opcional): taxa máxima, backoff e disjuntor do domínio, compartilhados
+            com as outras chamadas ao mesmo domínio.
+        metricas (MetricasColeta, opcional): métricas do site, onde as estatísticas da chamada são acumuladas.
+
+    Retorna:
+        (dict, dict): conteúdo (bytes) de cada link, ou None se todas as tentativas falharem,
+        e estatísticas da execução (páginas, bytes, retentativas, falhas, segundos e páginas por segundo).
+    """
+
+    stats = {'paginas': len(links), 'bytes': 0, 'retentativas': 0, 'falhas': 0}
+    limites = limites or LimitesDominio('', espera_base=espera_base)
+
+    inicio = time.perf_counter()
+    conteudos = asyncio.run(_busca_paginas(list(links), concorrencia, timeout, tentativas, limites, headers, stats, cache, salva_no_cache))
+    stats['segundos'] = round(time.perf_counter() - inicio, 3)
+    stats['paginas_por_segundo'] = round(len(links) / stats['segundos'], 3) if stats['segundos'] else 0.0
+    if metricas is not None:
+        metricas.registra_http(stats)
+
+    return conteudos, stats
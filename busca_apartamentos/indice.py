@@ -0,0 +1,120 @@
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+
+import pandas as pd
+
+
+class IndiceAnuncios:
+    """
+    Índice persistente (SQLite) dos anúncios já vistos por site.
+
+    Guarda, para cada link, a primeira e a última data em que apareceu na listagem, a data da
+    última coleta da página de detalhes, o hash do conteúdo coletado e o próprio registro, que
+    é reaproveitado nos dias em que a página de detalhes não é baixada novamente.
+    """
+
+    def __init__(self, caminho='/tmp/indice_anuncios.sqlite'):
+        self.caminho = caminho
+        self.conexao = sqlite3.connect(caminho)
+        self.conexao.execute('''
+            CREATE TABLE IF NOT EXISTS anuncios (
+                site TEXT NOT NULL,
+                link TEXT NOT NULL,
+                primeira_vez TEXT NOT NULL,
+                ultima_vez TEXT NOT NULL,
+                ultima_coleta TEXT,
+                hash TEXT,
+                registro TEXT,
+                PRIMARY KEY (site, link)
+            )''')
+        self.conexao.commit()
+
+    @classmethod
+    def do_bucket(cls, bucket, nome_blob, caminho='/tmp/indice_anuncios.sqlite'):
+
+        blob = bucket.blob(nome_blob)
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        if blob.exists():
+            blob.download_to_filename(caminho)
+
+        return cls(caminho)
+
+    def salva_no_bucket(self, bucket, nome_blob):
+        self.conexao.commit()
+        bucket.blob(nome_blob).upload_from_filename(self.caminho)
+
+    def registra_vistos(self, site, links, data):
+
+        self.conexao.executemany('''
+            INSERT INTO anuncios (site, link, primeira_vez, ultima_vez) VALUES (?, ?, ?, ?)
+            ON CONFLICT (site, link) DO UPDATE SET ultima_vez = excluded.ultima_vez''',
+            [(site, link, data, data) for link in links])
+        self.conexao.commit()
+
+    def links_para_coletar(self, site, links, data, idade_maxima_dias=7):
+        """
+        Retorna os links novos, sem registro salvo ou cuja última coleta tem mais de `idade_maxima_dias` dias.
+        """
+
+        limite = (datetime.date.fromisoformat(data) - datetime.timedelta(days=idade_maxima_dias)).isoformat()
+        atualizados = {link for (link,) in self.conexao.execute(
+            'SELECT link FROM anuncios WHERE site = ? AND registro IS NOT NULL AND ultima_coleta > ?', (site, limite))}
+
+        return [link for link in links if link not in atualizados]
+
+    def atualiza_coletados(self, site, registros, data):
+
+        linhas = []
+        for registro in registros:
+            conteudo = json.dumps({k: v for k, v in registro.items() if k != 'data_coleta'}, sort_keys=True, default=str)
+            linhas.append((data, hashlib.sha256(conteudo.encode()).hexdigest(), json.dumps(registro, default=str), site, registro['link']))
+
+        self.conexao.executemany('UPDATE anuncios SET ultima_coleta = ?, hash = ?, registro = ? WHERE site = ? AND link = ?', linhas)
+        self.conexao.commit()
+
+    def registros_salvos(self, site, links, data):
+        """
+        Retorna o último registro coletado de cada link, com a `data_coleta` atualizada para `data`.
+        """
+
+        registros = []
+        for link in links:
+            linha = self.conexao.execute('SELECT registro FROM anuncios WHERE site = ? AND link = ?', (site, link)).fetchone()
+            if linha and linha[0]:
+                registro = json.loads(linha[0])
+                registro['data_coleta'] = data
+                registros.append(registro)
+
+        return registros
+
+
+def coleta_incremental(indice, site, links, coleta, idade_maxima_dias=7, data=None):
+    """
+    Baixa as páginas de detalhes apenas dos anúncios novos ou desatualizados; os demais anúncios
+    da listagem do dia reaproveitam o último registro salvo no índice.
+
+    Parâmetros:
+        indice (IndiceAnuncios): índice dos anúncios já vistos.
+        site (str): nome do site.
+        links (list): links encontrados na listagem do dia.
+        coleta (callable): recebe uma lista de links e retorna um DataFrame com os registros coletados.
+        idade_maxima_dias (int): idade máxima de um registro antes de a página ser baixada novamente.
+    """
+
+    data = data or datetime.datetime.today().strftime('%Y-%m-%d')
+
+    indice.registra_vistos(site, links, data)
+    links_coletar = indice.links_para_coletar(site, links, data, idade_maxima_dias)
+    print(f'{len(links_coletar)} de {len(links)} anúncios precisam ser coletados')
+
+    novos = coleta(links_coletar) if links_coletar else pd.DataFrame()
+    indice.atualiza_coletados(site, novos.to_dict('records'), data)
+
+    links_coletados = set(novos['link']) if 'link' in novos else set()
+    reaproveitados = indice.registros_salvos(site, [link for link in links if link not in links_coletados], data)
+
+    return pd.concat([novos, pd.DataFrame(reaproveitados)], axis=0).reset_index(drop=True)
@@ -0,0 +1,152 @@
+import collections
+import random
+import threading
+import time
+
+
+class BaldeDeFichas:
+    """
+    Limitador de taxa (token bucket): libera `taxa` requisições por segundo, com rajadas de até
+    `capacidade` requisições. Com `taxa` 0 não há limite.
+
+    É seguro entre threads e não bloqueia: `reserva()` retira uma ficha e retorna quantos segundos
+    o chamador deve esperar antes de usá-la, o que serve tanto para código síncrono (time.sleep)
+    quanto assíncrono (asyncio.sleep).
+    """
+
+    def __init__(self, taxa=0.0, capacidade=1):
+        self.taxa = taxa
+        self.capacidade = max(1, capacidade)
+        self.fichas = float(self.capacidade)
+        self.ultima = time.monotonic()
+        self.trava = threading.Lock()
+
+    def reserva(self):
+
+        if not self.taxa:
+            return 0.0
+
+        with self.trava:
+            agora = time.monotonic()
+            self.fichas = min(self.capacidade, self.fichas + (agora - self.ultima) * self.taxa)
+            self.ultima = agora
+            self.fichas -= 1
+
+            # saldo negativo: a ficha reservada só estará disponível daqui a -fichas / taxa segundos
+            return max(0.0, -self.fichas / self.taxa)
+
+
+class Disjuntor:
+    """
+    Circuit breaker de um domínio: quando a taxa de erro das últimas `janela` requisições passa de
+    `limite_erros`, o domínio fica pausado por `pausa` segundos. Depois da pausa a janela recomeça,
+    de forma que poucas falhas seguidas reabrem o disjuntor rapidamente.
+    """
+
+    def __init__(self, limite_erros=0.5, janela=20, pausa=60.0):
+        self.limite_erros = limite_erros
+        self.janela = janela
+        self.pausa = pausa
+        self.resultados = collections.deque(maxlen=janela)
+        self.pausado_ate = 0.0
+        self.aberturas = 0
+        self.trava = threading.Lock()
+
+    def espera(self):
+        return max(0.0, self.pausado_ate - time.monotonic())
+
+    def registra(self, sucesso):
+
+        with self.trava:
+            self.resultados.append(bool(sucesso))
+            erros = self.resultados.count(False)
+
+            if len(self.resultados) >= min(self.janela, 5) and erros / len(self.resultados) >= self.limite_erros:
+                self.pausado_ate = time.monotonic() + self.pausa
+                self.resultados.clear()
+                self.aberturas += 1
+                return True
+
+        return False
+
+
+class LimitesDominio:
+    """
+    Limites de acesso a um domínio, compartilhados por todas as requisições (HTTP ou navegador) a ele:
+    taxa máxima (token bucket), backoff exponencial com jitter entre tentativas e circuit breaker.
+
+    Parâmetros:
+        dominio (str): domínio, usado nos avisos.
+        requisicoes_por_segundo (float): taxa máxima; 0 desativa o limite de taxa.
+        rajada (int): requisições que podem sair juntas antes de a taxa ser aplicada.
+        espera_base (float): espera inicial, em segundos, do backoff exponencial.
+        espera_maxima (float): espera máxima do backoff.
+        limite_erros (float): taxa de erro que pausa o domínio.
+        janela (int): número de requisições recentes consideradas na taxa de erro.
+        pausa (float): segundos de pausa do domínio quando o disjuntor abre.
+    """
+
+    def __init__(self, dominio, requisicoes_por_segundo=0.0, rajada=1, espera_base=1.0, espera_maxima=60.0,
+                 limite_erros=0.5, janela=20, pausa=60.0):
+        self.dominio = dominio
+        self.balde = BaldeDeFichas(requisicoes_por_segundo, rajada)
+        self.disjuntor = Disjuntor(limite_erros, janela, pausa)
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.stats = {'requisicoes': 0, 'erros': 0, 'segundos_limitados': 0.0}
+
+    def espera_antes(self):
+        """
+        Segundos a esperar antes da próxima requisição: a pausa do disjuntor, se aberto, mais a espera da taxa.
+        """
+
+        espera = self.disjuntor.espera() + self.balde.reserva()
+        self.stats['requisicoes'] += 1
+        self.stats['segundos_limitados'] += espera
+
+        return espera
+
+    def aguarda(self):
+        espera = self.espera_antes()
+        if espera:
+            time.sleep(espera)
+
+    def registra(self, sucesso):
+
+        if not sucesso:
+            self.stats['erros'] += 1
+        if self.disjuntor.registra(sucesso):
+            print(f'[{self.dominio}] taxa de erro alta: pausando o domínio por {self.disjuntor.pausa:.0f}s')
+
+    def backoff(self, tentativa, minimo=0.0):
+        """
+        Espera antes da tentativa seguinte à `tentativa` (1, 2, ...): exponencial com jitter, ou
+        `minimo` (ex.: Retry-After do servidor), o que for maior.
+        """
+
+        espera = min(self.espera_maxima, self.espera_base * 2 ** (tentativa - 1))
+        return max(minimo, espera + random.uniform(0, self.espera_base))
+
+    def relatorio(self):
+
+        relatorio = dict(self.stats)
+        relatorio['segundos_limitados'] = round(relatorio['segundos_limitados'], 1)
+        relatorio['pausas'] = self.disjuntor.aberturas
+
+        return relatorio
+
+
+_limites = {}
+_trava_limites = threading.Lock()
+
+def limites_do_dominio(dominio, **config):
+    """
+    Retorna os limites do domínio, criando-os na primeira chamada: todos os pools, sites e chamadas
+    que acessam o mesmo domínio no processo compartilham a mesma taxa e o mesmo disjuntor.
+    """
+
+    with _trava_limites:
+        if dominio not in _limites:
+            _limites[dominio] = LimitesDominio(dominio, **config)
+
+        return _limites[dominio]
@@ -0,0 +1,148 @@
+import hashlib
+import time
+
+import pandas as pd
+
+from busca_apartamentos import configuracao
+from busca_apartamentos.armazenamento import abre_bucket
+from busca_apartamentos.catalogo import entrada_do_manifesto, le_catalogo, reconstroi_catalogo, registra_particoes
+from busca_apartamentos.escrita import apaga_partes_substituidas, salva_partes_no_bucket
+from busca_apartamentos.historico import le_parte, seleciona_particoes
+from busca_apartamentos.tratamento import TRATAMENTOS, trata_site, versao_tratamento
+from busca_apartamentos.tratamento_paralelo import bucket_do_processo, executa_em_ordem, processos_com_bucket
+
+# partições tratadas registradas no catálogo de uma vez
+PARTICOES_POR_REGISTRO = 32
+
+
+def checksum_bruto(particao):
+    """
+    Checksum de uma partição bruta do catálogo; nas partições sem checksum, um hash das versões das partes.
+    """
+
+    if particao.get('checksum'):
+        return particao['checksum']
+
+    versoes = ''.join(str(parte.get('versao') or parte.get('md5')) for parte in particao['partes'])
+    return hashlib.sha256(versoes.encode()).hexdigest()
+
+def particoes_pendentes(bucket_brutos, bucket_tratados, imobiliarias=None, datas=None, ultimas_datas=None, forca=False):
+    """
+    Compara os catálogos dos dados brutos e dos tratados. Cada partição tratada guarda a origem: o checksum
+    da partição bruta e a versão do código do tratamento (`versao_tratamento`). Uma partição bruta precisa
+    ser tratada se ainda não tem dados tratados ('nova'), se mudou depois de tratada ('dados') ou se foi
+    tratada por outra versão do código ('codigo').
+
+    Parâmetros:
+        bucket_brutos: bucket dos dados brutos.
+        bucket_tratados: bucket dos dados tratados.
+        imobiliarias, datas, ultimas_datas: seleção das partições brutas (ver `seleciona_particoes`).
+        forca (bool): trata de novo todas as partições selecionadas ('forcado').
+
+    Retorna:
+        (pd.DataFrame, int): partições a tratar (imobiliaria, data, partes, origem e motivo) e quantas das
+            selecionadas já estão atualizadas.
+    """
+
+    # bucket sem catálogo: monta o catálogo a partir dos manifestos uma vez (ver `reconstroi_catalogo`)
+    brutos = le_catalogo(bucket_brutos) or reconstroi_catalogo(bucket_brutos)
+    tratados = le_catalogo(bucket_tratados) or {'particoes': []}
+    origens = {(p['imobiliaria'], p['data']): p.get('origem') for p in tratados['particoes']}
+    versao = versao_tratamento()
+
+    linhas = []
+    for particao in brutos['particoes']:
+        if particao['imobiliaria'] not in TRATAMENTOS:
+            continue
+        origem = {'checksum': checksum_bruto(particao), 'versao_tratamento': versao}
+        anterior = origens.get((particao['imobiliaria'], particao['data']))
+        if forca:
+            motivo = 'forcado'
+        elif anterior is None:
+            motivo = 'nova'
+        elif anterior.get('checksum') != origem['checksum']:
+            motivo = 'dados'
+        elif anterior.get('versao_tratamento') != versao:
+            motivo = 'codigo'
+        else:
+            motivo = None
+        linhas.append({'imobiliaria': particao['imobiliaria'], 'data': particao['data'],
+                       'partes': [parte['nome'] for parte in particao['partes']], 'origem': origem, 'motivo': motivo})
+
+    selecionadas = pd.DataFrame(linhas, columns=['imobiliaria', 'data', 'partes', 'origem', 'motivo'])
+    selecionadas['data'] = pd.to_datetime(selecionadas['data'])
+    selecionadas = seleciona_particoes(selecionadas, imobiliarias, datas, ultimas_datas)
+    pendentes = selecionadas.loc[selecionadas['motivo'].notna()]
+
+    return pendentes, len(selecionadas) - len(pendentes)
+
+def _materializa_particao(nome_brutos, nome_tratados, site, data, partes, origem):
+
+    try:
+        brutos = bucket_do_processo(nome_brutos)
+        bruto = pd.concat([le_parte(brutos, nome) for nome in partes], axis=0, ignore_index=True)
+        # o registro no catálogo é feito pelo processo principal, para várias partições de uma vez
+        manifesto = salva_partes_no_bucket(bucket_do_processo(nome_tratados), site, trata_site(bruto, site), data,
+                                           tipado=True, origem=origem, registra_no_catalogo=False)
+        return manifesto, None
+    except Exception as e:
+        return None, repr(e)
+
+def _registra(bucket, manifestos):
+
+    registra_particoes(bucket, [entrada_do_manifesto(manifesto) for manifesto in manifestos])
+    # as partes de tratamentos anteriores só são apagadas depois que o catálogo aponta para as novas
+    for manifesto in manifestos:
+        apaga_partes_substituidas(bucket, manifesto)
+
+def materializa_tratados(nome_bucket_brutos, nome_bucket_tratados=configuracao.BUCKET_TRATADOS, imobiliarias=None,
+                         datas=None, ultimas_datas=None, processos=1, forca=False):
+    """
+    Grava os dados tratados por partição (site e data de coleta) no bucket dos tratados, no mesmo formato
+    do histórico bruto, tratando só as partições brutas novas, alteradas ou tratadas por outra versão do
+    código (ver `particoes_pendentes`). Os arquivos brutos de datas passadas não mudam, então a atualização
+    diária trata só o dia novo; o histórico tratado inteiro é lido com `le_historico` no bucket dos tratados.
+
+    Parâmetros:
+        nome_bucket_brutos (str): bucket dos dados brutos.
+        nome_bucket_tratados (str): bucket dos dados tratados (`BUCKET_TRATADOS`).
+        imobiliarias, datas, ultimas_datas: seleção das partições brutas (ver `seleciona_particoes`).
+        processos (int): processos que tratam partições ao mesmo tempo (None: um por núcleo). Os buckets
+            são abertos pelo nome em cada processo, então com o armazenamento em memória (`ARMAZENAMENTO=memoria`)
+            as partições são tratadas no processo principal, qualquer que seja `processos`.
+        forca (bool): trata de novo todas as partições selecionadas.
+
+    Retorna:
+        dict: partições tratadas, já atualizadas, registros tratados, segundos e {partição: erro} das que falharam.
+    """
+
+    bucket_tratados = abre_bucket(nome_bucket_tratados)
+    pendentes, atualizadas = particoes_pendentes(abre_bucket(nome_bucket_brutos), bucket_tratados, imobiliarias,
+                                                 datas, ultimas_datas, forca)
+
+    inicio = time.perf_counter()
+    chaves = list(zip(pendentes['imobiliaria'], pendentes['data'].dt.strftime('%Y-%m-%d'), pendentes['motivo']))
+    tarefas = ((nome_bucket_brutos, nome_bucket_tratados, site, data, partes, origem)
+               for (site, data, _), partes, origem in zip(chaves, pendentes['partes'], pendentes['origem']))
+
+    manifestos = []
+    tratadas = 0
+    registros = 0
+    falhas = {}
+    for (site, data, motivo), (manifesto, erro) in zip(chaves, executa_em_ordem(_materializa_particao, tarefas, processos_com_bucket(processos))):
+        if erro is not None:
+            print(f'{site} {data}: falha no tratamento: {erro}')
+            falhas[f'{site} {data}'] = erro
+            continue
+        print(f'{site} {data}: {manifesto["registros"]} registros tratados ({motivo})')
+        manifestos.append(manifesto)
+        tratadas += 1
+        registros += manifesto['registros']
+        if len(manifestos) >= PARTICOES_POR_REGISTRO:
+            _registra(bucket_tratados, manifestos)
+            manifestos = []
+    if manifestos:
+        _registra(bucket_tratados, manifestos)
+
+    return {'particoes_tratadas': tratadas, 'ja_atualizadas': atualizadas, 'registros_tratados': registros,
+            'segundos': round(time.perf_counter() - inicio, 3), 'falhas': falhas}
@@ -0,0 +1,164 @@
+import collections
+import contextlib
+import datetime
+import threading
+import time
+
+PREFIXO_PROMETHEUS = 'busca_apartamentos'
+
+# campos preenchidos pelo próprio buscador, sem seletor: não entram na cobertura
+CAMPOS_SEM_SELETOR = ('site', 'data_coleta', 'link')
+
+DESCRICOES_CONTADORES = {
+    'bytes_http': 'Bytes baixados via HTTP.',
+    'bytes_navegador': 'Bytes transferidos pelos navegadores.',
+    'paginas_http': 'Páginas buscadas via HTTP.',
+    'paginas_navegador': 'Páginas carregadas nos navegadores.',
+    'retentativas_http': 'Novas tentativas de requisições HTTP.',
+    'retentativas_navegador': 'Novas tentativas de páginas no navegador.',
+    'falhas_http': 'Páginas que falharam em todas as tentativas HTTP.',
+    'falhas_navegador': 'Páginas que falharam em todas as tentativas no navegador.',
+    'erros_parse': 'Páginas cujo parse levantou erro.',
+    'navegadores_abertos': 'Navegadores abertos.',
+}
+
+
+def preenchido(valor):
+    """
+    Indica se o seletor de um campo encontrou algo: None, NaN e textos ou listas vazias contam como não encontrado.
+    """
+
+    if valor is None:
+        return False
+    if isinstance(valor, float):
+        return valor == valor
+    if isinstance(valor, (str, list, tuple)):
+        return len(valor) > 0 and (not isinstance(valor, str) or bool(valor.strip()))
+
+    return True
+
+
+class MetricasColeta:
+    """
+    Métricas da execução de um site: tempo por etapa, contadores (bytes, páginas, retentativas, falhas)
+    e cobertura dos seletores, isto é, a fração das páginas em que cada campo extraído foi encontrado.
+    Pode ser atualizada por várias threads ao mesmo tempo.
+
+    As etapas são medidas de forma independente e podem se sobrepor (ex.: 'http' acontece dentro de
+    'listagem' e de 'detalhes'); não devem ser somadas.
+
+    Parâmetros:
+        site (str): nome do site.
+    """
+
+    def __init__(self, site):
+        self.site = site
+        self.criado_em = datetime.datetime.now().isoformat(timespec='seconds')
+        self.segundos = collections.defaultdict(float)
+        self.contadores = collections.defaultdict(float)
+        self.campos = collections.defaultdict(int)
+        self.registros = 0
+        self._trava = threading.Lock()
+
+    @contextlib.contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.adiciona_tempo(nome, time.perf_counter() - inicio)
+
+    def adiciona_tempo(self, nome, segundos):
+        with self._trava:
+            self.segundos[nome] += segundos
+
+    def conta(self, nome, valor=1):
+        with self._trava:
+            self.contadores[nome] += valor
+
+    def registra_http(self, stats):
+        """
+        Acumula as estatísticas de uma chamada de `busca_paginas`.
+        """
+
+        self.adiciona_tempo('http', stats['segundos'])
+        for nome in ['bytes', 'paginas', 'retentativas', 'falhas']:
+            self.conta(f'{nome}_http', stats[nome])
+
+    def registra_campos(self, registro):
+
+        with self._trava:
+            self.registros += 1
+            for campo, valor in registro.items():
+                if campo not in CAMPOS_SEM_SELETOR:
+                    self.campos[campo] += preenchido(valor)
+
+    def cobertura(self):
+
+        with self._trava:
+            if not self.registros:
+                return {}
+            return {campo: round(n / self.registros, 3) for campo, n in sorted(self.campos.items())}
+
+    def relatorio(self):
+        """
+        Retorna:
+            dict: relatório da execução do site, serializável em JSON.
+        """
+
+        with self._trava:
+            segundos = {nome: round(valor, 3) for nome, valor in sorted(self.segundos.items())}
+            contadores = {nome: int(valor) for nome, valor in sorted(self.contadores.items())}
+            registros = self.registros
+
+        tempo_detalhes = segundos.get('detalhes', 0)
+
+        return {
+            'site': self.site,
+            'criado_em': self.criado_em,
+            'segundos': segundos,
+            'contadores': contadores,
+            'registros': registros,
+            'paginas_por_segundo': round(registros / tempo_detalhes, 3) if tempo_detalhes else 0.0,
+            'cobertura': self.cobertura(),
+        }
+
+
+def _rotulos(**rotulos):
+    return '{' + ','.join(f'{nome}="{valor}"' for nome, valor in rotulos.items()) + '}'
+
+def para_prometheus(metricas):
+    """
+    Converte as métricas de uma execução (uma `MetricasColeta` por site) para o formato texto do Prometheus
+    (ex.: para o textfile collector do node_exporter ou um Pushgateway).
+
+    Retorna:
+        str: uma família de métricas por grandeza, com o site (e a etapa ou o campo) como rótulos.
+    """
+
+    relatorios = [m.relatorio() for m in metricas]
+    familias = collections.OrderedDict()
+
+    def adiciona(nome, descricao, rotulos, valor):
+        familias.setdefault(nome, (descricao, []))[1].append(f'{PREFIXO_PROMETHEUS}_{nome}{_rotulos(**rotulos)} {valor}')
+
+    for relatorio in relatorios:
+        site = relatorio['site']
+        for etapa, segundos in relatorio['segundos'].items():
+            adiciona('etapa_segundos', 'Tempo gasto em cada etapa da coleta.', {'site': site, 'etapa': etapa}, segundos)
+        for nome, valor in relatorio['contadores'].items():
+            adiciona(nome, DESCRICOES_CONTADORES.get(nome, nome), {'site': site}, valor)
+        adiciona('registros', 'Anúncios extraídos.', {'site': site}, relatorio['registros'])
+        adiciona('paginas_por_segundo', 'Anúncios extraídos por segundo na etapa de detalhes.', {'site': site},
+                 relatorio['paginas_por_segundo'])
+        for campo, fracao in relatorio['cobertura'].items():
+            adiciona('cobertura_campo', 'Fração das páginas em que o seletor do campo encontrou o elemento.',
+                     {'site': site, 'campo': campo}, fracao)
+
+    linhas = []
+    for nome, (descricao, amostras) in familias.items():
+        linhas.append(f'# HELP {PREFIXO_PROMETHEUS}_{nome} {descricao}')
+        linhas.append(f'# TYPE {PREFIXO_PROMETHEUS}_{nome} gauge')
+        linhas.extend(amostras)
+
+    return '\n'.join(linhas) + '\n'
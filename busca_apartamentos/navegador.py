@@ -0,0 +1,333 @@
+import contextlib
+import json
+import queue
+import random
+import threading
+import time
+
+import pandas as pd
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+
+# recursos que não entram no parse: bloqueados pelo DevTools antes de a requisição sair do navegador
+PADROES_TIPOS_BLOQUEADOS = [
+    '*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.avif*', '*.svg*', '*.ico*',
+    '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+    '*.mp4*', '*.webm*', '*.mp3*',
+]
+PADROES_CSS = ['*.css*']
+# domínios de terceiros (analytics, anúncios, chats, mapas, fontes) que as páginas das imobiliárias carregam
+DOMINIOS_BLOQUEADOS = [
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googlesyndication.com*',
+    '*googleadservices.com*', '*connect.facebook.net*', '*facebook.com/tr*', '*hotjar.com*', '*clarity.ms*',
+    '*analytics.tiktok.com*', '*criteo.*', '*rdstation.com*', '*zopim.com*', '*jivosite.com*', '*tawk.to*',
+    '*youtube.com*', '*maps.googleapis.com*', '*fonts.googleapis.com*', '*fonts.gstatic.com*',
+]
+
+
+def cria_opcoes_chrome(eager=True, enxuto=True):
+    """
+    Opções do Chrome headless.
+
+    Parâmetros:
+        eager (bool): usa page_load_strategy 'eager' (o `get` volta no DOMContentLoaded, sem esperar o `load`).
+        enxuto (bool): perfil enxuto, sem imagens, extensões, GPU, áudio e serviços de fundo do Chrome.
+    """
+
+    chrome_options = Options()
+    if eager:
+        chrome_options.page_load_strategy = 'eager'
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+
+    if enxuto:
+        for argumento in ['--blink-settings=imagesEnabled=false', '--disable-extensions', '--disable-gpu',
+                          '--mute-audio', '--no-first-run', '--disable-background-networking', '--disable-sync',
+                          '--disable-default-apps', '--disable-component-update', '--disable-notifications']:
+            chrome_options.add_argument(argumento)
+        chrome_options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2,
+                                                         'profile.default_content_setting_values.notifications': 2})
+
+    # log de performance: fonte dos bytes e requisições medidos em `mede_pagina`
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+    return chrome_options
+
+def bloqueia_recursos(driver, bloqueia_css=False, padroes_extras=()):
+    """
+    Bloqueia, via DevTools (Network.setBlockedURLs), imagens, fontes, mídia e domínios de terceiros.
+    As requisições bloqueadas falham dentro do navegador, sem chegar à rede.
+
+    Parâmetros:
+        bloqueia_css (bool): bloqueia também as folhas de estilo; só para páginas que são apenas lidas
+            (anúncios), nunca para as que dependem de layout (scroll, botões de carregar mais).
+        padroes_extras (list): padrões de url adicionais (curingas '*').
+    """
+
+    padroes = PADROES_TIPOS_BLOQUEADOS + DOMINIOS_BLOQUEADOS + list(padroes_extras)
+    if bloqueia_css:
+        padroes += PADROES_CSS
+
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': padroes})
+
+def cria_driver(cria_opcoes=cria_opcoes_chrome, bloqueia=True, bloqueia_css=False):
+
+    driver = webdriver.Chrome(options=cria_opcoes())
+    if bloqueia:
+        try:
+            bloqueia_recursos(driver, bloqueia_css)
+        except Exception:
+            driver.quit()
+            raise
+
+    return driver
+
+def mede_pagina(driver):
+    """
+    Bytes e requisições da última página carregada, lidos (e consumidos) do log de performance do Chrome.
+
+    Retorna:
+        dict: bytes (transferidos pela rede), requisicoes (concluídas) e bloqueadas, e o etag e o
+            last_modified da resposta do documento, se o servidor os enviou (validadores do cache HTTP);
+            vazio se o log de performance não estiver disponível.
+    """
+
+    try:
+        eventos = driver.get_log('performance')
+    except Exception:
+        return {}
+
+    medida = {'bytes': 0, 'requisicoes': 0, 'bloqueadas': 0}
+    for evento in eventos:
+        mensagem = json.loads(evento['message'])['message']
+        if mensagem['method'] == 'Network.responseReceived' and mensagem['params'].get('type') == 'Document' and 'etag' not in medida:
+            # o primeiro documento é a página; os nomes dos cabeçalhos vêm em minúsculas no HTTP/2
+            headers = {nome.lower(): valor for nome, valor in mensagem['params']['response'].get('headers', {}).items()}
+            medida['etag'] = headers.get('etag')
+            medida['last_modified'] = headers.get('last-modified')
+        elif mensagem['method'] == 'Network.loadingFinished':
+            medida['bytes'] += mensagem['params'].get('encodedDataLength', 0)
+            medida['requisicoes'] += 1
+        elif mensagem['method'] == 'Network.loadingFailed' and mensagem['params'].get('blockedReason'):
+            medida['bloqueadas'] += 1
+
+    return medida
+
+def resume_paginas(medidas):
+    """
+    Médias por página de uma lista de medidas (`mede_pagina` + 'segundos' de carregamento). As páginas
+    sem log de performance (medida sem 'bytes') entram só na média de segundos; sem nenhuma página com
+    log, as médias de bytes e requisições ficam NaN.
+    """
+
+    df = pd.DataFrame([m for m in medidas if m], columns=['bytes', 'requisicoes', 'bloqueadas', 'segundos'])
+    if df.empty:
+        return {}
+
+    return {'paginas': len(df), 'kb_por_pagina': round(float(df['bytes'].mean()) / 1024, 1),
+            'requisicoes_por_pagina': round(float(df['requisicoes'].mean()), 1),
+            'bloqueadas_por_pagina': round(float(df['bloqueadas'].mean()), 1),
+            'segundos_por_pagina': round(float(df['segundos'].mean()), 3)}
+
+@contextlib.contextmanager
+def navegador(cria_driver=cria_driver, vagas=None):
+    """
+    Abre um navegador avulso (ex.: listagem) e garante que ele seja fechado.
+
+    Com `vagas` (threading.Semaphore compartilhado entre sites), espera uma vaga livre antes de abrir
+    o navegador, de forma que o total de navegadores abertos no processo fica limitado.
+    """
+
+    if vagas is not None:
+        vagas.acquire()
+    driver = None
+    try:
+        driver = cria_driver()
+        yield driver
+    finally:
+        if driver is not None:
+            driver.quit()
+        if vagas is not None:
+            vagas.release()
+
+
+class PoolDeNavegadores:
+    """
+    Pool de navegadores headless de longa duração para coletar páginas de anúncios.
+
+    Cada worker mantém um único navegador aberto e consome links de uma fila limitada,
+    reiniciando o navegador a cada `paginas_por_navegador` páginas (ou após um erro). Uma página
+    com erro é tentada de novo, num navegador novo, até `tentativas` vezes, com backoff exponencial;
+    os links que falharam em todas as tentativas ficam em `falhas`. Um navegador que não abre conta
+    como erro da tentativa: o worker segue consumindo a fila, então `coleta` sempre termina.
+
+    Parâmetros:
+        n_navegadores (int): quantidade de navegadores (workers) abertos em paralelo.
+        paginas_por_navegador (int): páginas visitadas antes de reciclar o navegador.
+        tamanho_fila (int, opcional): tamanho máximo da fila de links. Padrão: 2 * n_navegadores.
+        cria_driver (callable): função que cria um novo webdriver.
+        vagas (threading.Semaphore, opcional): vagas de navegador compartilhadas com outros pools; cada
+            navegador aberto ocupa uma vaga até ser fechado.
+        tentativas (int): tentativas por página.
+        espera_base (float): espera inicial, em segundos, do backoff entre tentativas.
+    """
+
+    def __init__(self, n_navegadores=4, paginas_por_navegador=100, tamanho_fila=None, cria_driver=cria_driver, vagas=None,
+                 tentativas=3, espera_base=1.0):
+        self.n_navegadores = max(1, int(n_navegadores))
+        self.paginas_por_navegador = max(1, int(paginas_por_navegador))
+        self.tamanho_fila = tamanho_fila or 2 * self.n_navegadores
+        self.cria_driver = cria_driver
+        self.vagas = vagas
+        self.tentativas = max(1, int(tentativas))
+        self.espera_base = espera_base
+        self.estatisticas = []
+        self.falhas = []
+
+    def _abre(self, stats):
+
+        inicio = time.perf_counter()
+        if self.vagas is not None:
+            self.vagas.acquire()
+        try:
+            driver = self.cria_driver()
+        except Exception:
+            if self.vagas is not None:
+                self.vagas.release()
+            raise
+        stats['tempo_inicializacao'] += time.perf_counter() - inicio
+        stats['navegadores_abertos'] += 1
+
+        return driver
+
+    def _worker(self, id_worker, fila, resultados, funcao_coleta):
+
+        stats = {'worker': id_worker, 'paginas': 0, 'erros': 0, 'retentativas': 0, 'navegadores_abertos': 0,
+                 'tempo_inicializacao': 0.0, 'tempo_coleta': 0.0}
+        driver = None
+        paginas_driver = 0
+
+        while True:
+            item = fila.get()
+            if item is None:
+                break
+            posicao, link = item
+
+            for tentativa in range(1, self.tentativas + 1):
+                try:
+                    if driver is None:
+                        driver = self._abre(stats)
+                        paginas_driver = 0
+
+                    inicio = time.perf_counter()
+                    try:
+                        resultados[posicao] = funcao_coleta(driver, link)
+                    finally:
+                        stats['tempo_coleta'] += time.perf_counter() - inicio
+                    stats['paginas'] += 1
+                except Exception as e:
+                    print(f'[worker {id_worker}] erro ao coletar {link} (tentativa {tentativa}/{self.tentativas}): {e}')
+                    stats['erros'] += 1
+                    # navegador pode ter ficado num estado inválido: reinicia antes de tentar de novo
+                    if driver is not None:
+                        self._fecha(driver)
+                        driver = None
+                    if tentativa < self.tentativas:
+                        stats['retentativas'] += 1
+                        time.sleep(self.espera_base * 2 ** (tentativa - 1) + random.uniform(0, self.espera_base))
+                    continue
+
+                paginas_driver += 1
+                if paginas_driver >= self.paginas_por_navegador:
+                    self._fecha(driver)
+                    driver = None
+                break
+            else:
+                self.falhas.append(link)
+
+        if driver is not None:
+            self._fecha(driver)
+
+        self.estatisticas.append(stats)
+
+    def _fecha(self, driver):
+        # um erro ao fechar não pode encerrar o worker: a fila deixaria de ser consumida e `coleta` travaria
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f'erro ao fechar o navegador: {e}')
+        finally:
+            if self.vagas is not None:
+                self.vagas.release()
+
+    def coleta(self, links, funcao_coleta):
+        """
+        Executa `funcao_coleta(driver, link)` para cada link e retorna os resultados
+        na mesma ordem dos links. Links que falharam são descartados e listados em `falhas`.
+        """
+
+        fila = queue.Queue(maxsize=self.tamanho_fila)
+        resultados = [None] * len(links)
+        self.estatisticas = []
+        self.falhas = []
+
+        workers = [threading.Thread(target=self._worker, args=(i, fila, resultados, funcao_coleta), daemon=True)
+                   for i in range(self.n_navegadores)]
+        for w in workers:
+            w.start()
+
+        for posicao, link in enumerate(links):
+            fila.put((posicao, link))
+        for _ in workers:
+            fila.put(None)
+
+        for w in workers:
+            w.join()
+
+        return [r for r in resultados if r is not None]
+
+    def relatorio(self):
+
+        df = pd.DataFrame(self.estatisticas).sort_values('worker').reset_index(drop=True)
+        tempo_total = df['tempo_inicializacao'] + df['tempo_coleta']
+        df['paginas_por_segundo'] = (df['paginas'] / tempo_total.where(tempo_total > 0)).fillna(0).round(3)
+
+        return df
+
+
+def compara_perfis(links, timeout=60):
+    """
+    Carrega os mesmos links com o perfil antigo (load completo, sem bloqueio) e com o perfil enxuto
+    (eager, com bloqueio de recursos) e mede bytes e tempo de carregamento por página.
+
+    Retorna:
+        pd.DataFrame: médias por perfil e a economia do perfil enxuto.
+    """
+
+    perfis = {
+        'completo': lambda: cria_driver(lambda: cria_opcoes_chrome(eager=False, enxuto=False), bloqueia=False),
+        'enxuto': lambda: cria_driver(bloqueia_css=True),
+    }
+
+    resumo = {}
+    for nome, cria in perfis.items():
+        medidas = []
+        with navegador(cria) as driver:
+            driver.set_page_load_timeout(timeout)
+            mede_pagina(driver)
+            for link in links:
+                inicio = time.perf_counter()
+                driver.get(link)
+                medida = mede_pagina(driver)
+                medida['segundos'] = time.perf_counter() - inicio
+                medidas.append(medida)
+        resumo[nome] = resume_paginas(medidas)
+
+    df = pd.DataFrame(resumo).T
+    df.loc['economia'] = df.loc['completo'] - df.loc['enxuto']
+    df['paginas'] = len(links)
+
+    return df
@@ -0,0 +1,74 @@
+import time
+
+import bs4
+import pandas as pd
+
+
+def cria_strainer(seletores):
+    """
+    Cria um SoupStrainer que mantém apenas os elementos (e seus filhos) que podem casar com os seletores.
+
+    Parâmetros:
+        seletores (dict): nome do campo -> (tag, classe), no mesmo formato de `find_all(tag, {'class': classe})`.
+    """
+
+    tags = sorted({tag for tag, _ in seletores.values()})
+    classes = {c for _, classe in seletores.values() for c in classe.split()}
+
+    # durante o parse o atributo class ainda é a string original, ex.: 'title title-default'
+    def tem_classe(valor):
+        if not valor:
+            return False
+        valores = valor if isinstance(valor, list) else valor.split()
+        return any(c in classes for c in valores)
+
+    return bs4.SoupStrainer(tags, attrs={'class': tem_classe})
+
+def cria_soup(conteudo, strainer=None):
+    if isinstance(conteudo, bytes):
+        conteudo = conteudo.decode('utf-8', 'ignore')
+    return bs4.BeautifulSoup(conteudo, 'lxml', parse_only=strainer)
+
+def seleciona(soup, seletores):
+    """
+    Executa cada seletor uma única vez e retorna {nome do campo: lista de elementos}.
+    """
+    return {nome: soup.find_all(tag, {'class': classe}) for nome, (tag, classe) in seletores.items()}
+
+def benchmark_parser(arquivos_html, seletores, repeticoes=50):
+    """
+    Compara o parse completo com html.parser com o parse seletivo (lxml + SoupStrainer) sobre páginas salvas,
+    conferindo se os dois extraem exatamente os mesmos textos.
+
+    Retorna:
+        pd.DataFrame: tempo médio por página (ms) de cada modo e o ganho do parse seletivo.
+    """
+
+    paginas = []
+    for arquivo in arquivos_html:
+        with open(arquivo, 'rb') as f:
+            paginas.append(f.read())
+
+    strainer = cria_strainer(seletores)
+    modos = {
+        'html.parser completo': lambda conteudo: seleciona(bs4.BeautifulSoup(conteudo.decode('utf-8', 'ignore'), 'html.parser'), seletores),
+        'lxml seletivo': lambda conteudo: seleciona(cria_soup(conteudo, strainer), seletores),
+    }
+
+    resultados = []
+    textos = {}
+    for modo, funcao in modos.items():
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            for conteudo in paginas:
+                funcao(conteudo)
+        segundos = time.perf_counter() - inicio
+
+        textos[modo] = [{nome: [e.get_text() for e in els] for nome, els in funcao(conteudo).items()} for conteudo in paginas]
+        resultados.append({'modo': modo, 'ms_por_pagina': round(1000 * segundos / (repeticoes * len(paginas)), 3)})
+
+    df = pd.DataFrame(resultados)
+    df['ganho'] = (df['ms_por_pagina'].iloc[0] / df['ms_por_pagina']).round(2)
+    df['mesmo_resultado'] = [textos[modo] == textos['html.parser completo'] for modo in modos]
+
+    return df
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ServidorHTMLLocal:
+    """
+    Servidor HTTP local que simula um site de imobiliária servindo páginas HTML salvas.
+
+    Um caminho existente na pasta é servido diretamente. Qualquer outro caminho recebe
+    um dos arquivos .html da pasta (sempre o mesmo para o mesmo caminho), o que permite
+    simular milhares de anúncios a partir de poucas páginas salvas. As respostas trazem ETag
+    e requisições com If-None-Match válido recebem 304.
+
+    Uso:
+        with ServidorHTMLLocal('buscador-razao/fixtures', latencia=0.05) as servidor:
+            busca_paginas([servidor.url + 'imovel/1', ...])
+    """
+
+    def __init__(self, pasta, latencia=0.0, porta=0):
+        self.pasta = pasta
+        self.latencia = latencia
+        self.porta = porta
+        self.arquivos = sorted(f for f in os.listdir(pasta) if f.endswith('.html'))
+        self.requisicoes = 0
+
+    def _conteudo(self, caminho):
+
+        arquivo = os.path.join(self.pasta, caminho.lstrip('/').split('?')[0])
+        if not os.path.isfile(arquivo):
+            indice = int(hashlib.md5(caminho.encode()).hexdigest(), 16) % len(self.arquivos)
+            arquivo = os.path.join(self.pasta, self.arquivos[indice])
+
+        with open(arquivo, 'rb') as f:
+            return f.read()
+
+    def __enter__(self):
+
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.requisicoes += 1
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                conteudo = servidor._conteudo(self.path)
+                etag = '"{}"'.format(hashlib.md5(conteudo).hexdigest())
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(conteudo)))
+                self.end_headers()
+                self.wfile.write(conteudo)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', self.porta), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,5 @@
+from busca_apartamentos.sites.apolar import Apolar
+from busca_apartamentos.sites.cilar import Cilar
+from busca_apartamentos.sites.razao import Razao
+
+SITES = {site.nome: site for site in [Apolar, Cilar, Razao]}
@@ -0,0 +1,119 @@
+import numpy as np
+from selenium.webdriver.common.by import By
+
+from busca_apartamentos.esperas import espera, elemento_presente, elemento_clicavel, quantidade_aumentou, qualquer
+from busca_apartamentos.parsing import cria_strainer, cria_soup, seleciona
+from busca_apartamentos.sites.base import Site
+
+LINK = 'https://www.apolar.com.br/alugar/apartamento/curitiba?mensal'
+
+CARD_ANUNCIO = (By.CLASS_NAME, 'property-component')
+BOTAO_CARREGAR_MAIS = (By.CLASS_NAME, 'load-more')
+
+SELETORES_ANUNCIO = {
+    'titulo': ('h1', 'property-title'),
+    'endereco': ('a', 'property-address'),
+    'valores': ('div', 'price-box'),
+    'atributos': ('li', 'highlight'),
+    'descricao': ('div', 'description'),
+    'ficha_tecnica': ('ul', 'property-details'),
+}
+STRAINER_ANUNCIO = cria_strainer(SELETORES_ANUNCIO)
+STRAINER_VITRINE = cria_strainer({'anuncios': ('div', 'property-component')})
+
+
+class Apolar(Site):
+
+    nome = 'apolar'
+    dominio = 'www.apolar.com.br'
+    pronto = (By.CSS_SELECTOR, 'h1.property-title')
+
+    def get_vitrine(self, LINK):
+
+        with self.navegador() as driver:
+            driver.get(LINK)
+            espera(driver, elemento_presente(CARD_ANUNCIO), timeout=30,
+                   nome='vitrine: carregamento inicial', orcamento_antigo=5, relatorio=self.relatorio_esperas)
+
+            SCROLL_PAUSE_TIME = 5
+            SCROLL_TIMEOUT = 15
+
+            # Get scroll height
+            last_height = driver.execute_script("return document.body.scrollHeight")
+
+            while True:
+                n_anuncios = len(driver.find_elements(*CARD_ANUNCIO))
+
+                # Scroll down to bottom
+                driver.execute_script(f"window.scrollTo(0, {int(last_height*0.8)});")
+
+                # Espera o botão 'carregar mais' ser reabilitado (ou não existir)
+                espera(driver, qualquer(elemento_clicavel(BOTAO_CARREGAR_MAIS), lambda d: not d.find_elements(*BOTAO_CARREGAR_MAIS)),
+                       timeout=SCROLL_TIMEOUT, nome='vitrine: botão carregar mais', relatorio=self.relatorio_esperas)
+                try:
+                    load_more = driver.find_element(*BOTAO_CARREGAR_MAIS)
+                    load_more.click()
+                except:
+                    pass
+
+                # Wait to load page
+                carregou = espera(driver, quantidade_aumentou(CARD_ANUNCIO, n_anuncios), timeout=SCROLL_TIMEOUT,
+                                  nome='vitrine: novos anúncios', orcamento_antigo=SCROLL_PAUSE_TIME, relatorio=self.relatorio_esperas)
+
+                # Calculate new scroll height and compare with last scroll height
+                new_height = driver.execute_script("return document.body.scrollHeight")
+
+                if not carregou and new_height == last_height:
+                    break
+                last_height = new_height
+
+            return cria_soup(driver.page_source, STRAINER_VITRINE)
+
+    def get_anuncio_link(self, anuncio):
+        return anuncio.findAll('a')[-1]['href']
+
+    def descobre_links(self):
+
+        print('Coletando dados da vitrine')
+        vitrine = self.get_vitrine(LINK)
+
+        print('Coletando links de todos os anuncios')
+        return [self.get_anuncio_link(anuncio) for anuncio in vitrine.findAll('div', {'class': 'property-component'})]
+
+    def parse_anuncio(self, link_anuncio, html):
+
+        page = seleciona(cria_soup(html, STRAINER_ANUNCIO), SELETORES_ANUNCIO)
+        anuncio_infos = {}
+
+        anuncio_infos['site'] = 'Apolar'
+        anuncio_infos['data_coleta'] = self.contexto.data
+        try:
+            anuncio_infos['titulo'] = page['titulo'][0].text
+        except:
+            anuncio_infos['titulo'] = np.nan
+        try:
+            anuncio_infos['link'] = link_anuncio
+        except:
+            anuncio_infos['link'] = np.nan
+        try:
+            anuncio_infos['endereco'] = page['endereco'][0].text
+        except:
+            anuncio_infos['endereco'] = np.nan
+        try:
+            anuncio_infos['valores'] = ', '.join([i.text.replace('A partir de','Aluguel').replace('   ','').replace('\n','') .replace('Outros valores','').replace('/mês','').replace('  ',', ').strip() for i in page['valores']])
+        except:
+            anuncio_infos['valores'] = np.nan
+        try:
+            anuncio_infos['atributos'] = ', '.join([i.text for i in page['atributos']]).replace('\n','').replace('                        ',' ').replace('                      ', ' ').replace('(','').replace(')','').strip().replace('  ',', ')
+        except:
+            anuncio_infos['atributos'] = np.nan
+        try:
+            anuncio_infos['descricao'] = page['descricao'][0].text
+        except:
+            anuncio_infos['descricao'] = np.nan
+        try:
+            anuncio_infos['ficha_tecnica'] = ', '.join([i.text for i in page['ficha_tecnica'][0]]).replace('\n                        ','')
+        except:
+            anuncio_infos['ficha_tecnica'] = np.nan
+
+        return anuncio_infos
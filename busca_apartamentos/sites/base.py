@@ -0,0 +1,203 @@
+import datetime
+import os
+import time
+
+import pandas as pd
+
+from busca_apartamentos.arquivo_html import ArquivoHTML
+from busca_apartamentos.cache_http import revalida
+from busca_apartamentos.configuracao import AMOSTRA_COBERTURA, BLOQUEIA_RECURSOS, REQUISICOES_POR_SEGUNDO, TIMEOUT_PAGINA
+from busca_apartamentos.esperas import RelatorioEsperas, espera, elemento_presente
+from busca_apartamentos.http_async import busca_paginas
+from busca_apartamentos.limites import limites_do_dominio
+from busca_apartamentos.metricas import MetricasColeta
+from busca_apartamentos.navegador import PoolDeNavegadores, cria_driver, cria_opcoes_chrome, mede_pagina, navegador, resume_paginas
+
+
+class ContextoColeta:
+    """
+    Recursos compartilhados pelos sites de uma execução: a data da coleta, o cache HTTP e as vagas
+    de navegador (um único limite de navegadores abertos para todos os sites).
+
+    Parâmetros:
+        data (str, opcional): data da coleta (YYYY-MM-DD); por padrão, hoje.
+        cache (CacheHTTP, opcional): cache das páginas de anúncio.
+        vagas_navegadores (threading.Semaphore, opcional): vagas de navegador compartilhadas.
+        n_navegadores (int): navegadores do pool de cada site.
+        paginas_por_navegador (int): páginas visitadas antes de reciclar um navegador.
+        pasta_arquivo (str, opcional): pasta dos arquivos WARC com as páginas coletadas; sem ela, as páginas não são arquivadas.
+    """
+
+    def __init__(self, data=None, cache=None, vagas_navegadores=None, n_navegadores=4, paginas_por_navegador=100,
+                 pasta_arquivo=None):
+        self.data = data or datetime.datetime.today().strftime('%Y-%m-%d')
+        self.cache = cache
+        self.vagas_navegadores = vagas_navegadores
+        self.n_navegadores = n_navegadores
+        self.paginas_por_navegador = paginas_por_navegador
+        self.pasta_arquivo = pasta_arquivo
+
+    def _cria_driver(self, bloqueia_css, metricas=None):
+
+        def cria():
+            inicio = time.perf_counter()
+            driver = cria_driver(cria_opcoes_chrome, bloqueia=BLOQUEIA_RECURSOS, bloqueia_css=bloqueia_css)
+            if metricas is not None:
+                metricas.adiciona_tempo('inicializacao_navegador', time.perf_counter() - inicio)
+                metricas.conta('navegadores_abertos')
+            return driver
+
+        return cria
+
+    def navegador(self, metricas=None):
+        """
+        Navegador avulso para as listagens: perfil enxuto e eager, mas com CSS, porque a navegação
+        depende de layout (scroll, botões de carregar mais e de paginação).
+        """
+        return navegador(self._cria_driver(False, metricas), self.vagas_navegadores)
+
+    def pool(self, metricas=None):
+        """
+        Pool das páginas de anúncio, que só são lidas: perfil enxuto, eager e também sem CSS.
+        """
+        return PoolDeNavegadores(n_navegadores=self.n_navegadores,
+                                 paginas_por_navegador=self.paginas_por_navegador,
+                                 cria_driver=self._cria_driver(True, metricas),
+                                 vagas=self.vagas_navegadores)
+
+
+class Site:
+    """
+    Adaptador de um site de imobiliária.
+
+    Cada site implementa três etapas, usadas tanto pelo container do próprio site quanto pelo agendador
+    que roda todos os sites ao mesmo tempo:
+        descobre_links(): links de todos os anúncios da listagem do dia.
+        busca_detalhes(links): DataFrame com um registro por anúncio coletado.
+        parse_anuncio(link, html): registro (dict) de um anúncio a partir do HTML da página.
+
+    Atributos de classe:
+        nome (str): nome do site nos arquivos do bucket e no índice.
+        dominio (str): domínio do site.
+        concorrencia (int): requisições HTTP simultâneas ao domínio.
+        requisicoes_por_segundo (float): taxa máxima de requisições ao domínio (HTTP e navegador); 0 sem limite.
+        pronto (tuple, opcional): localizador de um elemento que indica que a página de anúncio já tem o
+            conteúdo do parse; como o navegador é eager, o `get` pode voltar antes de o JavaScript renderizá-lo.
+        timeout_pagina (float): timeout de carregamento das páginas no navegador.
+    """
+
+    nome = None
+    dominio = None
+    concorrencia = 8
+    requisicoes_por_segundo = REQUISICOES_POR_SEGUNDO
+    pronto = None
+    timeout_pagina = TIMEOUT_PAGINA
+
+    def __init__(self, contexto=None):
+        self.contexto = contexto or ContextoColeta()
+        self.relatorio_esperas = RelatorioEsperas()
+        self.medidas_paginas = []
+        self.metricas = MetricasColeta(self.nome)
+        self.arquivo = None
+        if self.contexto.pasta_arquivo:
+            caminho = os.path.join(self.contexto.pasta_arquivo, self.nome, f'{self.contexto.data}.warc.gz')
+            self.arquivo = ArquivoHTML(caminho, self.contexto.data)
+        self.limites = limites_do_dominio(self.dominio, requisicoes_por_segundo=self.requisicoes_por_segundo,
+                                          rajada=self.concorrencia)
+
+    @property
+    def cache(self):
+        return self.contexto.cache
+
+    def busca_paginas(self, links, **kwargs):
+        return busca_paginas(links, concorrencia=self.concorrencia, limites=self.limites, metricas=self.metricas, **kwargs)
+
+    def navegador(self):
+        return self.contexto.navegador(self.metricas)
+
+    def descobre_links(self):
+        raise NotImplementedError
+
+    def parse_anuncio(self, link, html):
+        raise NotImplementedError
+
+    def parse(self, link, html):
+        """
+        `parse_anuncio` com métricas: tempo de parse e cobertura dos seletores. A página é gravada no arquivo
+        WARC antes do parse, de forma que mesmo as que dão erro podem ser reprocessadas. Depois das primeiras
+        `AMOSTRA_COBERTURA` páginas, avisa sobre campos que não foram encontrados em nenhuma delas
+        (provável mudança de layout do site).
+        """
+
+        if self.arquivo is not None:
+            self.arquivo.grava(link, html)
+
+        try:
+            with self.metricas.etapa('parse'):
+                registro = self.parse_anuncio(link, html)
+        except Exception:
+            self.metricas.conta('erros_parse')
+            raise
+
+        self.metricas.registra_campos(registro)
+        if self.metricas.registros == AMOSTRA_COBERTURA:
+            vazios = [campo for campo, fracao in self.metricas.cobertura().items() if fracao == 0]
+            if vazios:
+                print(f'[{self.nome}] AVISO: campos não encontrados nas primeiras {AMOSTRA_COBERTURA} páginas: {", ".join(vazios)}')
+
+        return registro
+
+    def busca_detalhes(self, links):
+        return self.busca_detalhes_navegador(links)
+
+    def _coleta_navegador(self, driver, link):
+
+        # o navegador respeita a mesma taxa e o mesmo disjuntor das requisições HTTP ao domínio
+        self.limites.aguarda()
+        driver.set_page_load_timeout(self.timeout_pagina)
+        inicio = time.perf_counter()
+        try:
+            with self.metricas.etapa('navegacao'):
+                driver.get(link)
+            if self.pronto is not None:
+                espera(driver, elemento_presente(self.pronto), timeout=self.timeout_pagina,
+                       nome='anúncio: conteúdo', relatorio=self.relatorio_esperas)
+            html = driver.page_source
+        except Exception:
+            self.limites.registra(False)
+            raise
+        self.limites.registra(True)
+        medida = mede_pagina(driver)
+        medida['segundos'] = time.perf_counter() - inicio
+        self.medidas_paginas.append(medida)
+        self.metricas.conta('paginas_navegador')
+        self.metricas.conta('bytes_navegador', medida.get('bytes', 0))
+        if self.cache is not None:
+            # os validadores da resposta do navegador permitem revalidar a página na próxima coleta (`revalida`)
+            self.cache.salva(link, html.encode(), medida.get('etag'), medida.get('last_modified'))
+
+        return self.parse(link, html)
+
+    def busca_detalhes_navegador(self, links):
+        """
+        Coleta as páginas de anúncio com o pool de navegadores. Páginas que o servidor confirma não
+        terem mudado desde a última coleta são lidas do cache, sem abrir o navegador.
+        """
+
+        inalterados = revalida(self.cache, links, self.concorrencia, limites=self.limites, metricas=self.metricas) if self.cache is not None else {}
+        registros = [self.parse(link, html) for link, html in inalterados.items()]
+
+        pool = self.contexto.pool(self.metricas)
+        registros += pool.coleta([link for link in links if link not in inalterados], self._coleta_navegador)
+        for stats in pool.estatisticas:
+            self.metricas.conta('retentativas_navegador', stats['retentativas'])
+        self.metricas.conta('falhas_navegador', len(pool.falhas))
+
+        print(f'[{self.nome}] Desempenho por navegador:')
+        print(pool.relatorio())
+        print(f'[{self.nome}] Bytes e tempo de carregamento por página: {resume_paginas(self.medidas_paginas)}')
+        if pool.falhas:
+            # esses links não entram no checkpoint e são coletados de novo na próxima execução
+            print(f'[{self.nome}] {len(pool.falhas)} anúncios falharam em todas as tentativas')
+
+        return pd.DataFrame(registros)
@@ -0,0 +1,171 @@
+import numpy as np
+from selenium.webdriver.common.by import By
+
+from busca_apartamentos.descoberta import descobre_links, soup_da_pagina
+from busca_apartamentos.esperas import espera, elemento_presente
+from busca_apartamentos.parsing import cria_strainer, cria_soup, seleciona
+from busca_apartamentos.sites.base import Site
+
+URL_LISTAGEM = 'https://cilar.com.br/alugar/apartamento/curitiba-pr?valueType=price&valueMin=100.00&valueMax=30000.00&areaType=area_total&areaMin=0&areaMax=10000&order=1&page={page}'
+
+BOTAO_PAGINACAO = (By.CLASS_NAME, 'paginate_button')
+CARD_ANUNCIO = (By.CLASS_NAME, 'box')
+
+SELETORES_ANUNCIO = {
+    'titulo': ('h1', 'title title-default'),
+    'endereco': ('a', 'anchor'),
+    'detalhes': ('div', 'list'),
+    'aluguel': ('div', 'rental'),
+    'condominium': ('div', 'condominium'),
+    'details_property': ('article', 'col-md-7 col-lg-8 details-property'),
+    'mais_detalhes_imovel': ('ul', 'list-arrow'),
+}
+STRAINER_ANUNCIO = cria_strainer(SELETORES_ANUNCIO)
+STRAINER_LISTAGEM = cria_strainer({'paginacao': ('li', 'paginate_button'), 'anuncios': ('div', 'box')})
+
+
+class Cilar(Site):
+
+    nome = 'cilar'
+    dominio = 'cilar.com.br'
+    pronto = (By.CSS_SELECTOR, 'h1.title')
+
+    def extrai_ultima_pagina(self, soup):
+        list_aux = [i.text for i in soup.findAll('li',{'class': 'paginate_button'})]
+
+        pages = []
+        for i in list_aux:
+            try:
+                pages.append(int(i))
+            except:
+                pass
+
+        return pages[-1]
+
+    def get_last_page(self, LINK):
+        print('Coletando número de páginas')
+        conteudos, _ = self.busca_paginas([LINK])
+
+        if conteudos[LINK]:
+            try:
+                return self.extrai_ultima_pagina(soup_da_pagina(conteudos[LINK], STRAINER_LISTAGEM))
+            except IndexError:
+                pass
+
+        print('Paginação não encontrada no HTML, usando o navegador')
+        return self.get_last_page_selenium(LINK)
+
+    def get_last_page_selenium(self, LINK):
+
+        with self.navegador() as driver:
+            driver.get(LINK)
+
+            espera(driver, elemento_presente(BOTAO_PAGINACAO), timeout=30,
+                   nome='paginação', orcamento_antigo=3, relatorio=self.relatorio_esperas)
+
+            return self.extrai_ultima_pagina(cria_soup(driver.page_source, STRAINER_LISTAGEM))
+
+    def get_anuncio_link(self, anuncio):
+        return 'https://cilar.com.br' + anuncio.findAll('a')[0]['href']
+
+    def extrai_links_pagina(self, conteudo):
+        soup = soup_da_pagina(conteudo, STRAINER_LISTAGEM)
+        return [self.get_anuncio_link(anuncio) for anuncio in soup.findAll('div', {'class':'box'}) if anuncio.find('a')]
+
+    def get_anuncios_links_selenium(self, urls_paginas):
+
+        anuncios_links = []
+
+        with self.navegador() as driver:
+            for LINK in urls_paginas:
+                print(LINK)
+                driver.get(LINK)
+
+                espera(driver, elemento_presente(CARD_ANUNCIO), timeout=30,
+                       nome='página de anúncios', orcamento_antigo=3, relatorio=self.relatorio_esperas)
+
+                soup = cria_soup(driver.page_source, STRAINER_LISTAGEM)
+                anuncios_links += [self.get_anuncio_link(anuncio) for anuncio in soup.findAll('div', {'class':'box'})]
+
+        return anuncios_links
+
+    def descobre_links(self):
+
+        last_page = self.get_last_page(URL_LISTAGEM.format(page=1))
+        print('Número total de páginas: {}'.format(last_page))
+
+        urls_paginas = [URL_LISTAGEM.format(page=page) for page in range(1,last_page + 1)]
+
+        return descobre_links(urls_paginas, self.extrai_links_pagina, fallback_selenium=self.get_anuncios_links_selenium,
+                              concorrencia=self.concorrencia, limites=self.limites, metricas=self.metricas)
+
+    def parse_anuncio(self, link, html):
+
+        soup = seleciona(cria_soup(html, STRAINER_ANUNCIO), SELETORES_ANUNCIO)
+
+        anuncio_info_aux = {}
+
+        anuncio_info_aux['site'] = 'Cilar'
+        anuncio_info_aux['data_coleta'] = self.contexto.data
+
+        try:
+            # titulo
+            anuncio_info_aux['titulo'] = soup['titulo'][0].text
+        except:
+            anuncio_info_aux['titulo'] = np.nan
+
+        try:
+        # titulo
+            anuncio_info_aux['link'] = link
+        except:
+            anuncio_info_aux['link'] = np.nan
+
+        try:
+            # titulo
+            anuncio_info_aux['endereco'] = soup['endereco'][0].find('p').text
+        except:
+            anuncio_info_aux['endereco'] = np.nan
+
+        try:
+            #detalhes
+            anuncio_info_aux['detalhes'] = soup['detalhes'][0].text.split()
+        except:
+            anuncio_info_aux['detalhes'] = np.nan
+
+        try:
+            # aluguel
+            anuncio_info_aux['aluguel'] = soup['aluguel'][0].find('h3').text
+        except:
+            anuncio_info_aux['aluguel'] = np.nan
+
+        try:
+            # condominio
+            anuncio_info_aux['condominio'] = soup['condominium'][0].findAll('dl')[0].text
+        except:
+            anuncio_info_aux['condominio'] = np.nan
+
+        try:
+            # iptu
+            anuncio_info_aux['iptu'] = soup['condominium'][0].findAll('dl')[1].text
+        except:
+            anuncio_info_aux['iptu'] = np.nan
+
+        try:
+            # características do imóvel
+            anuncio_info_aux['caracteristicas_imovel'] = ' '.join([i.text for i in soup['details_property'][0].findAll('p')[0]])
+        except:
+            anuncio_info_aux['caracteristicas_imovel'] = np.nan
+
+        try:
+            # detalhes do condominio
+            anuncio_info_aux['detalhes_condominio'] = ', '.join([i.text for i in soup['details_property'][0].findAll('p')[1::]])
+        except:
+            anuncio_info_aux['detalhes_condominio'] = np.nan
+
+        try:
+            # mais detalhes do imóvel
+            anuncio_info_aux['mais_detalhes_imovel'] = ', '.join([i.text.replace('\n', '').replace('  ', '') for i in soup['mais_detalhes_imovel'][0]])
+        except:
+            anuncio_info_aux['mais_detalhes_imovel'] = np.nan
+
+        return anuncio_info_aux
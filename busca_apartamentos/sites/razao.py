@@ -0,0 +1,278 @@
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+from selenium.webdriver.common.by import By
+
+from busca_apartamentos.configuracao import CONCORRENCIA
+from busca_apartamentos.descoberta import descobre_links, soup_da_pagina
+from busca_apartamentos.esperas import espera, elemento_presente, elemento_clicavel, altura_aumentou, texto_diferente, qualquer
+from busca_apartamentos.parsing import cria_strainer, cria_soup, seleciona
+from busca_apartamentos.sites.base import Site
+
+BASE_URL = 'https://imobiliariarazao.com.br/'
+LINK = 'https://imobiliariarazao.com.br/busca.php?termoPesquisa=Curitiba&codCity=3314&tipoNegocio=2&isLancamento=0&tipo_Imovel%5B%5D=3&referencia=&endereco='
+
+BOTAO_PRIMEIRA_PAGINA = (By.XPATH, '//*[@id="resultados"]/section/div/div[2]/div/ul/li[1]/a')
+BOTAO_ULTIMA_PAGINA = (By.XPATH, '//*[@id="resultados"]/section/div/div[2]/div/ul/li[5]/a')
+PAGINA_ATIVA = (By.CSS_SELECTOR, 'span.btn-padr.active')
+# o mesmo botão da última página (li[5] da paginação), lido no HTML
+SELETOR_ULTIMA_PAGINA = '#resultados ul > li:nth-of-type(5) > a'
+
+SELETORES_ANUNCIO = {
+    'titulo': ('h1', 'titleFicha'),
+    'endereco': ('div', 'enderecoImovel enderecoFicha'),
+    'condominio': ('p', 'valorCond'),
+    'iptu': ('p', 'valorIptu'),
+    'aluguel': ('p', 'valorPrincipalImovel'),
+    'itens_imovel': ('div', 'col-sm-6 itensDescricao'),
+    'descricao': ('div', 'observaFicha'),
+    'atributos': ('div', 'itensImovel'),
+}
+STRAINER_ANUNCIO = cria_strainer(SELETORES_ANUNCIO)
+STRAINER_LISTAGEM = cria_strainer({'anuncios': ('button', 'btn btn-padr btn-detalhes detalhes')})
+
+
+def coalesce(value):
+    try:
+        value
+    except:
+        return np.nan
+    return value
+
+def get_number_page(soup):
+
+    print('Coletando o número da página atual')
+    n_pagina_atual = int(soup.find_all('span',{'class':'btn-padr active'})[0].getText())
+    print(f'Pagina Atual: {n_pagina_atual}')
+
+    return n_pagina_atual
+
+def pass_next_page(driver, pagina_atual, n_pagina_atual, n_ultima_pagina):
+
+    print('Selecionando e clicando na próxima página\n')
+    if pagina_atual <= 3:
+        page_pass = driver.find_element(By.XPATH,f'//*[@id="resultados"]/section/div/div[2]/div/ul/li[{2+pagina_atual}]/a')
+        page_pass.click()
+    elif n_pagina_atual > n_ultima_pagina-2:
+        page_pass = driver.find_element(By.XPATH,f'//*[@id="resultados"]/section/div/div[2]/div/ul/li[{int(6-(n_ultima_pagina - n_pagina_atual))}]/a')
+        page_pass.click()
+    else:
+        page_pass = driver.find_element(By.XPATH,'//*[@id="resultados"]/section/div/div[2]/div/ul/li[5]/a')
+        page_pass.click()
+
+    return driver
+
+def extrai_ultima_pagina(soup):
+    """
+    Número da última página e nome do parâmetro de paginação, lidos do link do botão da última página.
+    A paginação mostra só uma janela de cinco páginas, então os números visíveis não dizem quantas são.
+
+    Retorna:
+        (int, str): última página e parâmetro de paginação do `busca.php`.
+
+    Levanta:
+        ValueError: se o botão não existe ou se o link não traz a página (ex.: paginação em JavaScript).
+    """
+
+    botao = soup.select_one(SELETOR_ULTIMA_PAGINA)
+    if botao is None or not botao.get('href'):
+        raise ValueError('Botão da última página não encontrado')
+
+    # o parâmetro de paginação é o único número do link que não está na busca original
+    busca = dict(parse_qsl(urlsplit(LINK).query, keep_blank_values=True))
+    candidatos = [(nome, valor) for nome, valor in parse_qsl(urlsplit(botao['href']).query)
+                  if valor.isdigit() and busca.get(nome) != valor]
+    if len(candidatos) != 1:
+        raise ValueError(f'Parâmetro de paginação não encontrado em {botao["href"]!r}')
+    nome, valor = candidatos[0]
+
+    return int(valor), nome
+
+def extrai_links_pagina(conteudo):
+    soup = soup_da_pagina(conteudo, STRAINER_LISTAGEM)
+
+    return [anuncio['onclick'].split("'")[1] for anuncio in soup.find_all('button',{'class':'btn btn-padr btn-detalhes detalhes'})]
+
+
+class Razao(Site):
+
+    nome = 'razao'
+    dominio = 'imobiliariarazao.com.br'
+    concorrencia = CONCORRENCIA
+
+    def scroll_page_down(self, driver, timeout=10):
+
+        # Get scroll height
+        last_height = driver.execute_script("return document.body.scrollHeight")
+
+        while True:
+            # Scroll down to bottom
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+
+            # Wait to load page: a página cresceu ou a paginação (fim da lista) já está presente
+            espera(driver, qualquer(altura_aumentou(last_height), elemento_presente(BOTAO_PRIMEIRA_PAGINA)), timeout=timeout,
+                   nome='scroll', orcamento_antigo=0.5, relatorio=self.relatorio_esperas)
+
+            # Calculate new scroll height and compare with last scroll height
+            new_height = driver.execute_script("return document.body.scrollHeight")
+            if new_height == last_height:
+                break
+            last_height = new_height
+
+    def wait_load_button(self, driver):
+        print('Esperando o botão carregar...')
+        espera(driver, elemento_presente(BOTAO_PRIMEIRA_PAGINA), timeout=50,
+               nome='botão de paginação', relatorio=self.relatorio_esperas)
+
+    def get_last_page(self, LINK):
+
+        print('Abrindo site')
+        with self.navegador() as driver:
+            driver.get(LINK)
+            driver.maximize_window()
+
+            print('Indo para o fim da página primeira página')
+            self.scroll_page_down(driver)
+
+            print('Esperando o botão ser carregado')
+            espera(driver, elemento_clicavel(BOTAO_ULTIMA_PAGINA), timeout=50,
+                   nome='botão da última página', orcamento_antigo=3, relatorio=self.relatorio_esperas)
+
+            print('Encontrando o botão da última página e clicando')
+            ultima_pagina = driver.find_element(*BOTAO_ULTIMA_PAGINA)
+            ultima_pagina.click()
+
+            print("Esperando o botão ser carregado")
+            self.wait_load_button(driver)
+
+            print('Coletando o número total de páginas')
+            return get_number_page(cria_soup(driver.page_source))
+
+    def get_link_anuncios(self, LINK, n_ultima_pagina):
+
+        lista_de_links = []
+
+        print('Abrindo a primeira página novamente')
+        with self.navegador() as driver:
+            driver.get(LINK)
+            driver.maximize_window()
+
+            for pagina_atual in range(1, n_ultima_pagina):
+
+                self.scroll_page_down(driver)
+
+                self.wait_load_button(driver)
+
+                soup = cria_soup(driver.page_source)
+
+                n_pagina_atual = get_number_page(soup)
+
+                print('Coletando links dos anúncios')
+                lista_de_links = lista_de_links + [ anuncio['onclick'].split("'")[1] for anuncio in soup.find_all('button',{'class':'btn btn-padr btn-detalhes detalhes'})]
+
+                self.wait_load_button(driver)
+
+                driver = pass_next_page(driver, pagina_atual, n_pagina_atual, n_ultima_pagina)
+
+                espera(driver, texto_diferente(PAGINA_ATIVA, n_pagina_atual), timeout=50,
+                       nome='troca de página', relatorio=self.relatorio_esperas)
+
+        return lista_de_links
+
+    def descobre_paginacao(self, LINK):
+        """
+        Última página e parâmetro de paginação, lidos do HTML da primeira página; None se não estão no HTML.
+        """
+
+        print('Buscando o número de páginas via HTTP')
+        conteudos, _ = self.busca_paginas([LINK])
+
+        if conteudos[LINK]:
+            try:
+                return extrai_ultima_pagina(soup_da_pagina(conteudos[LINK]))
+            except ValueError as e:
+                print(e)
+
+        return None
+
+    def descobre_links(self):
+
+        paginacao = self.descobre_paginacao(LINK)
+        if paginacao is None:
+            print('Paginação não encontrada no HTML, usando o navegador')
+            return [BASE_URL + anuncio for anuncio in self.get_link_anuncios(LINK, self.get_last_page(LINK))]
+
+        n_ultima_pagina, parametro = paginacao
+        urls_paginas = [f'{LINK}&{parametro}={pagina}' for pagina in range(1, n_ultima_pagina + 1)]
+
+        # a navegação por cliques percorre todas as páginas de uma vez, então as urls pendentes são ignoradas
+        fallback_selenium = lambda urls_pendentes: self.get_link_anuncios(LINK, n_ultima_pagina)
+
+        links = descobre_links(urls_paginas, extrai_links_pagina, fallback_selenium=fallback_selenium,
+                               concorrencia=self.concorrencia, limites=self.limites, metricas=self.metricas)
+
+        return [BASE_URL + anuncio for anuncio in links]
+
+    def parse_anuncio(self, link, conteudo):
+
+        soup = seleciona(cria_soup(conteudo, STRAINER_ANUNCIO), SELETORES_ANUNCIO)
+
+        anuncios_aux = {}
+
+        # site
+        anuncios_aux['site'] = 'razao'
+
+        # link
+        anuncios_aux['data_coleta'] = self.contexto.data
+
+        # link
+        anuncios_aux['link'] = link
+
+        # titulo
+        anuncios_aux['titulo'] = coalesce(soup['titulo'][0].getText())
+
+        # endereco
+        anuncios_aux['endereco'] = coalesce(soup['endereco'][0].find('p').getText().strip())
+
+        # condominio
+        anuncios_aux['condominio'] = coalesce(soup['condominio'][0].getText())
+
+        # iptu
+        anuncios_aux['iptu'] = coalesce(soup['iptu'][0].getText())
+
+        # aluguel
+        anuncios_aux['aluguel'] = coalesce(soup['aluguel'][0].getText())
+
+        # itens_do_imovel
+        anuncios_aux['itens_imovel'] = coalesce(', '.join([i.getText() for i in soup['itens_imovel']]))
+
+        # descrição
+        anuncios_aux['descricao'] = coalesce(soup['descricao'][0].find('p').getText())
+
+        # atributos
+        try:
+            anuncios_aux['atributos'] = [item.find('p',{'class':'quantItem'}).getText() for item in soup['atributos']]
+        except:
+            anuncios_aux['atributos'] = np.nan
+
+        return anuncios_aux
+
+    def busca_detalhes(self, links):
+        """
+        As páginas de anúncio da Razão vêm prontas no HTML: são buscadas via HTTP, sem navegador.
+        """
+
+        conteudos, stats = self.busca_paginas(links, cache=self.cache)
+        print(f'Páginas buscadas: {stats}')
+
+        anuncios_list = []
+        for link, conteudo in conteudos.items():
+            if conteudo is None:
+                continue
+            try:
+                anuncios_list.append(self.parse(link, conteudo))
+            except Exception as e:
+                print(f'Erro ao processar {link}: {e!r}')
+
+        return pd.DataFrame(anuncios_list)
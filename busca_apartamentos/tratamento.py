@@ -0,0 +1,573 @@
+import collections
+import functools
+import hashlib
+import re
+import time
+
+import numpy as np
+import pandas as pd
+from unidecode import unidecode
+
+from busca_apartamentos import extracao_valores
+from busca_apartamentos.extracao_valores import (decimal, encadeia, exceto, item_com, limpa, lista_de_texto, lista_unida,
+                                                 na_lista, parte, por_valor_unico, reais, rotulado, se_contem,
+                                                 se_nao_contem, substitui)
+
+# colunas dos dados tratados (`tratamento_dados_*` e `feature_engineering` dos buscadores)
+COLUNAS_FLAGS = [
+    'mobiliado', 'mobilia_planejada', 'piscina', 'academia', 'sacada', 'churrasqueira', 'salao_de_festas',
+    'salao_de_jogos', 'espaco_coworking', 'quadra_esportes', 'playground', 'lavanderia', 'espaco_pet',
+    'imovel_decorado', 'totalmente_mobiliado', 'hidromassagem',
+]
+COLUNAS_CONTAGENS = ['quartos', 'suites', 'banheiros', 'vagas_garagem', 'andar']
+COLUNAS_VALORES = ['aluguel', 'condominio', 'iptu', 'seguro_incendio', 'area']
+COLUNAS_CATEGORIAS = ['site', 'bairro', 'cidade']
+# texto bruto já convertido nas colunas acima
+COLUNAS_BRUTAS = ['valores', 'atributos', 'detalhes', 'mais_detalhes_imovel', 'ficha_tecnica']
+
+VALORES_FLAGS = {'Sim': True, 'Não': False}
+PADRAO_NUMERO = r'(\d+(?:[.,]\d+)*)'
+
+_TIPOS_INTEIROS = ['UInt8', 'UInt16', 'UInt32', 'Int64']
+
+# palavras (no texto sem acentos e em minúsculas) que marcam cada comodidade; basta uma aparecer, mesmo dentro de outra palavra
+COMODIDADES_CILAR = {
+    'mobiliado': ['mobilia', 'mobiliado', 'semi-mobiliado', 'sofa', 'armario', 'armarios', 'tv', 'cama', 'mesa', 'cadeiras', 'eletrodomesticos'],
+    'mobilia_planejada': ['armarios planejados', 'planejados', 'planejado', 'sob medida'],
+    'piscina': ['piscina'],
+    'academia': ['academia', 'fitness', 'espaco fitness', 'sala fitness', 'ginastica'],
+    'sacada': ['sacada'],
+    'churrasqueira': ['churrasqueira', 'espaco churrasco', 'churrasco'],
+    'salao_de_festas': ['salao de festa', 'salao de festas'],
+    'salao_de_jogos': ['salao de jogos'],
+    'espaco_coworking': ['coworking', 'sala coworking'],
+    'quadra_esportes': ['quadra de esportes', 'quadra coberta', 'quadra poliesportiva', 'poliesportiva'],
+    'playground': ['playground'],
+    'lavanderia': ['lavanderia'],
+    'espaco_pet': ['espaco pet', 'pet space'],
+    'imovel_decorado': ['decorado', 'charmoso', 'charmosa', 'design', 'layout'],
+    'totalmente_mobiliado': ['100% mobiliado', 'todo mobiliado', 'studio mobiliado'],
+    'hidromassagem': ['hidromassagem'],
+}
+COMODIDADES_APOLAR = dict(COMODIDADES_CILAR, mobiliado=['mobilia', 'moveis planejados', 'mobiliado', 'semi-mobiliado', 'sofa', 'armario',
+                                                        'armarios', 'tv', 'cama', 'mesa', 'cadeiras', 'eletrodomesticos'])
+COMODIDADES_RAZAO = {flag: [flag.replace('_', ' ')] for flag in ['mobiliado', 'piscina', 'academia', 'sacada', 'churrasqueira', 'salao_de_festas']}
+
+# Regras de tratamento: {coluna de destino: Regra}, aplicadas na ordem da tabela por `TratamentoSite`.
+#   fonte: coluna de origem; uma tupla de colunas (vale a primeira em que o padrão é encontrado); ou None
+#       (coluna constante, com o valor `ausente`).
+#   padrao: extrator de `extracao_valores`, expressão regular (vale o primeiro grupo), tupla de etapas aplicadas
+#       em sequência ou None (o texto como está); nas flags, a lista de palavras da comodidade.
+#   tipo: conversão do trecho extraído (ver `TIPOS`) ou 'flag' ('Sim'/'Não', ver `ExtratorComodidades`).
+#   ausente: valor quando o padrão não é encontrado.
+#   nulo: valor quando a fonte é nula; None para usar o mesmo de `ausente`.
+Regra = collections.namedtuple('Regra', ['fonte', 'padrao', 'tipo', 'ausente', 'nulo'], defaults=(None, 'texto', np.nan, None))
+
+TIPOS = {
+    'texto': lambda texto: texto,
+    # bairro e cidade: só a primeira letra maiúscula, sem acentos
+    'local': lambda texto: unidecode(texto.capitalize()),
+    # valores em reais, sem os centavos
+    'valor': reais,
+    'decimal': decimal,
+    # número como está no texto, com ponto decimal ('1.654' -> 1.654, como no tratamento da Razão)
+    'numero': float,
+    'inteiro': int,
+}
+
+
+def _flags(fonte, palavras_por_flag):
+    return {flag: Regra(fonte, palavras, 'flag') for flag, palavras in palavras_por_flag.items()}
+
+REGRAS_APOLAR = {
+    'titulo': Regra('titulo', limpa('\n')),
+    'endereco': Regra('endereco', limpa('\n')),
+    'descricao': Regra('descricao', limpa('\n')),
+    # 'Rua X, 100, Centro - Curitiba'
+    'bairro': Regra('endereco', (parte(', ', -1), parte(' - ', 0)), 'local'),
+    'cidade': Regra('endereco', (parte(', ', -1), parte(' - ', -1)), 'local'),
+    # 'R$ 4.200,00, ,Condomínio R$ 1.100,00 IPTU R$ 230,00 Seguro Incêndio R$ 40,00'
+    'aluguel': Regra('valores', (parte(', ,', 0), limpa('R$ ', 'Aluguel '), parte(' ', 0)), 'valor'),
+    'condominio': Regra('valores', rotulado('Condomínio'), 'valor', 0.0),
+    'iptu': Regra('valores', rotulado('IPTU'), 'valor', 0.0),
+    'seguro_incendio': Regra('valores', rotulado('Incêndio'), 'valor', 0.0),
+    # '241m² privativa, , 1 quarto, , 1 suite, , 2 banheiros, , 1 vaga'; a área fica como texto ('241 privativa')
+    'area': Regra('atributos', item_com('m²')),
+    'banheiros': Regra('atributos', (item_com('banheiro'), limpa('s')), 'inteiro', 0),
+    'quartos': Regra('atributos', (item_com('quarto'), limpa('s')), 'inteiro', 0),
+    'suites': Regra('atributos', (item_com('suite'), limpa('s')), 'inteiro', 0),
+    'vagas_garagem': Regra('atributos', (item_com('vaga'), limpa('s')), 'inteiro', 0),
+    **_flags('descricao', COMODIDADES_APOLAR),
+}
+
+REGRAS_CILAR = {
+    # lista de detalhes como um texto só ('Área Total 85 m² Quartos 2 ...')
+    'detalhes': Regra('detalhes', lista_unida('Características do imóvel ')),
+    'aluguel': Regra('aluguel', limpa('AluguelR$'), 'valor', 0.0),
+    # alguns anúncios trazem o IPTU na coluna de condomínio: o IPTU é lido antes de o condomínio ser convertido
+    'iptu': Regra(('condominio', 'iptu'), (se_contem('IPTU'), limpa('IPTU  R$')), 'valor', 0.0),
+    'condominio': Regra('condominio', (se_nao_contem('IPTU'), limpa('Condominio  R$')), 'valor', 0.0),
+    'area': Regra('detalhes', r'Área Total (\d+)', 'inteiro', 0),
+    'quartos': Regra('detalhes', r'Quartos (\d+)', 'inteiro', 0),
+    'suites': Regra('detalhes', r'Suítes (\d+)', 'inteiro', 0),
+    'banheiros': Regra('detalhes', r'Banheiros (\d+)', 'inteiro', 0),
+    'andar': Regra('detalhes', r'Andar (\d+)', 'inteiro', 0),
+    'vagas_garagem': Regra('mais_detalhes_imovel', r'Vagas de garagem: (\d+)', 'inteiro', 0),
+    # 'Rua X, 100 - Centro - Curitiba'
+    'bairro': Regra('endereco', parte(' - ', -2), 'local'),
+    'cidade': Regra('endereco', parte(' - ', -1), 'local'),
+    **_flags('caracteristicas_imovel', COMODIDADES_CILAR),
+}
+
+REGRAS_RAZAO = {
+    'titulo': Regra('titulo', limpa()),
+    'endereco': Regra('endereco', limpa()),
+    'bairro': Regra('endereco', parte(' - ', 1)),
+    'cidade': Regra('endereco', parte(' - ', -1)),
+    # 'Cond. R$ 650,00', 'IPTU  R$ 120,00': só a parte antes da vírgula, lida com ponto decimal ('1.654,00' -> 1.654);
+    # 'Sob consulta' e textos vazios ficam 0
+    'condominio': Regra('condominio', (r'(?s).+', limpa('Cond. ', 'R$ '), parte(',', 0), substitui(('Sob consulta', '0'), (' ', ''))),
+                        'numero', 0.0),
+    'iptu': Regra('iptu', (r'(?s).+', substitui(('Sobconsulta', '0'), ('IPTU  R$ ', '')), parte(',', 0)), 'numero', 0.0),
+    # 'R$ 2.300'; sem nenhum dígito ('Consulte'), nulo
+    'aluguel': Regra('aluguel', (r'(?s)^.*\d.*$', limpa('R$ ', '.')), 'numero'),
+    # "['2', '1', '2', '1', '68 m²']": quartos, suítes, banheiros, vagas e área, como texto; '(--)' fica 0
+    'area': Regra('atributos', (na_lista(4), parte(' ', 0), exceto('(--)')), 'texto', 0),
+    'quartos': Regra('atributos', (na_lista(0), exceto('(--)')), 'texto', 0),
+    'suites': Regra('atributos', (na_lista(1), exceto('(--)')), 'texto', 0),
+    'banheiros': Regra('atributos', (na_lista(2), exceto('(--)')), 'texto', 0),
+    'vagas_garagem': Regra('atributos', (na_lista(3), exceto('(--)')), 'texto', 0),
+    # a própria coluna de atributos vira lista
+    'atributos': Regra('atributos', lista_de_texto),
+    **_flags('descricao', COMODIDADES_RAZAO),
+}
+
+# dados tratados gravados pelos buscadores (`feature_engineering`): fontes nulas ficam nulas, valores com centavos
+REGRAS_TRUSTED_APOLAR = {
+    'titulo': Regra('titulo', limpa()),
+    'endereco': Regra('endereco', limpa()),
+    'descricao': Regra('descricao', substitui(('  ', ''), ('\n', ' '))),
+    'bairro': Regra('endereco', (parte(', ', 2), parte(' - ', 0)), 'local'),
+    'cidade': Regra('endereco', (parte(', ', 2), parte(' - ', -1)), 'local'),
+    'area': Regra('atributos', (item_com('m²'), PADRAO_NUMERO), 'decimal'),
+    'banheiros': Regra('atributos', (item_com('banheiro'), r'\d+'), 'inteiro'),
+    'quartos': Regra('atributos', (item_com('quarto'), r'\d+'), 'inteiro'),
+    'suites': Regra('atributos', (item_com('suite'), r'\d+'), 'inteiro'),
+    # 'Garagem: 2, Andar: 5'
+    'vagas_garagem': Regra('ficha_tecnica', (limpa(':'), item_com('Garagem'), r'\d+'), 'inteiro'),
+    'aluguel': Regra('valores', (parte(', ,', 0), limpa('R$ ', 'Aluguel '), parte(' ', 0)), 'decimal'),
+    'condominio': Regra('valores', rotulado('Condomínio'), 'decimal'),
+    'seguro_incendio': Regra('valores', rotulado('Incêndio'), 'decimal'),
+    'iptu': Regra('valores', rotulado('IPTU'), 'decimal'),
+    **_flags('descricao', COMODIDADES_RAZAO),
+}
+
+REGRAS_TRUSTED_CILAR = {
+    'detalhes': REGRAS_CILAR['detalhes'],
+    'iptu': Regra(('condominio', 'iptu'), (se_contem('IPTU'), limpa('IPTU  R$')), 'decimal'),
+    'condominio': Regra('condominio', (se_nao_contem('IPTU'), limpa('Condominio  R$')), 'decimal'),
+    'aluguel': Regra('aluguel', limpa('AluguelR$'), 'valor'),
+    'seguro_incendio': Regra(None, ausente=0),
+    'area': Regra('detalhes', r'Área Total (\d+)', 'inteiro', 0, np.nan),
+    'quartos': Regra('detalhes', r'Quartos (\d+)', 'inteiro', 0, np.nan),
+    'suites': Regra('detalhes', r'Suítes (\d+)', 'inteiro', 0, np.nan),
+    'banheiros': Regra('detalhes', r'Banheiros (\d+)', 'inteiro', 0, np.nan),
+    'andar': Regra('detalhes', r'Andar (\d+)', 'inteiro', 0, np.nan),
+    'vagas_garagem': REGRAS_CILAR['vagas_garagem'],
+    'bairro': REGRAS_CILAR['bairro'],
+    'cidade': REGRAS_CILAR['cidade'],
+    **_flags('caracteristicas_imovel', {'mobiliado': ['mobiliado'], 'sacada': ['sacada']}),
+    **_flags('detalhes_condominio', {'piscina': ['piscina'], 'academia': ['academia'], 'churrasqueira': ['churrasqueira'],
+                                     'salao_de_festas': ['salao de festa']}),
+}
+
+
+def _menor_inteiro(valores):
+
+    # contagens com casas decimais (não deveria acontecer) ficam em float32, sem perder o valor
+    presentes = valores.dropna()
+    if presentes.empty:
+        return valores.astype('UInt8')
+    if (presentes % 1 != 0).any():
+        return valores.astype('float32')
+
+    minimo, maximo = presentes.min(), presentes.max()
+    for tipo in _TIPOS_INTEIROS:
+        limites = np.iinfo(tipo.lower())
+        if limites.min <= minimo and maximo <= limites.max:
+            return valores.astype(tipo)
+
+def _numerico(serie):
+
+    if serie.dtype != object:
+        return pd.to_numeric(serie, errors='coerce')
+
+    # textos: o primeiro número, no formato brasileiro ('98 privativa', '1.200,50'); números já convertidos ficam como estão
+    textos = serie.map(lambda valor: isinstance(valor, str))
+    convertidos = (serie[textos].str.extract(PADRAO_NUMERO, expand=False)
+                   .str.replace(r'\.(?=\d{3}(?:,|$))', '', regex=True)
+                   .str.replace(',', '.', regex=False))
+    serie = serie.copy()
+    serie[textos] = convertidos
+
+    return pd.to_numeric(serie, errors='coerce')
+
+def compacta_tipos(df, categorias=None, remove_brutos=False):
+    """
+    Converte os dados tratados para um esquema compacto em memória:
+
+    - flags ('Sim'/'Não') viram booleanos com máscara de nulos (dtype `boolean`, 1 byte + máscara);
+    - contagens (quartos, suítes, banheiros, vagas, andar) viram o menor inteiro sem sinal que comporta os
+      valores, com nulos (`UInt8`, ...);
+    - valores e área viram float32;
+    - site, bairro e cidade viram categorias (dicionário), e data_coleta vira data.
+
+    Nas colunas numéricas com texto, vale o primeiro número do texto (ex.: '98 privativa'); textos sem
+    número (ex.: '(--)') viram nulos.
+
+    Parâmetros:
+        df (pd.DataFrame): dados tratados de um ou mais sites.
+        categorias (dict, opcional): {coluna: lista de categorias} fixas, para que vários recortes do
+            histórico usem o mesmo dicionário (ver `concatena_compactos`).
+        remove_brutos (bool): remove as colunas de texto bruto já convertidas (valores, atributos, ...).
+
+    Retorna:
+        pd.DataFrame: cópia com os tipos compactos.
+    """
+
+    df = df.copy()
+    categorias = categorias or {}
+
+    for coluna in df.columns.intersection(COLUNAS_FLAGS):
+        df[coluna] = df[coluna].map(VALORES_FLAGS).astype('boolean')
+    for coluna in df.columns.intersection(COLUNAS_CONTAGENS):
+        df[coluna] = _menor_inteiro(_numerico(df[coluna]))
+    for coluna in df.columns.intersection(COLUNAS_VALORES):
+        df[coluna] = _numerico(df[coluna]).astype('float32')
+    for coluna in df.columns.intersection(COLUNAS_CATEGORIAS):
+        if coluna in categorias:
+            df[coluna] = df[coluna].astype(pd.CategoricalDtype(categorias[coluna]))
+        else:
+            df[coluna] = df[coluna].astype('category')
+    if 'data_coleta' in df.columns:
+        df['data_coleta'] = pd.to_datetime(df['data_coleta'])
+    if remove_brutos:
+        df = df.drop(columns=df.columns.intersection(COLUNAS_BRUTAS))
+
+    return df
+
+def concatena_compactos(dfs):
+    """
+    Concatena recortes compactos (ex.: um por data de coleta) mantendo as colunas categóricas: o
+    `pd.concat` de categorias diferentes volta para texto, então todos os recortes passam a usar a
+    união dos dicionários.
+    """
+
+    dfs = list(dfs)
+    for coluna in COLUNAS_CATEGORIAS:
+        recortes = [df[coluna] for df in dfs if coluna in df.columns and isinstance(df[coluna].dtype, pd.CategoricalDtype)]
+        if not recortes:
+            continue
+        tipo = pd.CategoricalDtype(pd.api.types.union_categoricals(recortes).categories)
+        dfs = [df.assign(**{coluna: df[coluna].astype(tipo)}) if coluna in df.columns else df for df in dfs]
+
+    return pd.concat(dfs, axis=0, ignore_index=True)
+
+def compara_memoria(df, **kwargs_compacta):
+    """
+    Memória por anúncio antes e depois de `compacta_tipos`, por coluna.
+
+    Retorna:
+        pd.DataFrame: bytes por anúncio de cada coluna (antes, depois, redução), com o total na última linha.
+    """
+
+    compacto = compacta_tipos(df, **kwargs_compacta)
+    n = max(len(df), 1)
+
+    antes = df.memory_usage(deep=True, index=False) / n
+    depois = compacto.memory_usage(deep=True, index=False).reindex(antes.index, fill_value=0) / n
+    tabela = pd.DataFrame({'bytes_antes': antes, 'bytes_depois': depois,
+                           'tipo_depois': compacto.dtypes.reindex(antes.index).astype(str)})
+    tabela.loc['total', ['bytes_antes', 'bytes_depois']] = [antes.sum(), depois.sum()]
+    tabela['reducao'] = (1 - tabela['bytes_depois'] / tabela['bytes_antes']).round(3)
+
+    return tabela.round({'bytes_antes': 1, 'bytes_depois': 1})
+
+
+_NAO_ASCII = re.compile(r'[^\x00-\x7f]+')
+
+
+@functools.lru_cache(maxsize=4096)
+def _translitera(trecho):
+    return unidecode(trecho)
+
+def normaliza_texto(texto):
+    """
+    Mesmo resultado de `unidecode(texto.lower())`, mas só os trechos com acentos passam pelo unidecode.
+    """
+
+    return _NAO_ASCII.sub(lambda encontrado: _translitera(encontrado.group()), texto.lower())
+
+def _regex_trie(palavras):
+
+    # as palavras viram uma árvore de prefixos ('armario(?:s(?:\ planejados)?)?'): em cada posição do texto,
+    # a expressão testa só os ramos que começam com o caractere dali e fica com a palavra mais longa
+    arvore = {}
+    for palavra in palavras:
+        no = arvore
+        for caractere in palavra:
+            no = no.setdefault(caractere, {})
+        no[''] = {}
+
+    def monta(no):
+        ramos = [re.escape(caractere) + monta(filho) for caractere, filho in sorted(no.items()) if caractere]
+        if not ramos:
+            return ''
+        if len(ramos) == 1 and '' not in no:
+            return ramos[0]
+        return '(?:' + '|'.join(ramos) + ')' + ('?' if '' in no else '')
+
+    return monta(arvore)
+
+
+class ExtratorComodidades:
+    """
+    Marca as comodidades de cada texto (ex.: descrição do anúncio) numa única passada: o texto é
+    normalizado uma vez (minúsculas e sem acentos) e todas as palavras de todas as comodidades são
+    procuradas com uma só expressão regular. Textos repetidos (o mesmo anúncio em várias datas) são
+    processados uma vez.
+
+    O resultado é o mesmo de procurar cada palavra com `palavra in texto`: a expressão (uma árvore de
+    prefixos das palavras) encontra, em cada posição do texto, a palavra mais longa que começa ali, e as
+    palavras mais curtas que começam na mesma posição (prefixos dela) são marcadas junto.
+
+    Parâmetros:
+        palavras_por_flag (dict): {coluna: lista de palavras}, ex.: `COMODIDADES_APOLAR`.
+    """
+
+    def __init__(self, palavras_por_flag):
+        self.flags = list(palavras_por_flag)
+
+        bits = {}
+        for posicao, flag in enumerate(self.flags):
+            for palavra in palavras_por_flag[flag]:
+                bits[palavra] = bits.get(palavra, 0) | 1 << posicao
+
+        self.mascaras = {palavra: 0 for palavra in bits}
+        for palavra in bits:
+            for prefixo in bits:
+                if palavra.startswith(prefixo):
+                    self.mascaras[palavra] |= bits[prefixo]
+        self.padrao = re.compile('(?=(' + _regex_trie(bits) + '))')
+
+    def mascara(self, texto):
+        """
+        Comodidades de um texto, como bits na ordem de `flags`.
+        """
+
+        mascara = 0
+        for palavra in set(self.padrao.findall(normaliza_texto(texto))):
+            mascara |= self.mascaras[palavra]
+
+        return mascara
+
+    def booleanos(self, textos):
+        """
+        Retorna:
+            (np.ndarray, np.ndarray): matriz (textos x flags) de booleanos e máscara dos textos nulos.
+        """
+
+        codigos, unicos = pd.factorize(pd.Series(textos), use_na_sentinel=True)
+        mascaras = np.array([self.mascara(texto) for texto in unicos] + [0], dtype=np.int64)
+        por_linha = mascaras[codigos]
+        matriz = (por_linha[:, None] >> np.arange(len(self.flags))) & 1
+
+        return matriz.astype(bool), codigos == -1
+
+    def extrai(self, textos, sim='Sim', nao='Não'):
+        """
+        Retorna:
+            pd.DataFrame: uma coluna por comodidade, com 'Sim'/'Não'; textos nulos mantêm o valor nulo original.
+        """
+
+        textos = pd.Series(textos)
+        matriz, nulos = self.booleanos(textos)
+        valores = np.where(matriz, sim, nao).astype(object)
+        valores[nulos] = textos.to_numpy(dtype=object)[nulos, None]
+
+        return pd.DataFrame(valores, index=textos.index, columns=self.flags)
+
+
+EXTRATORES_COMODIDADES = {
+    'apolar': ExtratorComodidades(COMODIDADES_APOLAR),
+    'cilar': ExtratorComodidades(COMODIDADES_CILAR),
+    'razao': ExtratorComodidades(COMODIDADES_RAZAO),
+}
+
+
+class TratamentoSite:
+    """
+    Tratamento de um site a partir da sua tabela de regras (ex.: `REGRAS_APOLAR`): todas as regras passam pelo
+    mesmo caminho, e um site novo só precisa de uma tabela.
+
+    As regras são aplicadas na ordem da tabela. Regras seguidas que leem a mesma fonte são aplicadas numa única
+    passada por ela, e cada texto distinto da fonte é lido uma só vez (`por_valor_unico`); uma regra que
+    reescreve a própria fonte (ex.: limpeza do título) encerra a passada, e as seguintes leem o texto já
+    reescrito. As flags seguidas da mesma fonte são marcadas juntas por um `ExtratorComodidades`.
+
+    Parâmetros:
+        regras (dict): {coluna de destino: Regra}.
+    """
+
+    def __init__(self, regras):
+        self.regras = dict(regras)
+
+        self.etapas = []
+        for destino, regra in self.regras.items():
+            fontes = regra.fonte if isinstance(regra.fonte, tuple) else () if regra.fonte is None else (regra.fonte,)
+            anterior = self.etapas[-1] if self.etapas else None
+            if (anterior is not None and fontes and anterior['fontes'] == fontes and anterior['flag'] == (regra.tipo == 'flag')
+                    and not set(anterior['destinos']) & set(fontes)):
+                etapa = anterior
+            else:
+                etapa = {'fontes': fontes, 'flag': regra.tipo == 'flag', 'destinos': [], 'regras': []}
+                self.etapas.append(etapa)
+            etapa['destinos'].append(destino)
+            etapa['regras'].append(regra)
+
+        for etapa in self.etapas:
+            if etapa['flag']:
+                etapa['extrator'] = ExtratorComodidades(dict(zip(etapa['destinos'], (regra.padrao for regra in etapa['regras']))))
+            else:
+                etapa['extratores'] = [self._extrator(regra) for regra in etapa['regras']]
+
+    @staticmethod
+    def _extrator(regra):
+
+        extrai = encadeia(*regra.padrao) if isinstance(regra.padrao, tuple) else encadeia(regra.padrao)
+        converte = TIPOS[regra.tipo]
+
+        def extrator(valor):
+            trecho = extrai(valor)
+            return None if trecho is None else converte(trecho)
+
+        return extrator
+
+    def _aplica_etapa(self, df, etapa):
+
+        destinos, regras = etapa['destinos'], etapa['regras']
+        if not etapa['fontes']:
+            return pd.DataFrame({destino: regra.ausente for destino, regra in zip(destinos, regras)}, index=df.index)
+        if etapa['flag']:
+            return etapa['extrator'].extrai(df[etapa['fontes'][0]])
+
+        extratores = etapa['extratores']
+        resultado = None
+        for fonte in etapa['fontes']:
+            # None: fonte nula ou sem o padrão; com várias fontes, vale a primeira em que o padrão é encontrado
+            parcial = por_valor_unico(df[fonte], lambda valor: [extrator(valor) for extrator in extratores],
+                                      destinos, (None,) * len(destinos))
+            resultado = parcial if resultado is None else resultado.where(resultado.notna(), parcial)
+
+        presentes = df[list(etapa['fontes'])].notna().any(axis=1).to_numpy()
+        for destino, regra in zip(destinos, regras):
+            coluna = resultado[destino]
+            faltantes = coluna.isna()
+            if faltantes.any():
+                nulo = regra.ausente if regra.nulo is None else regra.nulo
+                coluna = coluna.where(~faltantes, np.where(presentes, regra.ausente, nulo))
+            if regra.tipo in ('valor', 'decimal', 'numero'):
+                coluna = coluna.astype('float64')
+            elif regra.tipo == 'inteiro':
+                coluna = coluna.astype('int64' if coluna.notna().all() else 'float64')
+            resultado[destino] = coluna
+
+        return resultado
+
+    def aplica(self, data, compacto=False):
+        """
+        Parâmetros:
+            data (pd.DataFrame): dados brutos do site.
+            compacto (bool): devolve no esquema compacto (ver `compacta_tipos`).
+
+        Retorna:
+            pd.DataFrame: cópia dos dados com as colunas das regras.
+        """
+
+        df = data.copy()
+        for etapa in self.etapas:
+            resultado = self._aplica_etapa(df, etapa)
+            for destino in etapa['destinos']:
+                df[destino] = resultado[destino]
+
+        return compacta_tipos(df) if compacto else df
+
+
+TRATAMENTOS = {
+    'apolar': TratamentoSite(REGRAS_APOLAR),
+    'cilar': TratamentoSite(REGRAS_CILAR),
+    'razao': TratamentoSite(REGRAS_RAZAO),
+}
+# `feature_engineering` dos buscadores
+TRATAMENTOS_TRUSTED = {
+    'apolar': TratamentoSite(REGRAS_TRUSTED_APOLAR),
+    'cilar': TratamentoSite(REGRAS_TRUSTED_CILAR),
+}
+
+def trata_site(data, site, compacto=False):
+    """
+    Trata os dados brutos de um site com as regras dele (`TRATAMENTOS`).
+
+    Parâmetros:
+        data (pd.DataFrame): dados brutos do site.
+        site (str): 'apolar', 'cilar' ou 'razao'.
+        compacto (bool): devolve no esquema compacto (ver `compacta_tipos`).
+    """
+
+    return TRATAMENTOS[site].aplica(data, compacto=compacto)
+
+@functools.lru_cache(maxsize=1)
+def versao_tratamento():
+    """
+    Versão do código do tratamento: hash deste módulo (regras e motor) e dos extratores (`extracao_valores`).
+    Qualquer mudança no código muda a versão, e os dados tratados gravados com a versão anterior são refeitos
+    (ver `busca_apartamentos/materializacao.py`).
+    """
+
+    codigo = hashlib.sha256()
+    for arquivo in (__file__, extracao_valores.__file__):
+        with open(arquivo, 'rb') as f:
+            codigo.update(f.read())
+
+    return codigo.hexdigest()[:16]
+
+
+def _contem_alguma(palavras, texto):
+    return any(palavra in texto for palavra in palavras)
+
+def benchmark_comodidades(textos, palavras_por_flag=COMODIDADES_APOLAR):
+    """
+    Compara a busca antiga (um `.apply` por comodidade, normalizando o texto a cada vez) com o
+    `ExtratorComodidades`, conferindo se os dois marcam as mesmas comodidades.
+
+    Retorna:
+        dict: textos, segundos de cada modo, ganho e se o resultado é o mesmo.
+    """
+
+    textos = pd.Series(textos)
+
+    inicio = time.perf_counter()
+    por_flag = pd.DataFrame({
+        flag: textos.apply(lambda x, palavras=palavras: x if pd.isna(x) else 'Sim' if _contem_alguma(palavras, unidecode(x.lower())) else 'Não')
+        for flag, palavras in palavras_por_flag.items()
+    })
+    segundos_por_flag = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    extraido = ExtratorComodidades(palavras_por_flag).extrai(textos)
+    segundos_extrator = time.perf_counter() - inicio
+
+    return {'textos': len(textos), 'segundos_por_flag': round(segundos_por_flag, 3),
+            'segundos_extrator': round(segundos_extrator, 3),
+            'ganho': round(segundos_por_flag / segundos_extrator, 1) if segundos_extrator else None,
+            'mesmo_resultado': por_flag.equals(extraido)}
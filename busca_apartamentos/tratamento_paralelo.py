@@ -0,0 +1,212 @@
+import collections
+import concurrent.futures
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from busca_apartamentos import configuracao
+from busca_apartamentos.armazenamento import abre_bucket
+from busca_apartamentos.historico import le_parte, particoes, seleciona_particoes
+from busca_apartamentos.tratamento import concatena_compactos, trata_site
+
+# buckets abertos em cada processo do pool (um cliente por processo, reaproveitado entre as partições)
+_BUCKETS = {}
+
+
+def numero_processos(processos=None):
+    """
+    Processos do pool: o pedido, `PROCESSOS_TRATAMENTO` ou, se nenhum, um por núcleo.
+    """
+
+    return processos or configuracao.PROCESSOS_TRATAMENTO or os.cpu_count() or 1
+
+def processos_com_bucket(processos=None):
+    """
+    Processos do pool para tarefas que abrem o bucket pelo nome em cada processo (ver `numero_processos`).
+    O armazenamento em memória (`ARMAZENAMENTO=memoria`) é de cada processo: um processo do pool abriria
+    um bucket vazio, então as tarefas rodam todas no processo principal.
+    """
+
+    if configuracao.ARMAZENAMENTO == 'memoria':
+        return 1
+
+    return numero_processos(processos)
+
+def bucket_do_processo(nome):
+    """
+    Bucket aberto pelo nome uma vez em cada processo do pool e reaproveitado nas tarefas seguintes.
+    """
+
+    if nome not in _BUCKETS:
+        _BUCKETS[nome] = abre_bucket(nome)
+
+    return _BUCKETS[nome]
+
+def executa_em_ordem(funcao, tarefas, processos):
+    """
+    Executa `funcao(*argumentos)` para cada tarefa num pool de processos e devolve os resultados na ordem
+    das tarefas. No máximo duas tarefas por processo ficam em andamento, então as tarefas (ex.: recortes
+    dos dados) são montadas aos poucos e a memória não cresce com o tamanho da entrada.
+    Com um processo, as tarefas rodam no próprio processo, sem pool.
+    """
+
+    if processos == 1:
+        for argumentos in tarefas:
+            yield funcao(*argumentos)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processos) as executor:
+        pendentes = collections.deque()
+        for argumentos in tarefas:
+            pendentes.append(executor.submit(funcao, *argumentos))
+            if len(pendentes) >= 2 * processos:
+                yield pendentes.popleft().result()
+        while pendentes:
+            yield pendentes.popleft().result()
+
+def blocos_por_data(datas, linhas_por_bloco):
+    """
+    Divide as linhas em blocos de datas de coleta consecutivas, com cerca de `linhas_por_bloco` linhas cada.
+    Uma data nunca é dividida entre blocos, e datas vizinhas ficam juntas: o mesmo anúncio se repete de um
+    dia para o outro e, dentro de um bloco, é tratado uma vez só.
+
+    Retorna:
+        list: posições das linhas de cada bloco.
+    """
+
+    codigos, unicos = pd.factorize(pd.Series(datas), sort=True)
+    # linhas sem data formam o último grupo
+    codigos = np.where(codigos == -1, len(unicos), codigos)
+    ordem = np.argsort(codigos, kind='stable')
+    # posição (em `ordem`) onde termina cada data
+    fins = np.searchsorted(codigos[ordem], np.arange(len(unicos) + 1), side='right')
+
+    blocos = []
+    inicio = 0
+    for fim in fins:
+        if fim - inicio >= linhas_por_bloco or (fim == len(ordem) and fim > inicio):
+            blocos.append(ordem[inicio:fim])
+            inicio = fim
+
+    return blocos
+
+def _trata_bloco(bloco, site, compacto):
+    return trata_site(bloco, site, compacto=compacto)
+
+def trata_em_blocos(data, site, processos=None, por='data_coleta', linhas_por_bloco=None, compacto=False):
+    """
+    Trata os dados brutos de um site em blocos, num pool de processos. O tratamento é feito linha a linha,
+    então o resultado é o mesmo de `trata_site` sobre tudo, na mesma ordem e com o mesmo índice.
+
+    Parâmetros:
+        data (pd.DataFrame): dados brutos do site (ex.: o histórico lido com `get_data`).
+        site (str): 'apolar', 'cilar' ou 'razao'.
+        processos (int, opcional): processos do pool (ver `numero_processos`).
+        por (str): coluna da data de coleta, para dividir por recorte diário (ver `blocos_por_data`), ou
+            None, para dividir em intervalos de linhas.
+        linhas_por_bloco (int, opcional): tamanho dos blocos, que limita a memória de cada processo; por padrão,
+            as linhas divididas igualmente entre os processos.
+        compacto (bool): devolve no esquema compacto (ver `compacta_tipos`).
+
+    Retorna:
+        pd.DataFrame: dados tratados.
+    """
+
+    processos = numero_processos(processos)
+    if processos == 1 and linhas_por_bloco is None:
+        return trata_site(data, site, compacto=compacto)
+    # por padrão, um bloco por processo: quanto maior o bloco, mais anúncios repetidos entre datas são tratados uma vez só
+    linhas_por_bloco = linhas_por_bloco or max(1, -(-len(data) // processos))
+
+    if por is not None and por in data.columns:
+        blocos = blocos_por_data(data[por], linhas_por_bloco)
+    else:
+        blocos = [np.arange(inicio, min(inicio + linhas_por_bloco, len(data))) for inicio in range(0, len(data), linhas_por_bloco)]
+    if not blocos:
+        return trata_site(data, site, compacto=compacto)
+
+    tarefas = ((data.iloc[posicoes], site, compacto) for posicoes in blocos)
+    tratados = list(executa_em_ordem(_trata_bloco, tarefas, processos))
+
+    # os blocos por data não são contíguos na entrada: as linhas voltam para as posições originais
+    tratado = concatena_compactos(tratados) if compacto else pd.concat(tratados, axis=0)
+    tratado = tratado.iloc[np.argsort(np.concatenate(blocos), kind='stable')]
+    tratado.index = data.index
+
+    return tratado
+
+def _trata_particao(nome_bucket, partes, colunas, site, compacto):
+
+    try:
+        bucket = bucket_do_processo(nome_bucket)
+        bruto = pd.concat([le_parte(bucket, nome, colunas) for nome in partes], axis=0, ignore_index=True)
+        return trata_site(bruto, site, compacto=compacto), None
+    except Exception as e:
+        return None, repr(e)
+
+def trata_particoes(nome_bucket, site, datas=None, ultimas_datas=None, colunas=None, processos=None, compacto=False):
+    """
+    Lê e trata o histórico bruto de um site por partição (uma data de coleta), num pool de processos: cada
+    processo baixa e trata uma partição por vez, então o histórico bruto inteiro nunca fica em memória.
+    O bucket é aberto em cada processo pelo nome (`abre_bucket`); com o armazenamento em memória, as
+    partições são tratadas uma por vez no processo principal (ver `processos_com_bucket`).
+
+    Parâmetros:
+        nome_bucket (str): bucket dos dados brutos.
+        site (str): 'apolar', 'cilar' ou 'razao'.
+        datas (list, opcional): datas.
+        ultimas_datas (int, opcional): só as datas mais recentes.
+        colunas (list, opcional): colunas lidas; por padrão, todas.
+        processos (int, opcional): processos do pool (ver `numero_processos`).
+        compacto (bool): devolve no esquema compacto (ver `compacta_tipos`).
+
+    Retorna:
+        (pd.DataFrame, dict): dados tratados, em ordem de data, e {data: erro} das partições que falharam.
+    """
+
+    selecionadas = seleciona_particoes(particoes(abre_bucket(nome_bucket)), [site], datas, ultimas_datas)
+    datas_particoes = selecionadas['data'].dt.strftime('%Y-%m-%d').tolist()
+
+    tarefas = ((nome_bucket, partes, colunas, site, compacto) for partes in selecionadas['partes'])
+    tratados = []
+    falhas = {}
+    for data, (tratado, erro) in zip(datas_particoes, executa_em_ordem(_trata_particao, tarefas, processos_com_bucket(processos))):
+        if erro is None:
+            tratados.append(tratado)
+        else:
+            falhas[data] = erro
+
+    if not tratados:
+        return pd.DataFrame(columns=colunas), falhas
+    df = concatena_compactos(tratados) if compacto else pd.concat(tratados, axis=0, ignore_index=True)
+
+    return df, falhas
+
+def benchmark_paralelo(data, site, processos=None, por='data_coleta'):
+    """
+    Tempo do tratamento de todo o histórico de um site num só processo (`trata_site`) e em blocos, com 1, 2,
+    4, ... processos até o número de núcleos, conferindo se o resultado é o mesmo.
+
+    Retorna:
+        pd.DataFrame: uma linha por número de processos, com segundos, ganho sobre `trata_site` e se o resultado é o mesmo.
+    """
+
+    inicio = time.perf_counter()
+    referencia = trata_site(data, site)
+    segundos_referencia = time.perf_counter() - inicio
+
+    maximo = numero_processos(processos)
+    linhas = []
+    for n in sorted({2 ** i for i in range(maximo.bit_length()) if 2 ** i <= maximo} | {maximo}):
+        inicio = time.perf_counter()
+        tratado = trata_em_blocos(data, site, processos=n, por=por)
+        segundos = time.perf_counter() - inicio
+        linhas.append({'processos': n, 'segundos': round(segundos, 3), 'ganho': round(segundos_referencia / segundos, 2),
+                       'mesmo_resultado': referencia.equals(tratado)})
+
+    resultado = pd.DataFrame(linhas)
+    resultado.attrs['segundos_um_processo'] = round(segundos_referencia, 3)
+
+    return resultado
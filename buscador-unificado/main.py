@@ -0,0 +1,65 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from busca_apartamentos import configuracao
+from busca_apartamentos.agendador import executa, reprocessa_site
+from busca_apartamentos.armazenamento import abre_bucket
+from busca_apartamentos.catalogo import reconstroi_catalogo
+from busca_apartamentos.historico import le_historico, migra_legado
+from busca_apartamentos.materializacao import materializa_tratados
+from busca_apartamentos.navegador import compara_perfis
+from busca_apartamentos.tratamento import compara_memoria
+from busca_apartamentos.tratamento_paralelo import benchmark_paralelo
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == 'perfil':
+        # python main.py perfil <url> [<url> ...]: bytes e tempo por página do perfil antigo x perfil enxuto
+        print(compara_perfis(sys.argv[2:]))
+        sys.exit(0)
+
+    if len(sys.argv) > 2 and sys.argv[1] == 'reprocessa':
+        # python main.py reprocessa <site> [<arquivo.warc.gz> ...]: parse das páginas arquivadas, sem coletar
+        reprocessa_site(sys.argv[2], sys.argv[3:])
+        sys.exit(0)
+
+    if len(sys.argv) > 2 and sys.argv[1] == 'migra':
+        # python main.py migra <bucket> [tipado]: copia os CSVs antigos do bucket para o histórico particionado
+        print(migra_legado(abre_bucket(sys.argv[2]), tipado='tipado' in sys.argv[3:]))
+        sys.exit(0)
+
+    if len(sys.argv) > 2 and sys.argv[1] == 'catalogo':
+        # python main.py catalogo <bucket>: monta o catálogo a partir dos manifestos das partições já gravadas
+        catalogo = reconstroi_catalogo(abre_bucket(sys.argv[2]))
+        print(f"{len(catalogo['particoes'])} partições no catálogo")
+        sys.exit(0)
+
+    if len(sys.argv) > 2 and sys.argv[1] == 'memoria':
+        # python main.py memoria <bucket>: bytes por anúncio de todo o histórico tratado, antes e depois do esquema compacto
+        historico, _ = le_historico(abre_bucket(sys.argv[2]))
+        print(f'{len(historico)} anúncios')
+        print(compara_memoria(historico).to_string())
+        sys.exit(0)
+
+    if len(sys.argv) > 2 and sys.argv[1] == 'materializa':
+        # python main.py materializa <bucket brutos> [<bucket tratados>]: trata só as partições novas ou alteradas,
+        # um processo por núcleo (num processo só com ARMAZENAMENTO=memoria, que não é visto pelos outros processos)
+        print(materializa_tratados(sys.argv[2], *sys.argv[3:4], processos=None))
+        sys.exit(0)
+
+    if len(sys.argv) > 3 and sys.argv[1] == 'paralelo':
+        # python main.py paralelo <bucket> <site> [dias]: tempo do tratamento dos últimos dias (365 por padrão)
+        # num só processo e em blocos, com 1, 2, 4, ... processos
+        dias = int(sys.argv[4]) if len(sys.argv) > 4 else 365
+        historico, _ = le_historico(abre_bucket(sys.argv[2]), [sys.argv[3]], ultimas_datas=dias)
+        print(f'{len(historico)} anúncios em {historico["data_coleta"].nunique()} datas')
+        medicao = benchmark_paralelo(historico, sys.argv[3])
+        print(f"um processo, sem blocos: {medicao.attrs['segundos_um_processo']} s")
+        print(medicao.to_string(index=False))
+        sys.exit(0)
+
+    # os sites podem ser passados na linha de comando (python main.py apolar razao) ou na variável SITES
+    nomes_sites = sys.argv[1:] or configuracao.SITES.split(',')
+
+    executa([nome.strip() for nome in nomes_sites])
@@ -3,7 +3,6 @@ import pandas as pd
 import requests
 import bs4
 from unidecode import unidecode
-from google.cloud import storage
 import re
 import ast
 import pickle
@@ -22,44 +21,98 @@ from sklearn.cluster import KMeans
 
 from geopy.geocoders import Nominatim
 
+from busca_apartamentos import configuracao
+from busca_apartamentos.armazenamento import abre_bucket
+from busca_apartamentos.cache_blobs import CacheBlobs
+from busca_apartamentos.historico import le_historico, legado_nao_migrado, particoes
+from busca_apartamentos.materializacao import materializa_tratados
+from busca_apartamentos.tratamento import trata_site
+from busca_apartamentos.tratamento_paralelo import trata_em_blocos
 
-def get_data(bucket_name:str, imobiliarias:str = ['apolar', 'cilar'],by:str = ['date','date_diff'], dates:list = [], date_diff:int = 2):
-    storage_client = storage.Client()
-    bucket = storage_client.get_bucket(bucket_name)
 
-    files_on_bucket = [i.name for i in bucket.list_blobs()]
-    files = pd.DataFrame(files_on_bucket, columns=['name'])
-    files['date'] = pd.to_datetime(files['name'].apply(lambda f: f.split(' - ')[0]))
-    files['imobiliaria'] = files['name'].apply(lambda f: f.split(' - ')[-1].replace('.csv',''))
+def get_data(bucket_name:str, imobiliarias:str = ['apolar', 'cilar'],by:str = ['date','date_diff'], dates:list = [], date_diff:int = 2, columns:list = None, cache_dir:str = os.path.expanduser('~/.cache/busca-apartamentos')):
+    """
+    Lê os dados do histórico particionado do bucket ('apartamentos/imobiliaria=<site>/data=<data>/').
+
+    Só as partes das imobiliárias e datas selecionadas são baixadas, e só as `columns` pedidas são
+    decodificadas; as partes são lidas em paralelo e concatenadas uma única vez. As partes que não
+    puderam ser lidas são listadas com o erro (e ficam em `df.attrs['falhas']`), assim como os arquivos
+    antigos das datas selecionadas que ainda não foram migrados para o histórico particionado.
+
+    Parâmetros:
+        bucket_name (str): bucket dos dados (brutos ou tratados), aberto no armazenamento configurado (`ARMAZENAMENTO`).
+        imobiliarias (list): sites lidos.
+        by (str): 'date' lê as datas de `dates`; 'date_diff' lê as `date_diff` datas mais recentes. Sem um
+            dos dois (o padrão), lê todas as datas.
+        dates (list): datas lidas com by='date'.
+        date_diff (int): quantidade de datas lidas com by='date_diff'.
+        columns (list, opcional): colunas lidas. Padrão: todas.
+        cache_dir (str, opcional): pasta do cache local dos arquivos; com o cache aquecido, só o catálogo
+            do bucket vai à rede. None desativa o cache.
+    """
+    bucket = abre_bucket(bucket_name)
+    if cache_dir:
+        bucket = CacheBlobs(bucket, os.path.join(cache_dir, bucket_name))
 
     match by:
         case 'date':
-            files = files.loc[files['date'].isin(dates)]
-            files = files.loc[files['imobiliaria'].isin(imobiliarias)]
+            selecao = {'datas': dates}
         case 'date_diff':
-            dates = files['date'].sort_values(ascending=False).drop_duplicates().reset_index(drop=True)[:date_diff].tolist()
-            files = files.loc[files['date'].isin(dates)]
-            files = files.loc[files['imobiliaria'].isin(imobiliarias)]
-    
-    df_full = pd.DataFrame()
+            selecao = {'ultimas_datas': date_diff}
+        case list() | tuple() | None:
+            # sem um modo escolhido, todas as datas
+            selecao = {}
+        case _:
+            raise ValueError(f"by deve ser 'date' ou 'date_diff', não {by!r}")
+    df_full, falhas = le_historico(bucket, imobiliarias, colunas=columns, **selecao)
+
+    # arquivos antigos que não foram copiados para o histórico particionado não são lidos: ficam nas falhas
+    for (site, data), nomes in legado_nao_migrado(bucket, imobiliarias, **selecao).items():
+        for file_name in nomes:
+            falhas[file_name] = f'arquivo antigo de {site} em {data}, não migrado (python buscador-unificado/main.py migra {bucket_name})'
+
+    if falhas:
+        print(f'{len(falhas)} arquivos não foram lidos:')
+        for file_name, erro in falhas.items():
+            print(f'  {file_name}: {erro}')
+    df_full.attrs['falhas'] = falhas
+    if cache_dir:
+        print(f'Cache local: {bucket.relatorio()}')
 
-    for file_name in files['name'].tolist():
-        try:
-            df_aux = pd.read_csv(f'gs://{bucket_name}/{file_name}')
-            df_full = pd.concat([df_full, df_aux], axis = 0)
-        except:
-            pass
+    return df_full
 
-    df_full = df_full.reset_index(drop=True)
+def get_treated_data(bucket_name:str, imobiliarias:str = ['apolar', 'cilar'],by:str = ['date','date_diff'], dates:list = [], date_diff:int = 2, columns:list = None, cache_dir:str = os.path.expanduser('~/.cache/busca-apartamentos'), treated_bucket_name:str = configuracao.BUCKET_TRATADOS, processos:int = 1):
+    """
+    Lê os dados tratados (`tratamento_dados_*`) das imobiliárias e datas selecionadas, prontos para o
+    `feature_engeniering`. Antes da leitura, as partições brutas selecionadas que ainda não foram tratadas,
+    que mudaram ou que foram tratadas por outra versão do código são tratadas e gravadas no bucket dos
+    tratados (`materializa_tratados`); as demais são lidas como já estão.
 
-    return df_full
+    Parâmetros:
+        bucket_name (str): bucket dos dados brutos.
+        imobiliarias, by, dates, date_diff, columns, cache_dir: como em `get_data`.
+        treated_bucket_name (str): bucket dos dados tratados (`BUCKET_TRATADOS`).
+        processos (int): processos que tratam partições ao mesmo tempo (None: um por núcleo).
+    """
+    match by:
+        case 'date':
+            selecao = {'datas': dates}
+        case 'date_diff':
+            selecao = {'ultimas_datas': date_diff}
+        case list() | tuple() | None:
+            selecao = {}
+        case _:
+            raise ValueError(f"by deve ser 'date' ou 'date_diff', não {by!r}")
+    atualizacao = materializa_tratados(bucket_name, treated_bucket_name, imobiliarias, processos=processos, **selecao)
+    print(f'Dados tratados: {atualizacao["particoes_tratadas"]} partições tratadas, {atualizacao["ja_atualizadas"]} já atualizadas')
+
+    return get_data(treated_bucket_name, imobiliarias, by, dates, date_diff, columns, cache_dir)
 
 def get_all_dates(bucket_name):
 
-    storage_client = storage.Client()
-    bucket = storage_client.get_bucket(bucket_name)
+    bucket = abre_bucket(bucket_name)
 
-    datas = set([i.name.split(' - ')[0] for i in bucket.list_blobs()])
+    datas = set(particoes(bucket)['data'].dt.strftime('%Y-%m-%d'))
 
     return datas
 
@@ -192,207 +245,24 @@ def barplot(group:str,
     else:
         pass
 
-def tratamento_dados_cilar(data):
-
-    df = data.copy()
-    def formata_valores(valores):
-        return valores.str.replace('.','').apply(lambda x: x if pd.isna(x) else x.split(',')[0]).astype('float64')
-
-    def extrai_valores_string(string,substring):
-
-        # Padronizar a expressão regular para encontrar a área total
-        padrao = f'{substring} (\d+)'
-
-        # Encontrar a área total usando regex
-        area_total = re.search(padrao, string)
-
-        if area_total:
-            # Extrair o valor numérico da área total
-            valor_area = area_total.group(1)
-            
-            # Remover vírgulas e converter para float
-            valor_area = int(valor_area.replace(',', '.'))
-            
-        else:
-            valor_area = np.nan
-        
-        return valor_area
-
-    def verifica_existencia_palavras(palavras, texto):
-        return any(palavra in texto for palavra in palavras)
-
-    df['detalhes'] = df['detalhes'].apply(lambda x: x if pd.isna(x) else ast.literal_eval(x))
-    df['detalhes'] = df['detalhes'].apply(lambda x: ' '.join(x).replace('Características do imóvel ','').strip() if isinstance(x,list) else x)
-
-    # corrigindo alguns valores de iptu na coluna de condomínio
-    df.loc[df['condominio'].str.contains('IPTU', na=False), 'iptu'] = df.loc[df['condominio'].str.contains('IPTU', na=False), 'condominio']
-    df.loc[df['condominio'].str.contains('IPTU', na=False), 'condominio'] = np.nan
-
-    df['aluguel'] = formata_valores(df['aluguel'].str.replace('AluguelR$','')).fillna(0)
-    df['condominio'] = formata_valores(df['condominio'].str.replace('Condominio  R$','')).fillna(0)
-    df['iptu'] = formata_valores(df['iptu'].str.replace('IPTU  R$','')).fillna(0)
-
-    ## Detalhes do imóvel
-    df['area'] = df['detalhes'].apply(lambda x: 0 if pd.isna(x) else extrai_valores_string(x,'Área Total')).fillna(0)
-    df['quartos'] = df['detalhes'].apply(lambda x: 0 if  pd.isna(x) else extrai_valores_string(x,'Quartos')).fillna(0)
-    df['suites'] = df['detalhes'].apply(lambda x: 0 if  pd.isna(x) else extrai_valores_string(x,'Suítes')).fillna(0)
-    df['banheiros'] = df['detalhes'].apply(lambda x: 0 if  pd.isna(x) else extrai_valores_string(x,'Banheiros')).fillna(0)
-    df['andar'] = df['detalhes'].apply(lambda x: 0 if  pd.isna(x) else extrai_valores_string(x,'Andar')).fillna(0)
-    df['vagas_garagem'] = df['mais_detalhes_imovel'].apply(lambda x: 0 if  pd.isna(x) else extrai_valores_string(x,'Vagas de garagem:')).fillna(0)
-
-    # Localidade
-    df['bairro'] = df['endereco'].apply(lambda x: x if pd.isna(x) else unidecode(x.split(' - ')[-2].capitalize()))
-    df['cidade'] = df['endereco'].apply(lambda x: x if pd.isna(x) else unidecode(x.split(' - ')[-1].capitalize()))
-
-    # Atributos do imóvel e condomínio
-    df['mobiliado'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['mobilia', 'mobiliado', 'semi-mobiliado','sofa', 'armario', 'armarios', 'tv', 'cama', 'mesa', 'cadeiras', 'eletrodomesticos'], unidecode(x.lower())) else 'Não')
-    df['mobilia_planejada'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['armarios planejados', 'planejados', 'planejado', 'sob medida'], unidecode(x.lower())) else 'Não')
-    df['piscina'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if 'piscina' in unidecode(x.lower()) else 'Não')
-    df['academia'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['academia', 'fitness', 'espaco fitness', 'sala fitness', 'ginastica'], unidecode(x.lower())) else 'Não')
-    df['sacada'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if 'sacada' in unidecode(x.lower()) else 'Não')
-    df['churrasqueira'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['churrasqueira', 'espaco churrasco', 'churrasco'], unidecode(x.lower())) else 'Não')
-    df['salao_de_festas'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['salao de festa', 'salao de festas'], unidecode(x.lower())) else 'Não')
-    df['salao_de_jogos'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['salao de jogos'], unidecode(x.lower())) else 'Não')
-    df['espaco_coworking'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['coworking', 'sala coworking'], unidecode(x.lower())) else 'Não')
-    df['quadra_esportes'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['quadra de esportes',  'quadra coberta', 'quadra poliesportiva', 'poliesportiva'], unidecode(x.lower())) else 'Não')
-    df['playground'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['playground'], unidecode(x.lower())) else 'Não')
-    df['lavanderia'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['lavanderia'], unidecode(x.lower())) else 'Não')
-    df['espaco_pet'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['espaco pet', 'pet space'], unidecode(x.lower())) else 'Não')
-    df['imovel_decorado'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['decorado', 'charmoso', 'charmosa', 'design', 'layout'], unidecode(x.lower())) else 'Não')
-    df['totalmente_mobiliado'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['100% mobiliado', 'todo mobiliado',  'studio mobiliado'], unidecode(x.lower())) else 'Não')
-    df['hidromassagem'] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['hidromassagem'], unidecode(x.lower())) else 'Não')
-
-
-    return df
-
-def tratamento_dados_apolar(data):
-
-    df = data.copy()
-    def busca_substring(substring, string_list):
-        result = np.nan
-        for s in string_list:
-            if substring in s:
-                try:
-                    result = re.findall(r'\s(\d{1,3}(?:[.,]\d{3})*(?:[.,]\d{2})?)', s)[0]
-                except:
-                    result = s
-                break
-                
-        return result
-
-    def separa_valores_imovel(string):
-
-        # Padrao regex para encontrar nome e valor monetário
-        padrao = r'(\w+)\sR\$\s(\d{1,3}(?:\.\d{3})*(?:,\d{2})?)'
-
-        # Encontrar todas as correspondências na string
-        correspondencias = re.findall(padrao, string)
-
-        # Imprimir os resultados
-        list_values = []
-        for correspondencia in correspondencias:
-            nome, valor = correspondencia
-            list_values.append(f'{nome}: {valor}')
-        
-        return list_values
-
-    def formata_valores(valores):
-        return valores.str.strip().str.replace('.','').apply(lambda x: x if pd.isna(x) else x.split(',')[0]).astype('float64')
-
-    def verifica_existencia_palavras(palavras, texto):
-        return any(palavra in texto for palavra in palavras)
-
-    df['titulo'] = df['titulo'].apply(lambda x: x if pd.isna(x) else x.replace('\n','').strip())
-    df['endereco'] = df['endereco'].apply(lambda x: x if pd.isna(x) else x.replace('\n','').strip())
-    df['descricao'] = df['descricao'].apply(lambda x: x if pd.isna(x) else x.replace('\n','').strip())
-
-    df['bairro'] = df['endereco'].str.strip().apply(lambda x: x if pd.isna(x) else unidecode(x.replace('\n','').strip().split(', ')[-1].split(' - ')[0].capitalize()))
-    df['cidade'] = df['endereco'].str.strip().apply(lambda x: x if pd.isna(x) else unidecode(x.replace('\n','').strip().split(', ')[-1].split(' - ')[-1].capitalize()))
-
-    # Valores
-    df['aluguel'] = df['valores'].apply(lambda x: x if pd.isna(x) else 
-                        x.split(', ,')[0].replace('R$ ','').strip() if "Aluguel" not in x else
-                        x.split(', ,')[0].replace('R$ ','').replace('Aluguel ','').strip() if "Aluguel" in x else
-                        x)
-    df['aluguel'] = df['aluguel'].apply(lambda x: x if pd.isna(x) else x.split(' ')[0])
-    df['condominio'] = df['valores'].apply(lambda x: busca_substring('Condomínio', separa_valores_imovel(x)) if not pd.isna(x) else x)
-    df['iptu'] = df['valores'].apply(lambda x: busca_substring('IPTU', separa_valores_imovel(x)) if not pd.isna(x) else x)
-    df['seguro_incendio'] = df['valores'].apply(lambda x: busca_substring('Incêndio', separa_valores_imovel(x)) if not pd.isna(x) else x)
-
-    # formatando valores
-    df['aluguel'] = formata_valores(df['aluguel'])
-    df['condominio'] = formata_valores(df['condominio']).fillna(0)
-    df['iptu'] = formata_valores(df['iptu']).fillna(0)
-    df['seguro_incendio'] = formata_valores(df['seguro_incendio']).fillna(0)
-
-    # Atributos
-    df['area'] = df['atributos'].apply(lambda x: x if pd.isna(x)  else busca_substring('m²', x.split(', '))).str.replace('m²','')
-    df['banheiros'] = df['atributos'].apply(lambda x: 0 if pd.isna(x)  else busca_substring('banheiro', x.split(', '))).str.replace('banheiro','').str.replace('s','').fillna(0).astype('int64')
-    df['quartos'] = df['atributos'].apply(lambda x: 0 if pd.isna(x)  else busca_substring('quarto', x.split(', '))).str.replace('quarto','').str.replace('s','').fillna(0).astype('int64')
-    df['suites'] = df['atributos'].apply(lambda x: 0 if pd.isna(x)  else busca_substring('suite', x.split(', '))).str.replace('suite','').str.replace('s','').fillna(0).astype('int64')
-    df['vagas_garagem'] = df['atributos'].apply(lambda x: 0 if pd.isna(x) else busca_substring('vaga', x.split(', '))).str.replace('vaga','').str.replace('s','').fillna(0).astype('int64')
-
-    # Detalhes do imóvel/condomínio
-    df['mobiliado'] = df['descricao'].apply(lambda x: np.nan if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['mobilia', 'moveis planejados', 'mobiliado', 'semi-mobiliado','sofa', 'armario', 'armarios', 'tv', 'cama', 'mesa', 'cadeiras', 'eletrodomesticos'], unidecode(x.lower())) else 'Não')
-    df['mobilia_planejada'] = df['descricao'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['armarios planejados', 'planejados', 'planejado', 'sob medida'], unidecode(x.lower())) else 'Não')
-    df['piscina'] = df['descricao'].apply(lambda x: np.nan if pd.isna(x) else 'Sim' if 'piscina' in unidecode(x.lower()) else 'Não')
-    df['academia'] = df['descricao'].apply(lambda x: np.nan if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['academia', 'fitness', 'espaco fitness', 'sala fitness', 'ginastica'], unidecode(x.lower())) else 'Não')
-    df['sacada'] = df['descricao'].apply(lambda x: np.nan if pd.isna(x) else 'Sim' if 'sacada' in unidecode(x.lower()) else 'Não')
-    df['churrasqueira'] = df['descricao'].apply(lambda x: np.nan if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['churrasqueira', 'espaco churrasco', 'churrasco'], unidecode(x.lower())) else 'Não')
-    df['salao_de_festas'] = df['descricao'].apply(lambda x: np.nan if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['salao de festa', 'salao de festas'], unidecode(x.lower())) else 'Não')
-    df['salao_de_jogos'] = df['descricao'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['salao de jogos'], unidecode(x.lower())) else 'Não')
-    df['espaco_coworking'] = df['descricao'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['coworking', 'sala coworking'], unidecode(x.lower())) else 'Não')
-    df['quadra_esportes'] = df['descricao'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['quadra de esportes',  'quadra coberta', 'quadra poliesportiva', 'poliesportiva'], unidecode(x.lower())) else 'Não')
-    df['playground'] = df['descricao'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['playground'], unidecode(x.lower())) else 'Não')
-    df['lavanderia'] = df['descricao'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['lavanderia'], unidecode(x.lower())) else 'Não')
-    df['espaco_pet'] = df['descricao'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['espaco pet', 'pet space'], unidecode(x.lower())) else 'Não')
-    df['imovel_decorado'] = df['descricao'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['decorado', 'charmoso', 'charmosa', 'design', 'layout'], unidecode(x.lower())) else 'Não')
-    df['totalmente_mobiliado'] = df['descricao'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['100% mobiliado', 'todo mobiliado', 'studio mobiliado'], unidecode(x.lower())) else 'Não')
-    df['hidromassagem'] = df['descricao'].apply(lambda x: x if pd.isna(x) else 'Sim' if verifica_existencia_palavras(['hidromassagem'], unidecode(x.lower())) else 'Não')
-
-    return df
-
-def tratamento_dados_razao(data):
-
-    df = data.copy()
-    # 'titulo'
-    df['titulo'] = df['titulo'].str.strip()
-
-    # 'endereco'
-    df['endereco'] = df['endereco'].str.strip()
-    df['bairro'] = df['endereco'].apply(lambda x: x.split(' - ')[1])
-    df['cidade'] = df['endereco'].apply(lambda x: x.split(' - ')[-1])
-
-    # 'condominio'
-    df['condominio'] = df['condominio'].apply(lambda x: 0 if pd.isna(x) else np.nan if x == '' else x.replace('Cond. ','').replace('R$ ','').split(',')[0].replace('Sob consulta','0').replace(' ','')).fillna(0).astype('float64')
-
-    # 'iptu'
-    df['iptu'] = df['iptu'].apply(lambda x: x if pd.isna(x) else np.nan if x == '' else x.replace('Sobconsulta','0').replace('IPTU  R$ ', '').split(',')[0]).fillna(0).astype('float64')
-
-    # 'aluguel'
-    df['aluguel'] = df['aluguel'].apply(lambda x: np.nan if not re.search(r'\d', x) else x.replace('R$ ','').replace('.','')).astype('float64')
-
-    # 'itens_imovel'
-
-    # 'descricao'
-
-    df['atributos'] = df['atributos'].apply(lambda x: x if pd.isna(x) else ast.literal_eval(x))
-    # formatando valores
-    df['area'] = df['atributos'].apply(lambda x: x[4].split(' ')[0]).replace('(--)',0)
-    df['quartos'] = df['atributos'].apply(lambda x: x[0]).replace('(--)',0)
-    df['suites'] = df['atributos'].apply(lambda x: x[1]).replace('(--)',0)
-    df['banheiros'] = df['atributos'].apply(lambda x: x[2]).replace('(--)',0)
-    df['vagas_garagem'] = df['atributos'].apply(lambda x: x[3]).replace('(--)',0)
-
-    df['mobiliado'] = df['descricao'].apply(lambda x: np.nan if isinstance(x,float) else 'Sim' if 'mobiliado' in unidecode(x.lower()) else 'Não')
-    df['piscina'] = df['descricao'].apply(lambda x: np.nan if isinstance(x,float) else 'Sim' if 'piscina' in unidecode(x.lower()) else 'Não')
-    df['academia'] = df['descricao'].apply(lambda x: np.nan if isinstance(x,float) else 'Sim' if 'academia' in unidecode(x.lower()) else 'Não')
-    df['sacada'] = df['descricao'].apply(lambda x: np.nan if isinstance(x,float) else 'Sim' if 'sacada' in unidecode(x.lower()) else 'Não')
-    df['churrasqueira'] = df['descricao'].apply(lambda x: np.nan if isinstance(x,float) else 'Sim' if 'churrasqueira' in unidecode(x.lower()) else 'Não')
-    df['salao_de_festas'] = df['descricao'].apply(lambda x: np.nan if isinstance(x,float) else 'Sim' if 'salao de festas' in unidecode(x.lower()) else 'Não')
-    
-
-    return df
+def tratamento_dados_cilar(data, compacto=False, processos=1):
+    # regras da Cilar em busca_apartamentos/tratamento.py (REGRAS_CILAR); com processos > 1 (ou None, um por
+    # núcleo), o histórico é tratado em blocos de datas num pool de processos
+    if processos == 1:
+        return trata_site(data, 'cilar', compacto=compacto)
+    return trata_em_blocos(data, 'cilar', processos=processos, compacto=compacto)
+
+def tratamento_dados_apolar(data, compacto=False, processos=1):
+    # regras da Apolar em busca_apartamentos/tratamento.py (REGRAS_APOLAR)
+    if processos == 1:
+        return trata_site(data, 'apolar', compacto=compacto)
+    return trata_em_blocos(data, 'apolar', processos=processos, compacto=compacto)
+
+def tratamento_dados_razao(data, compacto=False, processos=1):
+    # regras da Razão em busca_apartamentos/tratamento.py (REGRAS_RAZAO)
+    if processos == 1:
+        return trata_site(data, 'razao', compacto=compacto)
+    return trata_em_blocos(data, 'razao', processos=processos, compacto=compacto)
 
 def salvar_grafico(nome_arquivo, pasta_destino, figura=None, formato='png', dpi=300):
     """
@@ -0,0 +1,35 @@
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from busca_apartamentos.descoberta import soup_da_pagina
+from busca_apartamentos.sites import razao
+
+PASTA_FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def le_listagem():
+    with open(os.path.join(PASTA_FIXTURES, 'razao_listagem.html'), 'rb') as f:
+        return f.read()
+
+
+def test_ultima_pagina_vem_do_botao_e_nao_da_janela_visivel():
+    # a janela mostra as páginas 1 a 3; o botão da última página aponta para a 37, com o parâmetro 'pag'
+    assert razao.extrai_ultima_pagina(soup_da_pagina(le_listagem())) == (37, 'pag')
+
+def test_paginacao_em_javascript_nao_e_adivinhada():
+    conteudo = le_listagem().replace(b'href="busca.php?termoPesquisa=Curitiba&amp;codCity=3314&amp;tipoNegocio=2&amp;isLancamento=0&amp;tipo_Imovel%5B%5D=3&amp;referencia=&amp;endereco=&amp;pag=37"',
+                                     b'href="javascript:void(0)"')
+    with pytest.raises(ValueError):
+        razao.extrai_ultima_pagina(soup_da_pagina(conteudo))
+
+def test_sem_paginacao_no_html_usa_o_navegador():
+    site = types.SimpleNamespace(descobre_paginacao=lambda link: None, get_last_page=lambda link: 37,
+                                 get_link_anuncios=lambda link, n_ultima_pagina: [f'imovel.php?codigo={n_ultima_pagina}'])
+    assert razao.Razao.descobre_links(site) == [razao.BASE_URL + 'imovel.php?codigo=37']
+
+def test_links_da_listagem():
+    assert razao.extrai_links_pagina(le_listagem()) == ['imovel.php?codigo=1001', 'imovel.php?codigo=1002']
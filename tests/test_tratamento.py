@@ -0,0 +1,199 @@
+import ast
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from unidecode import unidecode
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from busca_apartamentos.tratamento import COMODIDADES_APOLAR, COMODIDADES_CILAR, COMODIDADES_RAZAO, trata_site
+
+# dados brutos sintéticos de cada site, gravados como texto, como no histórico bruto
+PASTA_FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+SITES = ['apolar', 'cilar', 'razao']
+
+
+def le_fixture(site):
+    return pd.read_csv(os.path.join(PASTA_FIXTURES, f'brutos_{site}.csv'), dtype=str)
+
+
+# tratamento antigo, linha a linha com `.apply`: a referência das regras de `busca_apartamentos/tratamento.py`
+def _contem_alguma(palavras, texto):
+    return any(palavra in texto for palavra in palavras)
+
+def _busca_substring(substring, string_list):
+    result = np.nan
+    for s in string_list:
+        if substring in s:
+            try:
+                result = re.findall(r'\s(\d{1,3}(?:[.,]\d{3})*(?:[.,]\d{2})?)', s)[0]
+            except IndexError:
+                result = s
+            break
+    return result
+
+def _referencia_apolar(data):
+
+    def separa_valores_imovel(string):
+        return [f'{nome}: {valor}' for nome, valor in re.findall(r'(\w+)\sR\$\s(\d{1,3}(?:\.\d{3})*(?:,\d{2})?)', string)]
+
+    def formata_valores(valores):
+        return valores.str.strip().str.replace('.', '').apply(lambda x: x if pd.isna(x) else x.split(',')[0]).astype('float64')
+
+    df = data.copy()
+    for coluna in ['titulo', 'endereco', 'descricao']:
+        df[coluna] = df[coluna].apply(lambda x: x if pd.isna(x) else x.replace('\n', '').strip())
+    df['bairro'] = df['endereco'].apply(lambda x: x if pd.isna(x) else unidecode(x.split(', ')[-1].split(' - ')[0].capitalize()))
+    df['cidade'] = df['endereco'].apply(lambda x: x if pd.isna(x) else unidecode(x.split(', ')[-1].split(' - ')[-1].capitalize()))
+    df['aluguel'] = df['valores'].apply(lambda x: x if pd.isna(x) else
+                                        x.split(', ,')[0].replace('R$ ', '').strip() if 'Aluguel' not in x else
+                                        x.split(', ,')[0].replace('R$ ', '').replace('Aluguel ', '').strip())
+    df['aluguel'] = formata_valores(df['aluguel'].apply(lambda x: x if pd.isna(x) else x.split(' ')[0]))
+    for coluna, rotulo in {'condominio': 'Condomínio', 'iptu': 'IPTU', 'seguro_incendio': 'Incêndio'}.items():
+        df[coluna] = formata_valores(df['valores'].apply(lambda x: _busca_substring(rotulo, separa_valores_imovel(x)) if not pd.isna(x) else x)).fillna(0)
+    df['area'] = df['atributos'].apply(lambda x: x if pd.isna(x) else _busca_substring('m²', x.split(', '))).str.replace('m²', '')
+    for coluna, chave in {'banheiros': 'banheiro', 'quartos': 'quarto', 'suites': 'suite', 'vagas_garagem': 'vaga'}.items():
+        df[coluna] = (df['atributos'].apply(lambda x: 0 if pd.isna(x) else _busca_substring(chave, x.split(', ')))
+                      .str.replace(chave, '').str.replace('s', '').fillna(0).astype('int64'))
+    for flag, palavras in COMODIDADES_APOLAR.items():
+        df[flag] = df['descricao'].apply(lambda x: x if pd.isna(x) else 'Sim' if _contem_alguma(palavras, unidecode(x.lower())) else 'Não')
+
+    return df
+
+def _referencia_cilar(data):
+
+    def formata_valores(valores):
+        return valores.str.replace('.', '').apply(lambda x: x if pd.isna(x) else x.split(',')[0]).astype('float64')
+
+    def extrai_valores_string(string, substring):
+        encontrado = re.search(f'{substring} (\\d+)', string)
+        return int(encontrado.group(1)) if encontrado else np.nan
+
+    df = data.copy()
+    df['detalhes'] = df['detalhes'].apply(lambda x: x if pd.isna(x) else ast.literal_eval(x))
+    df['detalhes'] = df['detalhes'].apply(lambda x: ' '.join(x).replace('Características do imóvel ', '').strip() if isinstance(x, list) else x)
+    iptu_no_condominio = df['condominio'].str.contains('IPTU', na=False)
+    df.loc[iptu_no_condominio, 'iptu'] = df.loc[iptu_no_condominio, 'condominio']
+    df.loc[iptu_no_condominio, 'condominio'] = np.nan
+    for coluna, prefixo in {'aluguel': 'AluguelR$', 'condominio': 'Condominio  R$', 'iptu': 'IPTU  R$'}.items():
+        df[coluna] = formata_valores(df[coluna].str.replace(prefixo, '')).fillna(0)
+    for coluna, rotulo in {'area': 'Área Total', 'quartos': 'Quartos', 'suites': 'Suítes', 'banheiros': 'Banheiros', 'andar': 'Andar'}.items():
+        df[coluna] = df['detalhes'].apply(lambda x: 0 if pd.isna(x) else extrai_valores_string(x, rotulo)).fillna(0)
+    df['vagas_garagem'] = df['mais_detalhes_imovel'].apply(lambda x: 0 if pd.isna(x) else extrai_valores_string(x, 'Vagas de garagem:')).fillna(0)
+    df['bairro'] = df['endereco'].apply(lambda x: x if pd.isna(x) else unidecode(x.split(' - ')[-2].capitalize()))
+    df['cidade'] = df['endereco'].apply(lambda x: x if pd.isna(x) else unidecode(x.split(' - ')[-1].capitalize()))
+    for flag, palavras in COMODIDADES_CILAR.items():
+        df[flag] = df['caracteristicas_imovel'].apply(lambda x: x if pd.isna(x) else 'Sim' if _contem_alguma(palavras, unidecode(x.lower())) else 'Não')
+
+    return df
+
+def _referencia_razao(data):
+
+    # `tratamento_dados_razao` original (my_functions.py), sem mudanças
+    df = data.copy()
+    # 'titulo'
+    df['titulo'] = df['titulo'].str.strip()
+
+    # 'endereco'
+    df['endereco'] = df['endereco'].str.strip()
+    df['bairro'] = df['endereco'].apply(lambda x: x.split(' - ')[1])
+    df['cidade'] = df['endereco'].apply(lambda x: x.split(' - ')[-1])
+
+    # 'condominio'
+    df['condominio'] = df['condominio'].apply(lambda x: 0 if pd.isna(x) else np.nan if x == '' else x.replace('Cond. ','').replace('R$ ','').split(',')[0].replace('Sob consulta','0').replace(' ','')).fillna(0).astype('float64')
+
+    # 'iptu'
+    df['iptu'] = df['iptu'].apply(lambda x: x if pd.isna(x) else np.nan if x == '' else x.replace('Sobconsulta','0').replace('IPTU  R$ ', '').split(',')[0]).fillna(0).astype('float64')
+
+    # 'aluguel'
+    df['aluguel'] = df['aluguel'].apply(lambda x: np.nan if not re.search(r'\d', x) else x.replace('R$ ','').replace('.','')).astype('float64')
+
+    # 'itens_imovel'
+
+    # 'descricao'
+
+    df['atributos'] = df['atributos'].apply(lambda x: x if pd.isna(x) else ast.literal_eval(x))
+    # formatando valores
+    df['area'] = df['atributos'].apply(lambda x: x[4].split(' ')[0]).replace('(--)',0)
+    df['quartos'] = df['atributos'].apply(lambda x: x[0]).replace('(--)',0)
+    df['suites'] = df['atributos'].apply(lambda x: x[1]).replace('(--)',0)
+    df['banheiros'] = df['atributos'].apply(lambda x: x[2]).replace('(--)',0)
+    df['vagas_garagem'] = df['atributos'].apply(lambda x: x[3]).replace('(--)',0)
+
+    df['mobiliado'] = df['descricao'].apply(lambda x: np.nan if isinstance(x,float) else 'Sim' if 'mobiliado' in unidecode(x.lower()) else 'Não')
+    df['piscina'] = df['descricao'].apply(lambda x: np.nan if isinstance(x,float) else 'Sim' if 'piscina' in unidecode(x.lower()) else 'Não')
+    df['academia'] = df['descricao'].apply(lambda x: np.nan if isinstance(x,float) else 'Sim' if 'academia' in unidecode(x.lower()) else 'Não')
+    df['sacada'] = df['descricao'].apply(lambda x: np.nan if isinstance(x,float) else 'Sim' if 'sacada' in unidecode(x.lower()) else 'Não')
+    df['churrasqueira'] = df['descricao'].apply(lambda x: np.nan if isinstance(x,float) else 'Sim' if 'churrasqueira' in unidecode(x.lower()) else 'Não')
+    df['salao_de_festas'] = df['descricao'].apply(lambda x: np.nan if isinstance(x,float) else 'Sim' if 'salao de festas' in unidecode(x.lower()) else 'Não')
+    
+
+    return df
+
+REFERENCIAS = {'apolar': _referencia_apolar, 'cilar': _referencia_cilar, 'razao': _referencia_razao}
+
+
+def benchmark_tratamento(df, site):
+    """
+    Compara o tratamento antigo (linha a linha, com um `.apply` por coluna e por comodidade) com o
+    `TratamentoSite` do site, sobre os mesmos dados brutos.
+
+    Parâmetros:
+        df (pd.DataFrame): dados brutos do site (ex.: uma partição do histórico).
+        site (str): 'apolar', 'cilar' ou 'razao'.
+
+    Retorna:
+        dict: linhas, segundos de cada modo, ganho e as colunas com valores diferentes (nenhuma, nos três sites).
+    """
+
+    inicio = time.perf_counter()
+    antigo = REFERENCIAS[site](df)
+    segundos_antigo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    novo = trata_site(df, site)
+    segundos_novo = time.perf_counter() - inicio
+
+    # os valores são comparados sem o tipo: na Cilar, as contagens antigas eram float64 quando algum anúncio não as trazia
+    diferentes = [coluna for coluna in antigo.columns
+                  if coluna not in novo.columns or not antigo[coluna].astype(object).equals(novo[coluna].astype(object))]
+
+    return {'linhas': len(df), 'segundos_linha_a_linha': round(segundos_antigo, 3),
+            'segundos_regras': round(segundos_novo, 3),
+            'ganho': round(segundos_antigo / segundos_novo, 1) if segundos_novo else None,
+            'colunas_diferentes': diferentes}
+
+
+def test_apolar_igual_ao_tratamento_antigo():
+    df = le_fixture('apolar')
+    pd.testing.assert_frame_equal(trata_site(df, 'apolar'), _referencia_apolar(df))
+
+def test_cilar_igual_ao_tratamento_antigo():
+    df = le_fixture('cilar')
+    pd.testing.assert_frame_equal(trata_site(df, 'cilar'), _referencia_cilar(df))
+
+def test_razao_igual_ao_tratamento_antigo():
+    df = le_fixture('razao')
+    pd.testing.assert_frame_equal(trata_site(df, 'razao'), _referencia_razao(df))
+
+def test_historico_tratado_como_cada_data():
+    # o mesmo anúncio em várias datas é tratado uma vez só: o resultado é o mesmo de tratar cada data
+    for site in SITES:
+        df = le_fixture(site)
+        historico = pd.concat([df.assign(data_coleta=data) for data in ['2026-10-01', '2026-10-02', '2026-10-03']], ignore_index=True)
+        esperado = pd.concat([trata_site(df.assign(data_coleta=data), site) for data in ['2026-10-01', '2026-10-02', '2026-10-03']], ignore_index=True)
+        pd.testing.assert_frame_equal(trata_site(historico, site), esperado)
+
+
+if __name__ == '__main__':
+    # python tests/test_tratamento.py [datas]: tempo do tratamento antigo e das regras num histórico montado
+    # com as fixtures repetidas em várias datas (10 por padrão)
+    datas = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for site in SITES:
+        df = le_fixture(site)
+        historico = pd.concat([df.assign(data_coleta=str(data.date())) for data in pd.date_range('2026-10-01', periods=datas)],
+                              ignore_index=True)
+        print(site, benchmark_tratamento(historico, site))